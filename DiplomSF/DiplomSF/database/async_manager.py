@@ -0,0 +1,609 @@
+import asyncio
+import copy
+import os
+from contextlib import asynccontextmanager
+
+import psycopg
+from psycopg import pq, sql
+from psycopg.rows import dict_row
+from psycopg.types.json import Jsonb
+
+from app.database.manager import DatabaseConfig
+from app.database.models import DatabaseQueries
+from app.database.statements import execute, execute_query, executemany
+from app.database.pool import get_async_pool
+from app.storage.blob import content_hash, store_image
+from app.utils.cache import TTLCache
+from app.utils.exceptions import InvalidImageReference
+from app.utils.geo import radius_bbox
+
+# email -> (user_id, (phone, fam, name, otc)) для пользователей из закоммиченных транзакций
+user_id_cache = TTLCache(
+    maxsize=int(os.getenv('FSTR_USER_CACHE_SIZE', '10000')),
+    ttl=float(os.getenv('FSTR_USER_CACHE_TTL', '300'))
+)
+
+
+class AsyncDatabaseManager(DatabaseConfig):
+    """Асинхронный вариант DatabaseManager (psycopg 3 + AsyncConnectionPool)"""
+
+    def __init__(self):
+        super().__init__()
+        # Менеджер, выданный session(), и соединение его сессии
+        # (берётся из пула при первом запросе к БД)
+        self.in_session = False
+        self.conn = None
+        self._commit_callbacks = []
+
+    def _connect_kwargs(self):
+        kwargs = super()._connect_kwargs()
+        kwargs["dbname"] = kwargs.pop("database")
+        return kwargs
+
+    async def get_pool(self):
+        return await get_async_pool(self._pool_settings(), **self._connect_kwargs())
+
+    async def _acquire(self):
+        if self.pooled:
+            pool = await self.get_pool()
+            return await pool.getconn()
+        return await psycopg.AsyncConnection.connect(**self._connect_kwargs())
+
+    async def _release(self, conn):
+        """Возвращает соединение в пул, откатив незакоммиченную транзакцию"""
+        if not conn.closed and conn.info.transaction_status != pq.TransactionStatus.IDLE:
+            await conn.rollback()
+        if self.pooled:
+            pool = await self.get_pool()
+            await pool.putconn(conn)
+        else:
+            await conn.close()
+
+    @asynccontextmanager
+    async def connection(self):
+        """
+        Выдаёт соединение из пула на время блока и возвращает его обратно.
+        Незакоммиченная транзакция при возврате откатывается.
+        Внутри сессии всегда выдаётся соединение сессии.
+        """
+        if self.in_session:
+            if self.conn is None:
+                self.conn = await self._acquire()
+            yield self.conn
+            return
+        conn = await self._acquire()
+        try:
+            yield conn
+        finally:
+            await self._release(conn)
+
+    @asynccontextmanager
+    async def session(self):
+        """
+        Сессия: одно соединение и одна транзакция на весь блок.
+        Коммит при успешном выходе, откат при исключении.
+        Соединение берётся из пула только при первом запросе к БД, так что
+        блок, обошедшийся без БД (например, ответ из кеша), пул не занимает.
+        """
+        session = copy.copy(self)
+        session.in_session = True
+        session.conn = None
+        session._commit_callbacks = []
+        try:
+            yield session
+        except Exception:
+            await session.rollback()
+            raise
+        else:
+            await session.commit()
+        finally:
+            if session.conn is not None:
+                await session._release(session.conn)
+                session.conn = None
+
+    async def commit(self):
+        if self.conn is not None:
+            await self.conn.commit()
+        callbacks, self._commit_callbacks = self._commit_callbacks, []
+        for callback in callbacks:
+            callback()
+
+    async def rollback(self):
+        self._commit_callbacks = []
+        if self.conn is not None:
+            await self.conn.rollback()
+
+    async def release(self):
+        """
+        Фиксирует транзакцию сессии и сразу возвращает её соединение в пул,
+        не дожидаясь конца запроса (например, перед потоковой отдачей файла).
+        Следующий запрос к БД в этой сессии возьмёт новое соединение.
+        """
+        await self.commit()
+        conn, self.conn = self.conn, None
+        if conn is not None:
+            await self._release(conn)
+
+    async def _commit(self, conn):
+        # В сессии коммит выполняется при её закрытии
+        if not self.in_session:
+            await conn.commit()
+
+    async def _rollback(self, conn):
+        if not self.in_session:
+            await conn.rollback()
+        else:
+            await self.rollback()
+
+    def _after_commit(self, callback):
+        """Выполняет callback после фиксации транзакции (в сессии - после её коммита)"""
+        if not self.in_session:
+            callback()
+        else:
+            self._commit_callbacks.append(callback)
+
+    async def _insert_returning_id(self, name, params):
+        async with self.connection() as conn:
+            try:
+                async with conn.cursor() as cursor:
+                    await execute(cursor, name, params)
+                    row_id = (await cursor.fetchone())[0]
+                    await self._commit(conn)
+                    return row_id
+            except Exception as e:
+                await self._rollback(conn)
+                raise e
+
+    async def _execute(self, name, params):
+        async with self.connection() as conn:
+            try:
+                async with conn.cursor() as cursor:
+                    await execute(cursor, name, params)
+                    await self._commit(conn)
+            except Exception as e:
+                await self._rollback(conn)
+                raise e
+
+    async def add_user(self, email, phone, fam, name, otc=None):
+        return await self._insert_returning_id(
+            'create_user', (email, phone, fam, name, otc)
+        )
+
+    async def get_or_create_user(self, email, phone, fam, name, otc=None):
+        """
+        Возвращает id пользователя с данным email, создавая или обновляя его профиль.
+        Повторный вызов с тем же профилем обслуживается из кеша без запроса к БД.
+        """
+        profile = (phone, fam, name, otc)
+        cached = user_id_cache.get(email)
+        if cached and cached[1] == profile:
+            return cached[0]
+        user_id = await self._insert_returning_id(
+            'upsert_user', (email, *profile)
+        )
+        self._after_commit(lambda: user_id_cache.set(email, (user_id, profile)))
+        return user_id
+
+    async def add_coords(self, latitude, longitude, height):
+        return await self._insert_returning_id(
+            'create_coords', (latitude, longitude, height)
+        )
+
+    async def add_pereval(self, user_id, beauty_title, title, other_titles, connect, add_time, coord_id):
+        return await self._insert_returning_id(
+            'create_pereval',
+            (user_id, beauty_title, title, other_titles, connect, add_time, coord_id)
+        )
+
+    async def add_image(self, pereval_id, img, title):
+        img_hash, img_size, mime_type = await asyncio.to_thread(store_image, img)
+        return await self._insert_returning_id(
+            'create_image', (pereval_id, img_hash, img_size, mime_type, title)
+        )
+
+    @classmethod
+    async def insert_images(cls, cursor, pereval_id, images):
+        """
+        Сохраняет изображения в хранилище blob-ов и вставляет их строки
+        в рамках текущей транзакции курсора. Возвращает id новых изображений.
+        """
+        stored_images = [
+            (*await asyncio.to_thread(store_image, img), title) for img, title in images
+        ]
+        return await cls.insert_stored_images(cursor, pereval_id, stored_images)
+
+    @staticmethod
+    async def insert_stored_images(cursor, pereval_id, stored_images):
+        """
+        Вставляет строки images для изображений, уже лежащих в хранилище,
+        одним конвейерным executemany. stored_images - список
+        (img_hash, img_size, mime_type, title).
+        """
+        if not stored_images:
+            return []
+        await executemany(
+            cursor, 'create_image',
+            [(pereval_id, *image) for image in stored_images],
+            returning=True
+        )
+        image_ids = []
+        while True:
+            image_ids.append((await cursor.fetchone())[0])
+            if not cursor.nextset():
+                break
+        return image_ids
+
+    async def add_images(self, pereval_id, images):
+        async with self.connection() as conn:
+            try:
+                async with conn.cursor() as cursor:
+                    image_ids = await self.insert_images(cursor, pereval_id, images)
+                    await self._commit(conn)
+                    return image_ids
+            except Exception as e:
+                await self._rollback(conn)
+                raise e
+
+    @staticmethod
+    async def _insert_submission(cursor, user, coords, pereval):
+        """
+        Вставляет пользователя, координаты и перевал в текущей транзакции
+        одним запросом. Возвращает (pereval_id, user_id).
+        Кеш email -> id используется только как подсказка: запрос сверяет её
+        с таблицей users и при расхождении выполняет upsert, поэтому смена
+        email или удаление пользователя в другом процессе не приводят
+        к устаревшим данным.
+        """
+        email = user['email']
+        profile = (user['phone'], user['fam'], user['name'], user.get('otc'))
+        pereval_params = (
+            pereval.get('beauty_title'), pereval['title'], pereval.get('other_titles'),
+            pereval.get('connect'), pereval.get('add_time')
+        )
+        coords_params = (coords['latitude'], coords['longitude'], coords['height'])
+        cached = user_id_cache.get(email)
+
+        if cached and cached[1] == profile:
+            await execute(
+                cursor, 'create_submission_with_user_hint',
+                (cached[0], email, *profile, email, *profile, *coords_params, *pereval_params)
+            )
+        else:
+            await execute(
+                cursor, 'create_submission',
+                (email, *profile, *coords_params, *pereval_params)
+            )
+        pereval_id, user_id = await cursor.fetchone()
+        return pereval_id, user_id
+
+    @staticmethod
+    def _cache_user(user, user_id):
+        profile = (user['phone'], user['fam'], user['name'], user.get('otc'))
+        user_id_cache.set(user['email'], (user_id, profile))
+
+    async def submit_pereval(self, user, coords, pereval, images, stored_images=()):
+        """
+        Добавляет перевал вместе с пользователем, координатами и изображениями
+        в одной транзакции на одном соединении (см. DatabaseManager.submit_pereval).
+        Для пользователя с неизменным профилем строка users не перезаписывается
+        (см. _insert_submission).
+        """
+        async with self.connection() as conn:
+            try:
+                async with conn.cursor() as cursor:
+                    pereval_id, user_id = await self._insert_submission(cursor, user, coords, pereval)
+                    await self.insert_images(cursor, pereval_id, images)
+                    await self.insert_stored_images(cursor, pereval_id, stored_images)
+                    await self._commit(conn)
+            except Exception as e:
+                await self._rollback(conn)
+                raise e
+
+        self._after_commit(lambda: self._cache_user(user, user_id))
+        return pereval_id
+
+    async def get_submission_keys(self, keys):
+        """Возвращает {ключ идемпотентности: pereval_id} для уже использованных ключей"""
+        if not keys:
+            return {}
+        async with self.connection() as conn, conn.cursor() as cursor:
+            await execute(cursor, 'get_submission_keys', (list(keys),))
+            return dict(await cursor.fetchall())
+
+    async def submit_batch(self, submissions, chunk_size=50):
+        """
+        Добавляет пачку перевалов: одна транзакция на каждые chunk_size записей,
+        каждая запись - в своей точке сохранения, так что ошибка в одной записи
+        не откатывает остальные.
+
+        Пачка всегда пишется на собственном соединении из пула, в том числе
+        у менеджера сессии: чанки фиксируются сами по себе, а транзакция
+        сессии не затрагивается и коммитится или откатывается как обычно.
+
+        submissions - словари с ключами user, coords, pereval, stored_images
+        и idempotency_key (может быть None). Возвращает для каждой записи
+        (pereval_id, duplicate, error): для уже использованного ключа -
+        id ранее созданного перевала и duplicate=True, при ошибке - её текст.
+        """
+        batch = copy.copy(self)
+        batch.in_session = False
+        batch.conn = None
+        batch._commit_callbacks = []
+        results = []
+        async with batch.connection() as conn:
+            for start in range(0, len(submissions), chunk_size):
+                chunk = submissions[start:start + chunk_size]
+                chunk_results = []
+                created_users = []
+                try:
+                    async with conn.cursor() as cursor:
+                        for submission in chunk:
+                            await cursor.execute("SAVEPOINT batch_item")
+                            try:
+                                pereval_id, duplicate, user_id = await batch._insert_batch_item(cursor, submission)
+                            except psycopg.Error as e:
+                                await cursor.execute("ROLLBACK TO SAVEPOINT batch_item")
+                                chunk_results.append((None, False, str(e)))
+                                continue
+                            await cursor.execute("RELEASE SAVEPOINT batch_item")
+                            chunk_results.append((pereval_id, duplicate, None))
+                            if user_id is not None:
+                                created_users.append((submission['user'], user_id))
+                    await conn.commit()
+                except psycopg.Error as e:
+                    await conn.rollback()
+                    chunk_results = [(None, False, str(e))] * len(chunk)
+                    created_users = []
+                results.extend(chunk_results)
+                for user, user_id in created_users:
+                    batch._cache_user(user, user_id)
+        return results
+
+    async def _insert_batch_item(self, cursor, submission):
+        """Одна запись пачки внутри точки сохранения batch_item; возвращает (pereval_id, duplicate, user_id)"""
+        pereval_id, user_id = await self._insert_submission(
+            cursor, submission['user'], submission['coords'], submission['pereval']
+        )
+        key = submission.get('idempotency_key')
+        if key:
+            await execute(cursor, 'create_submission_key', (key, pereval_id))
+            if not await cursor.fetchone():
+                # Ключ уже занят: повтор внутри пачки или параллельная отправка
+                await cursor.execute("ROLLBACK TO SAVEPOINT batch_item")
+                await execute(cursor, 'get_submission_keys', ([key],))
+                return (await cursor.fetchone())[1], True, None
+        await self.insert_stored_images(cursor, pereval_id, submission['stored_images'])
+        return pereval_id, False, user_id
+
+    async def update_pereval(self, pereval_id, fields, coords=None, images=None):
+        """
+        Частичное обновление перевала в статусе new в одной транзакции.
+        fields - новые значения полей pereval_added (только переданные клиентом),
+        coords - новые координаты или None, images - итоговый список изображений
+        или None, если изображения не меняются (см. _apply_image_diff).
+        Возвращает (status, images_added), где status - статус перевала до
+        обновления (None, если перевала нет); если он не new, ничего не меняется.
+        """
+        async with self.connection() as conn:
+            try:
+                async with conn.cursor() as cursor:
+                    await execute(cursor, 'lock_pereval', (pereval_id,))
+                    row = await cursor.fetchone()
+                    if row is None or row[0] != 'new':
+                        await self._rollback(conn)
+                        return (row[0] if row else None), 0
+                    if fields:
+                        await execute_query(
+                            cursor, 'update_pereval_fields',
+                            DatabaseQueries.update_pereval_fields(list(fields)),
+                            (*fields.values(), pereval_id)
+                        )
+                    if coords is not None:
+                        await execute(
+                            cursor, 'update_pereval_coords',
+                            (coords['latitude'], coords['longitude'], coords['height'], pereval_id)
+                        )
+                    images_added = 0
+                    if images is not None:
+                        images_added = await self._apply_image_diff(cursor, pereval_id, images)
+                    await self._commit(conn)
+                    return 'new', images_added
+            except Exception as e:
+                await self._rollback(conn)
+                raise e
+
+    @staticmethod
+    async def _apply_image_diff(cursor, pereval_id, images):
+        """
+        Приводит изображения перевала к списку images, записывая только разницу.
+        Элемент списка - словарь с title и одним из ключей: id (изображение этого
+        перевала), img_hash (уже загруженные данные) или data (байты нового
+        изображения). Изображения сопоставляются с существующими по id или по
+        sha256 содержимого; совпавшие остаются со своими id и при необходимости
+        переименовываются, остальные удаляются, несовпавшие новые - вставляются.
+        Возвращает число вставленных изображений.
+        """
+        await execute(cursor, 'get_pereval_image_refs', (pereval_id,))
+        existing = await cursor.fetchall()
+        by_id = {image_id: (img_hash, title) for image_id, img_hash, title in existing}
+        by_hash = {}
+        for image_id, img_hash, _ in existing:
+            by_hash.setdefault(img_hash, []).append(image_id)
+
+        kept = set()
+        renamed = []
+        added = []
+
+        def match(image_id, title):
+            kept.add(image_id)
+            if title is not None and title != by_id[image_id][1]:
+                renamed.append((title, image_id))
+
+        for image in images:
+            image_id = image.get('id')
+            if image_id is not None:
+                if image_id not in by_id or image_id in kept:
+                    raise InvalidImageReference(f"Image {image_id} does not belong to pereval {pereval_id}")
+                match(image_id, image.get('title'))
+                continue
+            data = image.get('data')
+            img_hash = image.get('img_hash') or content_hash(data)
+            candidates = [i for i in by_hash.get(img_hash, ()) if i not in kept]
+            if candidates:
+                match(candidates[0], image.get('title'))
+            elif image.get('title') is None:
+                raise InvalidImageReference(f"Title is required for new image {img_hash}")
+            elif data is not None:
+                added.append((*await asyncio.to_thread(store_image, data), image['title']))
+            else:
+                await execute(cursor, 'get_stored_image', (img_hash,))
+                row = await cursor.fetchone()
+                if row is None:
+                    raise InvalidImageReference(f"Unknown image hash: {img_hash}")
+                added.append((img_hash, *row, image['title']))
+
+        removed = [image_id for image_id in by_id if image_id not in kept]
+        if removed:
+            await execute(cursor, 'delete_images', (pereval_id, removed))
+        if renamed:
+            await executemany(cursor, 'update_image_title', renamed)
+        await AsyncDatabaseManager.insert_stored_images(cursor, pereval_id, added)
+        return len(added)
+
+    async def get_pereval(self, pereval_id: int):
+        """Перевал вместе с изображениями в виде словаря (см. DatabaseQueries.get_pereval_by_id)"""
+        async with self.connection() as conn, conn.cursor(row_factory=dict_row) as cursor:
+            await execute(cursor, 'get_pereval_by_id', (pereval_id,))
+            return await cursor.fetchone()
+
+    async def get_perevals_in_bbox(self, south, west, north, east, status=None, limit=100):
+        async with self.connection() as conn, conn.cursor(row_factory=dict_row) as cursor:
+            await execute(
+                cursor, 'get_perevals_in_bbox',
+                (west, south, east, north, status, status, limit)
+            )
+            return await cursor.fetchall()
+
+    async def get_perevals_nearby(self, latitude, longitude, radius_km, status=None, limit=100):
+        """Перевалы в радиусе radius_km, отсортированные по расстоянию (поле distance_km)"""
+        south, west, north, east = radius_bbox(latitude, longitude, radius_km)
+        async with self.connection() as conn, conn.cursor(row_factory=dict_row) as cursor:
+            await execute(
+                cursor, 'get_perevals_nearby',
+                (latitude, latitude, longitude, west, south, east, north, status, status, radius_km, limit)
+            )
+            return await cursor.fetchall()
+
+    async def get_tile_clusters(self, south, west, north, east, cells):
+        async with self.connection() as conn, conn.cursor(row_factory=dict_row) as cursor:
+            await execute(
+                cursor, 'get_tile_clusters',
+                (west, south, east, north, cells, cells)
+            )
+            return await cursor.fetchall()
+
+    async def get_moderation_queue(self, status, after_id=0, limit=50):
+        async with self.connection() as conn, conn.cursor(row_factory=dict_row) as cursor:
+            await execute(cursor, 'get_moderation_queue', (status, after_id, limit))
+            return await cursor.fetchall()
+
+    async def claim_perevals(self, moderator, limit, claim_ttl):
+        """Берёт в работу до limit перевалов из очереди (см. DatabaseQueries.claim_perevals)"""
+        async with self.connection() as conn:
+            try:
+                async with conn.cursor(row_factory=dict_row) as cursor:
+                    await execute(cursor, 'claim_perevals', (moderator, claim_ttl, limit))
+                    rows = await cursor.fetchall()
+                    await self._commit(conn)
+                    return sorted(rows, key=lambda row: row["id"])
+            except Exception as e:
+                await self._rollback(conn)
+                raise e
+
+    async def set_perevals_status(self, pereval_ids, status, moderator):
+        """
+        Меняет статус перевалов, взятых в работу модератором;
+        возвращает (id, latitude, longitude) изменённых
+        """
+        async with self.connection() as conn:
+            try:
+                async with conn.cursor() as cursor:
+                    await execute(cursor, 'set_perevals_status', (status, list(pereval_ids), moderator))
+                    rows = await cursor.fetchall()
+                    await self._commit(conn)
+                    return rows
+            except Exception as e:
+                await self._rollback(conn)
+                raise e
+
+    async def enqueue_jobs(self, kind, payloads):
+        """
+        Ставит фоновые задачи kind с данными payloads в очередь. В сессии задачи
+        становятся видны воркеру только вместе с остальными изменениями транзакции.
+        """
+        async with self.connection() as conn:
+            try:
+                async with conn.cursor() as cursor:
+                    await executemany(
+                        cursor, 'enqueue_job',
+                        [(kind, Jsonb(payload)) for payload in payloads]
+                    )
+                    await self._commit(conn)
+            except Exception as e:
+                await self._rollback(conn)
+                raise e
+
+    async def listen(self, channel):
+        """Отдельное соединение в режиме autocommit, подписанное на уведомления channel"""
+        conn = await psycopg.AsyncConnection.connect(autocommit=True, **self._connect_kwargs())
+        await conn.execute(sql.SQL("LISTEN {}").format(sql.Identifier(channel)))
+        return conn
+
+    async def claim_jobs(self, limit, timeout):
+        async with self.connection() as conn:
+            try:
+                async with conn.cursor(row_factory=dict_row) as cursor:
+                    await execute(cursor, 'claim_jobs', (timeout, limit))
+                    jobs = await cursor.fetchall()
+                    await self._commit(conn)
+                    return jobs
+            except Exception as e:
+                await self._rollback(conn)
+                raise e
+
+    async def complete_job(self, job_id):
+        await self._execute('complete_job', (job_id,))
+
+    async def retry_job(self, job_id, error, delay):
+        await self._execute('retry_job', (error, delay, job_id))
+
+    async def fail_job(self, job_id, error):
+        await self._execute('fail_job', (error, job_id))
+
+    async def get_missing_renditions(self, pereval_id, name):
+        async with self.connection() as conn, conn.cursor() as cursor:
+            await execute(cursor, 'get_missing_renditions', (name, pereval_id))
+            return await cursor.fetchall()
+
+    async def get_image(self, pereval_id: int, image_id: int):
+        async with self.connection() as conn, conn.cursor() as cursor:
+            await execute(cursor, 'get_image', (image_id, pereval_id))
+            return await cursor.fetchone()
+
+    async def get_image_rendition(self, pereval_id: int, image_id: int, name: str):
+        async with self.connection() as conn, conn.cursor() as cursor:
+            await execute(cursor, 'get_image_rendition', (name, image_id, pereval_id))
+            return await cursor.fetchone()
+
+    async def add_image_rendition(self, img_hash, name, rendition_hash, img_size, mime_type):
+        async with self.connection() as conn:
+            try:
+                async with conn.cursor() as cursor:
+                    await execute(
+                        cursor, 'create_image_rendition',
+                        (img_hash, name, rendition_hash, img_size, mime_type)
+                    )
+                    await self._commit(conn)
+            except Exception as e:
+                await self._rollback(conn)
+                raise e
@@ -0,0 +1,131 @@
+"""
+Замер времени выполнения SQL-запросов.
+
+Каждый запрос, выполняемый через реестр statements, учитывается под именем
+метода DatabaseQueries: число вызовов и ошибок, число строк и гистограмма
+длительности. Запросы дольше FSTR_SLOW_QUERY_MS миллисекунд (по умолчанию 500,
+0 - отключить) пишутся в лог app.database.slow_queries.
+Дополнительные обработчики (например, экспорт метрик) подключаются через
+add_query_listener.
+"""
+import bisect
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+slow_query_log = logging.getLogger('app.database.slow_queries')
+
+# Верхние границы корзин гистограммы, секунды
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class QueryStat:
+    __slots__ = ('count', 'errors', 'rows', 'total', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.rows = 0
+        self.total = 0.0
+        # Последняя корзина - запросы дольше DURATION_BUCKETS[-1]
+        self.buckets = [0] * (len(DURATION_BUCKETS) + 1)
+
+
+class QueryStats:
+    """Агрегированная статистика запросов процесса по именам"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, name: str, duration: float, rows: int = 0, error: bool = False):
+        bucket = bisect.bisect_left(DURATION_BUCKETS, duration)
+        with self._lock:
+            stat = self._stats.get(name)
+            if stat is None:
+                stat = self._stats[name] = QueryStat()
+            stat.count += 1
+            stat.total += duration
+            stat.buckets[bucket] += 1
+            if error:
+                stat.errors += 1
+            elif rows > 0:
+                stat.rows += rows
+
+    def snapshot(self):
+        """
+        Копия статистики: {имя: {"count", "errors", "rows", "sum", "buckets"}},
+        buckets - накопленные счётчики по DURATION_BUCKETS и +Inf.
+        """
+        with self._lock:
+            result = {}
+            for name, stat in self._stats.items():
+                cumulative, running = [], 0
+                for value in stat.buckets:
+                    running += value
+                    cumulative.append(running)
+                result[name] = {
+                    "count": stat.count,
+                    "errors": stat.errors,
+                    "rows": stat.rows,
+                    "sum": stat.total,
+                    "buckets": cumulative,
+                }
+            return result
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+query_stats = QueryStats()
+
+_listeners = []
+
+
+def add_query_listener(listener):
+    """listener(name, duration, rows, error) вызывается после каждого запроса"""
+    _listeners.append(listener)
+
+
+def remove_query_listener(listener):
+    _listeners.remove(listener)
+
+
+def slow_query_threshold() -> float:
+    """Порог медленного запроса в секундах (0 - лог отключён)"""
+    return float(os.getenv('FSTR_SLOW_QUERY_MS', '500')) / 1000
+
+
+_slow_threshold = slow_query_threshold()
+
+
+def record_query(name: str, duration: float, rows: int = 0, error: bool = False):
+    query_stats.record(name, duration, rows, error)
+    if _slow_threshold and duration >= _slow_threshold:
+        slow_query_log.warning(
+            "slow query %s: %.1f ms, %d rows%s",
+            name, duration * 1000, max(rows, 0), " (failed)" if error else ""
+        )
+    for listener in _listeners:
+        listener(name, duration, rows, error)
+
+
+@contextmanager
+def timed_query(name: str, cursor=None):
+    """
+    Замеряет выполнение запроса name внутри блока. Число строк берётся
+    из cursor.rowcount (-1, если неизвестно).
+    """
+    start = time.perf_counter()
+    error = False
+    try:
+        yield
+    except Exception:
+        error = True
+        raise
+    finally:
+        rows = getattr(cursor, 'rowcount', 0) if not error else 0
+        record_query(name, time.perf_counter() - start, rows or 0, error)
@@ -1,154 +1,229 @@
 import os
+from contextlib import contextmanager
+
 import psycopg2
-from psycopg2 import sql
+from psycopg2.extras import RealDictCursor, execute_values
+
+from app.database.instrumentation import timed_query
+from app.database.models import DatabaseQueries
+from app.database.pool import get_pool
+from app.database.statements import PreparingConnection, execute_sync
+from app.storage.blob import store_image
+
 
+class DatabaseConfig:
+    """Параметры подключения и пула из переменных окружения FSTR_DB_*"""
 
-class DatabaseManager:
     def __init__(self):
         self.db_host = os.getenv('FSTR_DB_HOST')
         self.db_port = os.getenv('FSTR_DB_PORT')
         self.db_login = os.getenv('FSTR_DB_LOGIN')
         self.db_pass = os.getenv('FSTR_DB_PASS')
         self.db_name = os.getenv('FSTR_DB_NAME', 'fstr')
+        self.pooled = os.getenv('FSTR_DB_POOL_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+        self.pool_min = int(os.getenv('FSTR_DB_POOL_MIN', '1'))
+        self.pool_max = int(os.getenv('FSTR_DB_POOL_MAX', '10'))
+        self.pool_recycle = int(os.getenv('FSTR_DB_POOL_RECYCLE', '3600'))
+        self.pool_check_idle = int(os.getenv('FSTR_DB_POOL_CHECK_IDLE', '30'))
+        self.pool_timeout = float(os.getenv('FSTR_DB_POOL_TIMEOUT', '30'))
+
+    def _connect_kwargs(self):
+        return {
+            "host": self.db_host,
+            "port": self.db_port,
+            "user": self.db_login,
+            "password": self.db_pass,
+            "database": self.db_name,
+        }
+
+    def _pool_settings(self):
+        return {
+            "minconn": self.pool_min,
+            "maxconn": self.pool_max,
+            "recycle": self.pool_recycle,
+            "check_idle": self.pool_check_idle,
+            "timeout": self.pool_timeout,
+        }
+
+
+class DatabaseManager(DatabaseConfig):
+    def __init__(self):
+        super().__init__()
         self.conn = None
 
-    def connect(self):
-        self.conn = psycopg2.connect(
-            host=self.db_host,
-            port=self.db_port,
-            user=self.db_login,
-            password=self.db_pass,
-            database=self.db_name
+    @property
+    def pool(self):
+        return get_pool(
+            self._pool_settings(), **self._connect_kwargs(), connection_factory=PreparingConnection
         )
 
+    def connect(self):
+        if self.pooled:
+            self.conn = self.pool.getconn()
+        else:
+            self.conn = psycopg2.connect(**self._connect_kwargs(), connection_factory=PreparingConnection)
+
     def disconnect(self):
         if self.conn:
-            self.conn.close()
+            if self.pooled:
+                self.pool.putconn(self.conn)
+            else:
+                self.conn.close()
+            self.conn = None
+
+    @contextmanager
+    def connection(self):
+        """
+        Выдаёт соединение из пула на время блока и возвращает его обратно.
+        Незакоммиченная транзакция при возврате откатывается.
+        """
+        if self.pooled:
+            conn = self.pool.getconn()
+            try:
+                yield conn
+            finally:
+                self.pool.putconn(conn)
+        else:
+            conn = psycopg2.connect(**self._connect_kwargs(), connection_factory=PreparingConnection)
+            try:
+                yield conn
+            finally:
+                conn.close()
 
     def add_user(self, email, phone, fam, name, otc=None):
-        try:
-            self.connect()
-            with self.conn.cursor() as cursor:
-                query = sql.SQL("""
-                    INSERT INTO users (email, phone, fam, name, otc)
-                    VALUES (%s, %s, %s, %s, %s)
-                    RETURNING id
-                """)
-                cursor.execute(query, (email, phone, fam, name, otc))
-                user_id = cursor.fetchone()[0]
-                self.conn.commit()
-                return user_id
-        except Exception as e:
-            self.conn.rollback()
-            raise e
-        finally:
-            self.disconnect()
+        with self.connection() as conn:
+            try:
+                with conn.cursor() as cursor:
+                    execute_sync(cursor, 'create_user', (email, phone, fam, name, otc))
+                    user_id = cursor.fetchone()[0]
+                    conn.commit()
+                    return user_id
+            except Exception as e:
+                conn.rollback()
+                raise e
+
+    def get_or_create_user(self, email, phone, fam, name, otc=None):
+        """Возвращает id пользователя с данным email, создавая или обновляя его профиль"""
+        with self.connection() as conn:
+            try:
+                with conn.cursor() as cursor:
+                    execute_sync(cursor, 'upsert_user', (email, phone, fam, name, otc))
+                    user_id = cursor.fetchone()[0]
+                    conn.commit()
+                    return user_id
+            except Exception as e:
+                conn.rollback()
+                raise e
 
     def add_coords(self, latitude, longitude, height):
-        try:
-            self.connect()
-            with self.conn.cursor() as cursor:
-                query = sql.SQL("""
-                    INSERT INTO coords (latitude, longitude, height)
-                    VALUES (%s, %s, %s)
-                    RETURNING id
-                """)
-                cursor.execute(query, (latitude, longitude, height))
-                coord_id = cursor.fetchone()[0]
-                self.conn.commit()
-                return coord_id
-        except Exception as e:
-            self.conn.rollback()
-            raise e
-        finally:
-            self.disconnect()
+        with self.connection() as conn:
+            try:
+                with conn.cursor() as cursor:
+                    execute_sync(cursor, 'create_coords', (latitude, longitude, height))
+                    coord_id = cursor.fetchone()[0]
+                    conn.commit()
+                    return coord_id
+            except Exception as e:
+                conn.rollback()
+                raise e
 
     def add_pereval(self, user_id, beauty_title, title, other_titles, connect, add_time, coord_id):
-        try:
-            self.connect()
-            with self.conn.cursor() as cursor:
-                query = sql.SQL("""
-                    INSERT INTO pereval_added 
-                    (user_id, beauty_title, title, other_titles, connect, add_time, coord_id, status)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, 'new')
-                    RETURNING id
-                """)
-                cursor.execute(query, (user_id, beauty_title, title, other_titles, connect, add_time, coord_id))
-                pereval_id = cursor.fetchone()[0]
-                self.conn.commit()
-                return pereval_id
-        except Exception as e:
-            self.conn.rollback()
-            raise e
-        finally:
-            self.disconnect()
+        with self.connection() as conn:
+            try:
+                with conn.cursor() as cursor:
+                    execute_sync(cursor, 'create_pereval', (user_id, beauty_title, title, other_titles, connect, add_time, coord_id))
+                    pereval_id = cursor.fetchone()[0]
+                    conn.commit()
+                    return pereval_id
+            except Exception as e:
+                conn.rollback()
+                raise e
 
     def add_image(self, pereval_id, img, title):
-        try:
-            self.connect()
-            with self.conn.cursor() as cursor:
-                query = sql.SQL("""
-                    INSERT INTO images (pereval_id, img, title)
-                    VALUES (%s, %s, %s)
-                    RETURNING id
-                """)
-                cursor.execute(query, (pereval_id, img, title))
-                image_id = cursor.fetchone()[0]
-                self.conn.commit()
-                return image_id
-        except Exception as e:
-            self.conn.rollback()
-            raise e
-        finally:
-            self.disconnect()
+        img_hash, img_size, mime_type = store_image(img)
+        with self.connection() as conn:
+            try:
+                with conn.cursor() as cursor:
+                    execute_sync(cursor, 'create_image', (pereval_id, img_hash, img_size, mime_type, title))
+                    image_id = cursor.fetchone()[0]
+                    conn.commit()
+                    return image_id
+            except Exception as e:
+                conn.rollback()
+                raise e
+
+    @classmethod
+    def insert_images(cls, cursor, pereval_id, images, page_size=100):
+        """
+        Сохраняет изображения в хранилище blob-ов и вставляет их строки пакетно
+        (по page_size строк на запрос) в рамках текущей транзакции курсора.
+        Возвращает id новых изображений.
+        """
+        stored_images = [(*store_image(img), title) for img, title in images]
+        return cls.insert_stored_images(cursor, pereval_id, stored_images, page_size)
+
+    @staticmethod
+    def insert_stored_images(cursor, pereval_id, stored_images, page_size=100):
+        """
+        Пакетная вставка строк images для изображений, уже лежащих в хранилище.
+        stored_images - список (img_hash, img_size, mime_type, title).
+        """
+        if not stored_images:
+            return []
+        with timed_query('create_images', cursor):
+            rows = execute_values(
+                cursor,
+                DatabaseQueries.create_images(),
+                [(pereval_id, *image) for image in stored_images],
+                page_size=page_size,
+                fetch=True
+            )
+        return [row[0] for row in rows]
+
+    def add_images(self, pereval_id, images):
+        with self.connection() as conn:
+            try:
+                with conn.cursor() as cursor:
+                    image_ids = self.insert_images(cursor, pereval_id, images)
+                    conn.commit()
+                    return image_ids
+            except Exception as e:
+                conn.rollback()
+                raise e
+
+    def submit_pereval(self, user, coords, pereval, images, stored_images=()):
+        """
+        Добавляет перевал вместе с пользователем, координатами и изображениями
+        в одной транзакции на одном соединении. При ошибке не остаётся ни одной записи.
+        Пользователь с уже известным email не дублируется, а обновляется.
+        images - список пар (img, title), img - байты изображения;
+        stored_images - уже сохранённые в хранилище изображения (см. insert_stored_images).
+        """
+        with self.connection() as conn:
+            try:
+                with conn.cursor() as cursor:
+                    execute_sync(cursor, 'create_submission', (
+                        user['email'], user['phone'], user['fam'], user['name'], user.get('otc'),
+                        coords['latitude'], coords['longitude'], coords['height'],
+                        pereval.get('beauty_title'), pereval['title'], pereval.get('other_titles'),
+                        pereval.get('connect'), pereval.get('add_time')
+                    ))
+                    pereval_id = cursor.fetchone()[0]
+                    self.insert_images(cursor, pereval_id, images)
+                    self.insert_stored_images(cursor, pereval_id, stored_images)
+                    conn.commit()
+                    return pereval_id
+            except Exception as e:
+                conn.rollback()
+                raise e
 
     def get_pereval(self, pereval_id: int):
-        try:
-            self.connect()
-            with self.conn.cursor() as cursor:
-                # Получение данных о перевале
-                cursor.execute("""
-                    SELECT p.id, p.beauty_title, p.title, p.other_titles, p.connect, 
-                           p.add_time, p.status, 
-                           c.latitude, c.longitude, c.height,
-                           u.email, u.phone, u.fam, u.name, u.otc
-                    FROM pereval_added p
-                    JOIN coords c ON p.coord_id = c.id
-                    JOIN users u ON p.user_id = u.id
-                    WHERE p.id = %s
-                """, (pereval_id,))
-                return cursor.fetchone()
-        except Exception as e:
-            raise e
-        finally:
-            self.disconnect()
-
-    def get_pereval_images(self, pereval_id: int):
-        try:
-            self.connect()
-            with self.conn.cursor() as cursor:
-                cursor.execute("""
-                    SELECT img, title FROM images
-                    WHERE pereval_id = %s
-                """, (pereval_id,))
-                return cursor.fetchall()
-        except Exception as e:
-            raise e
-        finally:
-            self.disconnect()
-
-    def get_user_perevals(self, email: str):
-        try:
-            self.connect()
-            with self.conn.cursor() as cursor:
-                cursor.execute("""
-                    SELECT p.id, p.beauty_title, p.title, p.status
-                    FROM pereval_added p
-                    JOIN users u ON p.user_id = u.id
-                    WHERE u.email = %s
-                """, (email,))
-                return cursor.fetchall()
-        except Exception as e:
-            raise e
-        finally:
-            self.disconnect()
\ No newline at end of file
+        """Перевал вместе с изображениями в виде словаря (см. DatabaseQueries.get_pereval_by_id)"""
+        with self.connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            execute_sync(cursor, 'get_pereval_by_id', (pereval_id,))
+            return cursor.fetchone()
+
+    def get_image(self, pereval_id: int, image_id: int):
+        with self.connection() as conn, conn.cursor() as cursor:
+            execute_sync(cursor, 'get_image', (image_id, pereval_id))
+            return cursor.fetchone()
@@ -0,0 +1,276 @@
+"""
+Версионные миграции схемы БД.
+
+Применённые версии хранятся в таблице schema_migrations. Каждая миграция
+выполняется в своей транзакции под advisory-блокировкой, поэтому несколько
+процессов, стартующих одновременно, не применят её дважды.
+
+SQL каждой миграции зафиксирован таким, каким схема была в её версии, и
+после выпуска не меняется: модели в models.py описывают текущую схему, а
+каждое её изменение добавляется сюда новой миграцией. IF NOT EXISTS в
+первых миграциях нужен для баз, созданных до появления миграций.
+
+Запуск из командной строки:
+    python -m app.database.migrations [upgrade|status]
+"""
+import argparse
+from dataclasses import dataclass
+from typing import Callable, List, Union
+
+from app.database.manager import DatabaseManager
+from app.storage.blob import store_image
+
+# Произвольная константа для pg_advisory_xact_lock
+MIGRATIONS_LOCK_ID = 72010901
+
+Step = Union[str, Callable]
+
+
+@dataclass
+class Migration:
+    """Миграция: шаги - SQL-строки или функции, принимающие курсор"""
+    version: int
+    name: str
+    steps: List[Step]
+
+
+def _move_image_blobs(cursor):
+    """Переносит изображения из колонки img BYTEA в хранилище blob-ов"""
+    cursor.execute("""
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'images' AND column_name = 'img'
+    """)
+    if not cursor.fetchone():
+        return
+    cursor.execute("""
+        ALTER TABLE images
+            ADD COLUMN IF NOT EXISTS img_hash CHAR(64),
+            ADD COLUMN IF NOT EXISTS img_size INTEGER,
+            ADD COLUMN IF NOT EXISTS mime_type VARCHAR(100)
+    """)
+    last_id = 0
+    while True:
+        cursor.execute("""
+            SELECT id, img FROM images
+            WHERE id > %s AND img_hash IS NULL
+            ORDER BY id
+            LIMIT 100
+        """, (last_id,))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        for image_id, img in rows:
+            img_hash, img_size, mime_type = store_image(bytes(img))
+            cursor.execute(
+                "UPDATE images SET img_hash = %s, img_size = %s, mime_type = %s WHERE id = %s",
+                (img_hash, img_size, mime_type, image_id)
+            )
+        last_id = rows[-1][0]
+    cursor.execute("""
+        ALTER TABLE images
+            ALTER COLUMN img_hash SET NOT NULL,
+            ALTER COLUMN img_size SET NOT NULL,
+            ALTER COLUMN mime_type SET NOT NULL,
+            DROP COLUMN img
+    """)
+
+
+MIGRATIONS = [
+    Migration(1, "initial schema", [
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id SERIAL PRIMARY KEY,
+            email VARCHAR(255) NOT NULL UNIQUE,
+            phone VARCHAR(20) NOT NULL,
+            fam VARCHAR(80) NOT NULL,
+            name VARCHAR(80) NOT NULL,
+            otc VARCHAR(80)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS coords (
+            id SERIAL PRIMARY KEY,
+            latitude DECIMAL(10, 7) NOT NULL,
+            longitude DECIMAL(10, 7) NOT NULL,
+            height INTEGER NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS pereval_added (
+            id SERIAL PRIMARY KEY,
+            date_added TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            user_id INTEGER NOT NULL REFERENCES users(id),
+            beauty_title VARCHAR(255),
+            title VARCHAR(255) NOT NULL,
+            other_titles VARCHAR(255),
+            connect VARCHAR(255),
+            add_time TIME,
+            status VARCHAR(10) DEFAULT 'new' CHECK (status IN ('new', 'pending', 'accepted', 'rejected')),
+            coord_id INTEGER NOT NULL REFERENCES coords(id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS images (
+            id SERIAL PRIMARY KEY,
+            pereval_id INTEGER REFERENCES pereval_added(id),
+            img_hash CHAR(64) NOT NULL,
+            img_size INTEGER NOT NULL,
+            mime_type VARCHAR(100) NOT NULL,
+            title VARCHAR(255) NOT NULL
+        )
+        """,
+    ]),
+    Migration(2, "move images to blob store", [_move_image_blobs]),
+    Migration(3, "indexes for lookups by pereval, user, status and coords", [
+        "CREATE INDEX IF NOT EXISTS pereval_added_user_id_idx ON pereval_added (user_id)",
+        "CREATE INDEX IF NOT EXISTS pereval_added_status_idx ON pereval_added (status)",
+        "CREATE INDEX IF NOT EXISTS pereval_added_coord_id_idx ON pereval_added (coord_id)",
+        "CREATE INDEX IF NOT EXISTS images_pereval_id_idx ON images (pereval_id)",
+    ]),
+    Migration(4, "keyset pagination index for user perevals", [
+        "CREATE INDEX IF NOT EXISTS pereval_added_user_id_id_idx ON pereval_added (user_id, id)",
+        "DROP INDEX IF EXISTS pereval_added_user_id_idx",
+    ]),
+    Migration(5, "trigram indexes for user search", [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE INDEX IF NOT EXISTS users_email_trgm_idx ON users USING gin (email gin_trgm_ops)",
+        """
+        CREATE INDEX IF NOT EXISTS users_search_trgm_idx ON users
+        USING gin ((email || ' ' || fam || ' ' || name) gin_trgm_ops)
+        """,
+    ]),
+    Migration(6, "idempotency keys for batch submissions", [
+        """
+        CREATE TABLE IF NOT EXISTS submission_keys (
+            key VARCHAR(255) PRIMARY KEY,
+            pereval_id INTEGER NOT NULL REFERENCES pereval_added(id) ON DELETE CASCADE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+    Migration(7, "spatial index on coords", [
+        "CREATE INDEX IF NOT EXISTS coords_point_gist_idx ON coords "
+        "USING gist (point(longitude::float8, latitude::float8))",
+    ]),
+    Migration(8, "image renditions", [
+        """
+        CREATE TABLE IF NOT EXISTS image_renditions (
+            img_hash CHAR(64) NOT NULL,
+            name VARCHAR(20) NOT NULL,
+            rendition_hash CHAR(64) NOT NULL,
+            img_size INTEGER NOT NULL,
+            mime_type VARCHAR(100) NOT NULL,
+            PRIMARY KEY (img_hash, name)
+        )
+        """,
+    ]),
+    Migration(9, "moderation claims and queue index", [
+        """
+        ALTER TABLE pereval_added
+            ADD COLUMN IF NOT EXISTS claimed_by VARCHAR(255),
+            ADD COLUMN IF NOT EXISTS claimed_at TIMESTAMP
+        """,
+        "CREATE INDEX IF NOT EXISTS pereval_added_moderation_idx ON pereval_added (status, id) "
+        "WHERE status IN ('new', 'pending')",
+        "DROP INDEX IF EXISTS pereval_added_status_idx",
+    ]),
+    Migration(10, "background jobs", [
+        """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id BIGSERIAL PRIMARY KEY,
+            kind VARCHAR(50) NOT NULL,
+            payload JSONB NOT NULL DEFAULT '{}',
+            status VARCHAR(10) NOT NULL DEFAULT 'queued'
+                CHECK (status IN ('queued', 'running', 'done', 'failed')),
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL DEFAULT 5,
+            run_after TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            locked_at TIMESTAMP,
+            last_error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS jobs_pending_idx ON jobs (run_after, id) "
+        "WHERE status IN ('queued', 'running')",
+    ]),
+    Migration(11, "blob hash indexes for orphan sweep", [
+        "CREATE INDEX IF NOT EXISTS images_img_hash_idx ON images (img_hash)",
+        "CREATE INDEX IF NOT EXISTS image_renditions_rendition_hash_idx ON image_renditions (rendition_hash)",
+    ]),
+]
+
+
+def _ensure_migrations_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def applied_versions(conn):
+    with conn.cursor() as cursor:
+        _ensure_migrations_table(cursor)
+        cursor.execute("SELECT version FROM schema_migrations")
+        versions = {row[0] for row in cursor.fetchall()}
+    conn.commit()
+    return versions
+
+
+def apply_migrations(conn, migrations=None):
+    """Применяет по порядку ещё не применённые миграции; возвращает их версии"""
+    applied = []
+    for migration in sorted(migrations or MIGRATIONS, key=lambda m: m.version):
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATIONS_LOCK_ID,))
+                _ensure_migrations_table(cursor)
+                cursor.execute("SELECT 1 FROM schema_migrations WHERE version = %s", (migration.version,))
+                if cursor.fetchone():
+                    conn.rollback()
+                    continue
+                for step in migration.steps:
+                    if callable(step):
+                        step(cursor)
+                    else:
+                        cursor.execute(step)
+                cursor.execute(
+                    "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                    (migration.version, migration.name)
+                )
+            conn.commit()
+            applied.append(migration.version)
+        except Exception as e:
+            conn.rollback()
+            raise e
+    return applied
+
+
+def run_migrations():
+    with DatabaseManager().connection() as conn:
+        return apply_migrations(conn)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Миграции схемы БД FSTR")
+    parser.add_argument("command", nargs="?", default="upgrade", choices=["upgrade", "status"])
+    args = parser.parse_args(argv)
+
+    if args.command == "upgrade":
+        applied = run_migrations()
+        if applied:
+            print("Применены миграции: " + ", ".join(str(v) for v in applied))
+        else:
+            print("Схема БД актуальна")
+    else:
+        with DatabaseManager().connection() as conn:
+            versions = applied_versions(conn)
+        for migration in MIGRATIONS:
+            mark = "x" if migration.version in versions else " "
+            print(f"[{mark}] {migration.version:04d} {migration.name}")
+
+
+if __name__ == "__main__":
+    main()
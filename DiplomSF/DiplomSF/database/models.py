@@ -27,6 +27,18 @@ class User:
         )
         """
 
+    @staticmethod
+    def create_indexes_queries() -> List[str]:
+        """SQL-запросы для создания триграммных индексов поиска пользователей"""
+        return [
+            "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+            "CREATE INDEX IF NOT EXISTS users_email_trgm_idx ON users USING gin (email gin_trgm_ops)",
+            """
+            CREATE INDEX IF NOT EXISTS users_search_trgm_idx ON users
+            USING gin ((email || ' ' || fam || ' ' || name) gin_trgm_ops)
+            """,
+        ]
+
 
 @dataclass
 class Coords:
@@ -48,13 +60,26 @@ class Coords:
         )
         """
 
+    @staticmethod
+    def create_indexes_queries() -> List[str]:
+        """
+        Пространственный GiST-индекс по выражению point(долгота, широта):
+        встроенные геометрические типы PostgreSQL, без PostGIS
+        """
+        return [
+            "CREATE INDEX IF NOT EXISTS coords_point_gist_idx ON coords "
+            "USING gist (point(longitude::float8, latitude::float8))",
+        ]
+
 
 @dataclass
 class Image:
-    """Модель изображения"""
+    """Модель изображения (сами данные лежат в хранилище blob-ов по img_hash)"""
     id: int
     pereval_id: int
-    img: bytes
+    img_hash: str
+    img_size: int
+    mime_type: str
     title: str
 
     @staticmethod
@@ -64,11 +89,22 @@ class Image:
         CREATE TABLE IF NOT EXISTS images (
             id SERIAL PRIMARY KEY,
             pereval_id INTEGER REFERENCES pereval_added(id),
-            img BYTEA NOT NULL,
+            img_hash CHAR(64) NOT NULL,
+            img_size INTEGER NOT NULL,
+            mime_type VARCHAR(100) NOT NULL,
             title VARCHAR(255) NOT NULL
         )
         """
 
+    @staticmethod
+    def create_indexes_queries() -> List[str]:
+        """SQL-запросы для создания индексов таблицы изображений"""
+        return [
+            "CREATE INDEX IF NOT EXISTS images_pereval_id_idx ON images (pereval_id)",
+            # Поиск по содержимому: PATCH по img_hash и чистка blob-ов без ссылок
+            "CREATE INDEX IF NOT EXISTS images_img_hash_idx ON images (img_hash)",
+        ]
+
 
 @dataclass
 class Pereval:
@@ -83,6 +119,9 @@ class Pereval:
     add_time: Optional[str]
     status: str
     coord_id: int
+    # Модератор, взявший перевал в работу (статус pending), и время этого
+    claimed_by: Optional[str] = None
+    claimed_at: Optional[datetime] = None
 
     @staticmethod
     def create_table_query() -> str:
@@ -98,10 +137,118 @@ class Pereval:
             connect VARCHAR(255),
             add_time TIME,
             status VARCHAR(10) DEFAULT 'new' CHECK (status IN ('new', 'pending', 'accepted', 'rejected')),
-            coord_id INTEGER NOT NULL REFERENCES coords(id)
+            coord_id INTEGER NOT NULL REFERENCES coords(id),
+            claimed_by VARCHAR(255),
+            claimed_at TIMESTAMP
+        )
+        """
+
+    @staticmethod
+    def create_indexes_queries() -> List[str]:
+        """SQL-запросы для создания индексов таблицы перевалов"""
+        return [
+            "CREATE INDEX IF NOT EXISTS pereval_added_user_id_id_idx ON pereval_added (user_id, id)",
+            # Очередь модерации: частичный индекс только по необработанным перевалам
+            "CREATE INDEX IF NOT EXISTS pereval_added_moderation_idx ON pereval_added (status, id) "
+            "WHERE status IN ('new', 'pending')",
+            "CREATE INDEX IF NOT EXISTS pereval_added_coord_id_idx ON pereval_added (coord_id)",
+        ]
+
+
+@dataclass
+class ImageRendition:
+    """Уменьшенная копия изображения (общая для всех изображений с одинаковым img_hash)"""
+    img_hash: str
+    name: str
+    rendition_hash: str
+    img_size: int
+    mime_type: str
+
+    @staticmethod
+    def create_table_query() -> str:
+        """
+        SQL-запрос для создания таблицы копий изображений.
+        Если копия не нужна (оригинал меньше её размера), rendition_hash = img_hash
+        """
+        return """
+        CREATE TABLE IF NOT EXISTS image_renditions (
+            img_hash CHAR(64) NOT NULL,
+            name VARCHAR(20) NOT NULL,
+            rendition_hash CHAR(64) NOT NULL,
+            img_size INTEGER NOT NULL,
+            mime_type VARCHAR(100) NOT NULL,
+            PRIMARY KEY (img_hash, name)
         )
         """
 
+    @staticmethod
+    def create_indexes_queries() -> List[str]:
+        """Индекс для проверки, ссылается ли какая-нибудь копия на blob"""
+        return [
+            "CREATE INDEX IF NOT EXISTS image_renditions_rendition_hash_idx ON image_renditions (rendition_hash)",
+        ]
+
+
+@dataclass
+class SubmissionKey:
+    """Ключ идемпотентности, присланный клиентом вместе с перевалом"""
+    key: str
+    pereval_id: int
+    created_at: datetime
+
+    @staticmethod
+    def create_table_query() -> str:
+        """SQL-запрос для создания таблицы ключей идемпотентности"""
+        return """
+        CREATE TABLE IF NOT EXISTS submission_keys (
+            key VARCHAR(255) PRIMARY KEY,
+            pereval_id INTEGER NOT NULL REFERENCES pereval_added(id) ON DELETE CASCADE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+
+
+@dataclass
+class Job:
+    """Фоновая задача, выполняемая воркером (python -m app.jobs.worker)"""
+    id: int
+    kind: str
+    payload: Dict[str, Any]
+    status: str
+    attempts: int
+    max_attempts: int
+    run_after: datetime
+    locked_at: Optional[datetime]
+    last_error: Optional[str]
+    created_at: datetime
+
+    @staticmethod
+    def create_table_query() -> str:
+        """SQL-запрос для создания таблицы фоновых задач"""
+        return """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id BIGSERIAL PRIMARY KEY,
+            kind VARCHAR(50) NOT NULL,
+            payload JSONB NOT NULL DEFAULT '{}',
+            status VARCHAR(10) NOT NULL DEFAULT 'queued'
+                CHECK (status IN ('queued', 'running', 'done', 'failed')),
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL DEFAULT 5,
+            run_after TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            locked_at TIMESTAMP,
+            last_error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+
+    @staticmethod
+    def create_indexes_queries() -> List[str]:
+        """Частичный индекс по невыполненным задачам: выборка очереди не читает выполненные"""
+        return [
+            "CREATE INDEX IF NOT EXISTS jobs_pending_idx ON jobs (run_after, id) "
+            "WHERE status IN ('queued', 'running')",
+        ]
+
 
 class DatabaseQueries:
     """Класс с базовыми SQL-запросами для работы с БД"""
@@ -114,6 +261,57 @@ class DatabaseQueries:
     def get_user_by_email() -> str:
         return "SELECT id, email, phone, fam, name, otc FROM users WHERE email = %s"
 
+    @staticmethod
+    def get_users_page() -> str:
+        return """
+        SELECT id, email, phone, fam, name, otc FROM users
+        WHERE id > %s
+        ORDER BY id
+        LIMIT %s
+        """
+
+    @staticmethod
+    def get_users_offset_page() -> str:
+        """Устаревшая страница по offset (GET /users/?offset=): читает и отбрасывает offset строк"""
+        return """
+        SELECT id, email, phone, fam, name, otc FROM users
+        ORDER BY id
+        LIMIT %s OFFSET %s
+        """
+
+    @staticmethod
+    def search_users() -> str:
+        """
+        Поиск по email, фамилии и имени (users_search_trgm_idx), по убыванию схожести.
+        Страница начинается после (rank, id) из курсора; similarity() возвращает real,
+        поэтому ранг из курсора приводится к real, иначе равенство не сработает
+        """
+        return """
+        SELECT id, email, phone, fam, name, otc, rank FROM (
+            SELECT id, email, phone, fam, name, otc,
+                   similarity(email || ' ' || fam || ' ' || name, %s) AS rank
+            FROM users
+            WHERE (email || ' ' || fam || ' ' || name) ILIKE %s
+        ) found
+        WHERE rank < %s::real OR (rank = %s::real AND id > %s)
+        ORDER BY rank DESC, id
+        LIMIT %s
+        """
+
+    @staticmethod
+    def search_users_by_email() -> str:
+        """Поиск по части email (users_email_trgm_idx), по убыванию схожести; курсор как в search_users"""
+        return """
+        SELECT id, email, phone, fam, name, otc, rank FROM (
+            SELECT id, email, phone, fam, name, otc, similarity(email, %s) AS rank
+            FROM users
+            WHERE email ILIKE %s
+        ) found
+        WHERE rank < %s::real OR (rank = %s::real AND id > %s)
+        ORDER BY rank DESC, id
+        LIMIT %s
+        """
+
     @staticmethod
     def create_user() -> str:
         return """
@@ -122,6 +320,22 @@ class DatabaseQueries:
         RETURNING id
         """
 
+    @staticmethod
+    def upsert_user() -> str:
+        return """
+        INSERT INTO users (email, phone, fam, name, otc)
+        VALUES (%s, %s, %s, %s, %s)
+        ON CONFLICT (email) DO UPDATE
+        SET phone = EXCLUDED.phone, fam = EXCLUDED.fam,
+            name = EXCLUDED.name, otc = EXCLUDED.otc
+        RETURNING id
+        """
+
+    @staticmethod
+    def lock_user() -> str:
+        """Пользователь с блокировкой строки до конца транзакции (для частичного обновления)"""
+        return "SELECT id, email, phone, fam, name, otc FROM users WHERE id = %s FOR UPDATE"
+
     @staticmethod
     def update_user() -> str:
         return """
@@ -148,49 +362,395 @@ class DatabaseQueries:
         RETURNING id
         """
 
+    @staticmethod
+    def create_submission() -> str:
+        """
+        Пользователь (создаётся или обновляется по email), координаты и перевал
+        одним запросом (цепочка CTE с RETURNING id)
+        """
+        return """
+        WITH new_user AS (
+            INSERT INTO users (email, phone, fam, name, otc)
+            VALUES (%s, %s, %s, %s, %s)
+            ON CONFLICT (email) DO UPDATE
+            SET phone = EXCLUDED.phone, fam = EXCLUDED.fam,
+                name = EXCLUDED.name, otc = EXCLUDED.otc
+            RETURNING id
+        ), new_coords AS (
+            INSERT INTO coords (latitude, longitude, height)
+            VALUES (%s, %s, %s)
+            RETURNING id
+        )
+        INSERT INTO pereval_added
+        (user_id, beauty_title, title, other_titles, connect, add_time, coord_id, status)
+        SELECT new_user.id, %s, %s, %s, %s, %s::time, new_coords.id, 'new'
+        FROM new_user, new_coords
+        RETURNING id, user_id
+        """
+
+    @staticmethod
+    def create_submission_with_user_hint() -> str:
+        """
+        То же, что create_submission, для пользователя, id которого подсказал
+        кеш. Подсказка проверяется по таблице users: если строка с этим id,
+        email и профилем есть, она не перезаписывается и не блокируется;
+        иначе (email сменили, пользователя удалили, профиль изменился)
+        выполняется обычный upsert. Параметры: id из кеша, email и профиль
+        дважды, координаты, поля перевала.
+        """
+        return """
+        WITH known_user AS (
+            SELECT id FROM users
+            WHERE id = %s AND email = %s AND phone = %s AND fam = %s AND name = %s
+              AND otc IS NOT DISTINCT FROM %s
+        ), new_user AS (
+            INSERT INTO users (email, phone, fam, name, otc)
+            SELECT %s, %s, %s, %s, %s
+            WHERE NOT EXISTS (SELECT 1 FROM known_user)
+            ON CONFLICT (email) DO UPDATE
+            SET phone = EXCLUDED.phone, fam = EXCLUDED.fam,
+                name = EXCLUDED.name, otc = EXCLUDED.otc
+            RETURNING id
+        ), submitter AS (
+            SELECT id FROM known_user
+            UNION ALL
+            SELECT id FROM new_user
+        ), new_coords AS (
+            INSERT INTO coords (latitude, longitude, height)
+            VALUES (%s, %s, %s)
+            RETURNING id
+        )
+        INSERT INTO pereval_added
+        (user_id, beauty_title, title, other_titles, connect, add_time, coord_id, status)
+        SELECT submitter.id, %s, %s, %s, %s, %s::time, new_coords.id, 'new'
+        FROM submitter, new_coords
+        RETURNING id, user_id
+        """
+
+    @staticmethod
+    def create_submission_key() -> str:
+        """Запоминает ключ; если он уже занят, строка не возвращается"""
+        return """
+        INSERT INTO submission_keys (key, pereval_id)
+        VALUES (%s, %s)
+        ON CONFLICT (key) DO NOTHING
+        RETURNING key
+        """
+
+    @staticmethod
+    def get_submission_keys() -> str:
+        return "SELECT key, pereval_id FROM submission_keys WHERE key = ANY(%s)"
+
+    @staticmethod
+    def get_perevals_in_bbox() -> str:
+        """Перевалы в прямоугольнике (west, south, east, north), фильтр по статусу необязателен"""
+        return """
+        SELECT p.id, p.beauty_title, p.title, p.status, c.latitude, c.longitude, c.height
+        FROM coords c
+        JOIN pereval_added p ON p.coord_id = c.id
+        WHERE point(c.longitude::float8, c.latitude::float8) <@ box(point(%s, %s), point(%s, %s))
+          AND (%s::varchar IS NULL OR p.status = %s)
+        ORDER BY p.id
+        LIMIT %s
+        """
+
+    @staticmethod
+    def get_perevals_nearby() -> str:
+        """
+        Перевалы не дальше radius_km от точки, по возрастанию расстояния.
+        Параметры: широта, широта, долгота точки (для расстояния), прямоугольник
+        (west, south, east, north) для индекса, статус дважды, радиус, limit.
+        """
+        return """
+        SELECT * FROM (
+            SELECT p.id, p.beauty_title, p.title, p.status, c.latitude, c.longitude, c.height,
+                   2 * 6371.0 * asin(sqrt(
+                       power(sin(radians(c.latitude::float8 - %s) / 2), 2)
+                       + cos(radians(%s)) * cos(radians(c.latitude::float8))
+                       * power(sin(radians(c.longitude::float8 - %s) / 2), 2)
+                   )) AS distance_km
+            FROM coords c
+            JOIN pereval_added p ON p.coord_id = c.id
+            WHERE point(c.longitude::float8, c.latitude::float8) <@ box(point(%s, %s), point(%s, %s))
+              AND (%s::varchar IS NULL OR p.status = %s)
+        ) nearby
+        WHERE distance_km <= %s
+        ORDER BY distance_km, id
+        LIMIT %s
+        """
+
+    @staticmethod
+    def get_tile_clusters() -> str:
+        """
+        Принятые перевалы в границах тайла (west, south, east, north),
+        сгруппированные по ячейкам сетки Web Mercator. Последние два
+        параметра - число ячеек на весь мир по каждой оси (2^z * размер сетки).
+        """
+        return """
+        SELECT count(*) AS count,
+               avg(c.latitude)::float8 AS latitude,
+               avg(c.longitude)::float8 AS longitude,
+               min(p.id) AS id,
+               min(p.title) AS title
+        FROM coords c
+        JOIN pereval_added p ON p.coord_id = c.id
+        WHERE point(c.longitude::float8, c.latitude::float8) <@ box(point(%s, %s), point(%s, %s))
+          AND p.status = 'accepted'
+        GROUP BY
+            floor((c.longitude::float8 + 180) / 360 * %s),
+            floor((1 - ln(tan(radians(c.latitude::float8)) + 1 / cos(radians(c.latitude::float8))) / pi()) / 2 * %s)
+        """
+
+    @staticmethod
+    def get_moderation_queue() -> str:
+        return """
+        SELECT id, beauty_title, title, status, date_added, claimed_by, claimed_at
+        FROM pereval_added
+        WHERE status = %s AND id > %s
+        ORDER BY id
+        LIMIT %s
+        """
+
+    @staticmethod
+    def claim_perevals() -> str:
+        """
+        Переводит в pending до limit перевалов из очереди: новых и тех, чья
+        заявка старше claim_ttl секунд. Строки, заблокированные другим
+        модератором, пропускаются (SKIP LOCKED), поэтому заявки не пересекаются.
+        Параметры: модератор, claim_ttl, limit.
+        """
+        return """
+        UPDATE pereval_added
+        SET status = 'pending', claimed_by = %s, claimed_at = CURRENT_TIMESTAMP
+        WHERE id IN (
+            SELECT id FROM pereval_added
+            WHERE status = 'new'
+               OR (status = 'pending'
+                   AND (claimed_at IS NULL OR claimed_at < CURRENT_TIMESTAMP - make_interval(secs => %s)))
+            ORDER BY id
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING id, beauty_title, title, status, date_added, claimed_by, claimed_at
+        """
+
+    @staticmethod
+    def set_perevals_status() -> str:
+        """
+        Решение модератора по списку id. Меняются только перевалы в pending,
+        взятые в работу этим модератором; перевалы, уже получившие решение
+        или закреплённые за другим модератором, не меняются.
+        Параметры: статус, список id, модератор.
+        """
+        return """
+        UPDATE pereval_added p
+        SET status = %s
+        FROM coords c
+        WHERE c.id = p.coord_id AND p.id = ANY(%s) AND p.status = 'pending' AND p.claimed_by = %s
+        RETURNING p.id, c.latitude, c.longitude
+        """
+
     @staticmethod
     def get_pereval_by_id() -> str:
+        """
+        Перевал с координатами, пользователем и метаданными изображений
+        одной строкой: coords, user и images собираются в JSON на стороне БД,
+        колонки названы как поля ответа API.
+        """
         return """
-        SELECT p.id, p.beauty_title, p.title, p.other_titles, p.connect, 
-               p.add_time, p.status, 
-               c.latitude, c.longitude, c.height,
-               u.email, u.phone, u.fam, u.name, u.otc
+        SELECT p.id, p.status, p.beauty_title, p.title, p.other_titles, p.connect,
+               p.add_time::text AS add_time,
+               json_build_object(
+                   'latitude', c.latitude, 'longitude', c.longitude, 'height', c.height
+               ) AS coords,
+               json_build_object(
+                   'email', u.email, 'phone', u.phone, 'fam', u.fam, 'name', u.name, 'otc', u.otc
+               ) AS "user",
+               COALESCE((
+                   SELECT json_agg(json_build_object(
+                       'id', i.id, 'title', i.title, 'mime_type', i.mime_type, 'size', i.img_size
+                   ) ORDER BY i.id)
+                   FROM images i
+                   WHERE i.pereval_id = p.id
+               ), '[]'::json) AS images
         FROM pereval_added p
         JOIN coords c ON p.coord_id = c.id
         JOIN users u ON p.user_id = u.id
         WHERE p.id = %s
         """
 
+    # Поля pereval_added, которые можно менять через PATCH /submitData/{id}
+    PEREVAL_UPDATABLE_FIELDS = ('beauty_title', 'title', 'other_titles', 'connect', 'add_time')
+
+    @staticmethod
+    def lock_pereval() -> str:
+        """Статус перевала с блокировкой строки до конца транзакции"""
+        return "SELECT status FROM pereval_added WHERE id = %s FOR UPDATE"
+
+    @classmethod
+    def update_pereval_fields(cls, fields: List[str]) -> str:
+        """UPDATE только перечисленных полей; параметры - их значения и id"""
+        unknown = set(fields) - set(cls.PEREVAL_UPDATABLE_FIELDS)
+        if unknown:
+            raise ValueError(f"Fields can't be updated: {', '.join(sorted(unknown))}")
+        assignments = ', '.join(f"{field} = %s" for field in fields)
+        return f"UPDATE pereval_added SET {assignments} WHERE id = %s"
+
     @staticmethod
-    def update_pereval() -> str:
+    def update_pereval_coords() -> str:
         return """
-        UPDATE pereval_added
-        SET beauty_title = %s, title = %s, other_titles = %s,
-            connect = %s, add_time = %s, coord_id = %s
-        WHERE id = %s AND status = 'new'
-        RETURNING id
+        UPDATE coords
+        SET latitude = %s, longitude = %s, height = %s
+        WHERE id = (SELECT coord_id FROM pereval_added WHERE id = %s)
+        """
+
+    @staticmethod
+    def get_pereval_image_refs() -> str:
+        return "SELECT id, img_hash, title FROM images WHERE pereval_id = %s ORDER BY id"
+
+    @staticmethod
+    def get_stored_image() -> str:
+        """Размер и тип уже сохранённого изображения с данным img_hash"""
+        return "SELECT img_size, mime_type FROM images WHERE img_hash = %s LIMIT 1"
+
+    @staticmethod
+    def delete_orphan_renditions() -> str:
+        """Копии изображений, от которых не осталось ни одной строки images"""
+        return """
+        DELETE FROM image_renditions r
+        WHERE NOT EXISTS (SELECT 1 FROM images i WHERE i.img_hash = r.img_hash)
+        """
+
+    @staticmethod
+    def get_unreferenced_blobs() -> str:
+        """Хеши из списка, на которые не ссылаются ни images, ни image_renditions"""
+        return """
+        SELECT h FROM unnest(%s::char(64)[]) AS h
+        WHERE NOT EXISTS (SELECT 1 FROM images WHERE img_hash = h)
+          AND NOT EXISTS (SELECT 1 FROM image_renditions WHERE rendition_hash = h)
         """
 
     @staticmethod
-    def get_user_perevals() -> str:
+    def delete_images() -> str:
+        return "DELETE FROM images WHERE pereval_id = %s AND id = ANY(%s)"
+
+    @staticmethod
+    def update_image_title() -> str:
+        return "UPDATE images SET title = %s WHERE id = %s"
+
+    @staticmethod
+    def get_user_perevals_page() -> str:
         return """
         SELECT p.id, p.beauty_title, p.title, p.status
         FROM pereval_added p
         JOIN users u ON p.user_id = u.id
-        WHERE u.email = %s
+        WHERE u.email = %s AND p.id > %s
+        ORDER BY p.id
+        LIMIT %s
         """
 
     @staticmethod
     def create_image() -> str:
         return """
-        INSERT INTO images (pereval_id, img, title)
-        VALUES (%s, %s, %s)
+        INSERT INTO images (pereval_id, img_hash, img_size, mime_type, title)
+        VALUES (%s, %s, %s, %s, %s)
+        RETURNING id
+        """
+
+    @staticmethod
+    def create_images() -> str:
+        """Пакетная вставка изображений (для psycopg2.extras.execute_values)"""
+        return """
+        INSERT INTO images (pereval_id, img_hash, img_size, mime_type, title)
+        VALUES %s
         RETURNING id
         """
 
     @staticmethod
-    def get_images_for_pereval() -> str:
-        return "SELECT img, title FROM images WHERE pereval_id = %s"
+    def get_image() -> str:
+        return """
+        SELECT img_hash, img_size, mime_type FROM images
+        WHERE id = %s AND pereval_id = %s
+        """
+
+    @staticmethod
+    def get_image_rendition() -> str:
+        """Оригинал изображения и, если уже создана, его копия с данным названием"""
+        return """
+        SELECT i.img_hash, i.img_size, i.mime_type,
+               r.rendition_hash, r.img_size, r.mime_type
+        FROM images i
+        LEFT JOIN image_renditions r ON r.img_hash = i.img_hash AND r.name = %s
+        WHERE i.id = %s AND i.pereval_id = %s
+        """
+
+    @staticmethod
+    def create_image_rendition() -> str:
+        return """
+        INSERT INTO image_renditions (img_hash, name, rendition_hash, img_size, mime_type)
+        VALUES (%s, %s, %s, %s, %s)
+        ON CONFLICT (img_hash, name) DO NOTHING
+        """
+
+    @staticmethod
+    def enqueue_job() -> str:
+        """Добавляет задачу; уведомление воркерам уходит при коммите транзакции"""
+        return """
+        WITH job AS (
+            INSERT INTO jobs (kind, payload) VALUES (%s, %s)
+            RETURNING id
+        )
+        SELECT id, pg_notify('jobs', '') FROM job
+        """
+
+    @staticmethod
+    def claim_jobs() -> str:
+        """
+        Берёт до limit готовых к выполнению задач, а также задачи, зависшие
+        в running дольше timeout секунд (воркер упал). SKIP LOCKED не даёт
+        двум воркерам взять одну задачу. Параметры: timeout, limit.
+        """
+        return """
+        UPDATE jobs
+        SET status = 'running', locked_at = CURRENT_TIMESTAMP, attempts = attempts + 1
+        WHERE id IN (
+            SELECT id FROM jobs
+            WHERE (status = 'queued' AND run_after <= CURRENT_TIMESTAMP)
+               OR (status = 'running' AND locked_at < CURRENT_TIMESTAMP - make_interval(secs => %s))
+            ORDER BY run_after, id
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING id, kind, payload, attempts, max_attempts
+        """
+
+    @staticmethod
+    def complete_job() -> str:
+        return "UPDATE jobs SET status = 'done', locked_at = NULL, last_error = NULL WHERE id = %s"
+
+    @staticmethod
+    def retry_job() -> str:
+        """Возвращает задачу в очередь через delay секунд. Параметры: ошибка, delay, id"""
+        return """
+        UPDATE jobs
+        SET status = 'queued', locked_at = NULL, last_error = %s,
+            run_after = CURRENT_TIMESTAMP + make_interval(secs => %s)
+        WHERE id = %s
+        """
+
+    @staticmethod
+    def fail_job() -> str:
+        return "UPDATE jobs SET status = 'failed', locked_at = NULL, last_error = %s WHERE id = %s"
+
+    @staticmethod
+    def get_missing_renditions() -> str:
+        """Изображения перевала (img_hash, img_size, mime_type), для которых ещё нет копии с данным названием"""
+        return """
+        SELECT DISTINCT i.img_hash, i.img_size, i.mime_type
+        FROM images i
+        LEFT JOIN image_renditions r ON r.img_hash = i.img_hash AND r.name = %s
+        WHERE i.pereval_id = %s AND r.img_hash IS NULL
+        """
 
     @staticmethod
     def get_all_tables_creation_queries() -> List[str]:
@@ -199,5 +759,20 @@ class DatabaseQueries:
             User.create_table_query(),
             Coords.create_table_query(),
             Pereval.create_table_query(),
-            Image.create_table_query()
-        ]
\ No newline at end of file
+            Image.create_table_query(),
+            SubmissionKey.create_table_query(),
+            ImageRendition.create_table_query(),
+            Job.create_table_query()
+        ]
+
+    @staticmethod
+    def get_all_indexes_creation_queries() -> List[str]:
+        """Возвращает все SQL-запросы для создания индексов"""
+        return (
+            User.create_indexes_queries()
+            + Coords.create_indexes_queries()
+            + Pereval.create_indexes_queries()
+            + Image.create_indexes_queries()
+            + ImageRendition.create_indexes_queries()
+            + Job.create_indexes_queries()
+        )
\ No newline at end of file
@@ -0,0 +1,200 @@
+import asyncio
+import threading
+import time
+import weakref
+
+import psycopg2
+from psycopg2 import extensions
+from psycopg2 import pool as pg_pool
+from psycopg_pool import AsyncConnectionPool
+
+
+class ConnectionPool:
+    """Пул соединений с PostgreSQL с проверкой живости и пересозданием старых соединений"""
+
+    def __init__(self, minconn, maxconn, recycle=3600, check_idle=30, timeout=30, **connect_kwargs):
+        self.recycle = recycle
+        self.check_idle = check_idle
+        self.timeout = timeout
+        self._pool = pg_pool.ThreadedConnectionPool(minconn, maxconn, **connect_kwargs)
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+        self._created = {}
+        self._released = {}
+
+    def getconn(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise pg_pool.PoolError("connection pool exhausted")
+        try:
+            while True:
+                conn = self._pool.getconn()
+                if self._is_usable(conn):
+                    return conn
+                self._discard(conn)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn):
+        try:
+            if conn.closed or self._expired(conn):
+                self._discard(conn)
+                return
+            if conn.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    self._discard(conn)
+                    return
+            with self._lock:
+                self._released[id(conn)] = time.monotonic()
+            self._pool.putconn(conn)
+        finally:
+            self._slots.release()
+
+    def closeall(self):
+        self._pool.closeall()
+        with self._lock:
+            self._created.clear()
+            self._released.clear()
+
+    def stats(self):
+        """Текущее состояние пула: сколько соединений открыто и сколько из них выдано"""
+        with self._lock:
+            opened = len(self._created)
+        return {
+            "min": self._pool.minconn,
+            "max": self._pool.maxconn,
+            "open": opened,
+            "in_use": len(self._pool._used),
+        }
+
+    def _is_usable(self, conn):
+        if conn.closed:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            created = self._created.setdefault(id(conn), now)
+            released = self._released.pop(id(conn), now)
+        if self.recycle and now - created > self.recycle:
+            return False
+        if self.check_idle is not None and now - released >= self.check_idle:
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                conn.rollback()
+            except psycopg2.Error:
+                return False
+        return True
+
+    def _expired(self, conn):
+        with self._lock:
+            created = self._created.get(id(conn))
+        return bool(self.recycle) and created is not None and time.monotonic() - created > self.recycle
+
+    def _discard(self, conn):
+        with self._lock:
+            self._created.pop(id(conn), None)
+            self._released.pop(id(conn), None)
+        self._pool.putconn(conn, close=True)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(settings, **connect_kwargs):
+    """Возвращает общий для процесса пул для данных параметров подключения"""
+    key = tuple(sorted(connect_kwargs.items()))
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(**settings, **connect_kwargs)
+        return _pools[key]
+
+
+def close_all_pools():
+    """Закрывает все пулы процесса (вызывается при остановке приложения)"""
+    with _pools_lock:
+        for connection_pool in _pools.values():
+            connection_pool.closeall()
+        _pools.clear()
+
+
+def sync_pools_stats():
+    """[(имя БД, stats())] для всех пулов psycopg2 процесса"""
+    with _pools_lock:
+        pools = list(_pools.items())
+    return [(dict(key).get('database'), connection_pool.stats()) for key, connection_pool in pools]
+
+
+class AsyncIdleCheck:
+    """
+    Проверка живости для AsyncConnectionPool по тем же правилам, что у
+    ConnectionPool: SELECT 1 выполняется только для соединений, простоявших
+    в пуле не меньше check_idle секунд, а не при каждой выдаче.
+    reset() вызывается пулом при возврате соединения и запоминает это время.
+    """
+
+    def __init__(self, check_idle=30):
+        self.check_idle = check_idle
+        self._released = weakref.WeakKeyDictionary()
+
+    async def reset(self, conn):
+        self._released[conn] = time.monotonic()
+
+    async def check(self, conn):
+        if self.check_idle is None:
+            return
+        released = self._released.pop(conn, None)
+        if released is not None and time.monotonic() - released >= self.check_idle:
+            await AsyncConnectionPool.check_connection(conn)
+
+
+_async_pools = {}
+_async_pools_lock = asyncio.Lock()
+
+
+async def get_async_pool(settings, **connect_kwargs):
+    """Возвращает общий для процесса асинхронный пул, открывая его при первом обращении"""
+    key = tuple(sorted(connect_kwargs.items()))
+    async with _async_pools_lock:
+        if key not in _async_pools:
+            idle_check = AsyncIdleCheck(settings["check_idle"])
+            connection_pool = AsyncConnectionPool(
+                kwargs=connect_kwargs,
+                min_size=settings["minconn"],
+                max_size=settings["maxconn"],
+                max_lifetime=settings["recycle"],
+                timeout=settings["timeout"],
+                check=idle_check.check,
+                reset=idle_check.reset,
+                open=False
+            )
+            await connection_pool.open()
+            _async_pools[key] = connection_pool
+        return _async_pools[key]
+
+
+async def close_all_async_pools():
+    async with _async_pools_lock:
+        for connection_pool in _async_pools.values():
+            await connection_pool.close()
+        _async_pools.clear()
+
+
+def async_pools_stats():
+    """
+    [(имя БД, stats)] для всех асинхронных пулов процесса в том же виде,
+    что ConnectionPool.stats(), плюс число ожидающих соединения запросов
+    """
+    result = []
+    for key, connection_pool in list(_async_pools.items()):
+        stats = connection_pool.get_stats()
+        result.append((dict(key).get('dbname'), {
+            "min": stats["pool_min"],
+            "max": stats["pool_max"],
+            "open": stats["pool_size"],
+            "in_use": stats["pool_size"] - stats["pool_available"],
+            "waiting": stats.get("requests_waiting", 0),
+        }))
+    return result
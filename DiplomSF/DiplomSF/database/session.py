@@ -0,0 +1,13 @@
+from app.database.async_manager import AsyncDatabaseManager
+
+
+async def get_db():
+    """
+    Зависимость FastAPI: своя сессия (соединение из пула и транзакция) на каждый запрос.
+    Соединение берётся при первом запросе к БД: обработчик, ответивший из кеша,
+    пул не занимает. Откат при исключении в обработчике, иначе коммит после ответа;
+    если изменения должны быть зафиксированы до отправки ответа, обработчик
+    вызывает db.commit().
+    """
+    async with AsyncDatabaseManager().session() as db:
+        yield db
@@ -0,0 +1,127 @@
+"""
+Реестр SQL-запросов DatabaseQueries, выполняемых как подготовленные выражения.
+
+Каждый запрос без параметров построения (DatabaseQueries.get_image() и т.п.)
+регистрируется под именем своего метода. Запрос подготавливается на сервере
+один раз на соединение при первом выполнении, дальше выполняется по имени,
+без повторного разбора и планирования. Соединения живут в пулах, поэтому
+подготовленные выражения переиспользуются между запросами к API.
+
+Все запросы замеряются (см. instrumentation) под именем из реестра.
+
+Подготовку можно отключить переменной FSTR_DB_PREPARE=false - например, при
+работе через pgbouncer в режиме transaction, где соединение с сервером
+меняется между транзакциями.
+"""
+import inspect
+import os
+import re
+
+from psycopg2 import extensions
+
+from app.database.instrumentation import timed_query
+from app.database.models import DatabaseQueries
+
+_DML = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')
+
+
+def _build_registry():
+    statements = {}
+    for name, attr in vars(DatabaseQueries).items():
+        if not isinstance(attr, (staticmethod, classmethod)):
+            continue
+        method = getattr(DatabaseQueries, name)
+        if inspect.signature(method).parameters:
+            # Запрос собирается из аргументов (например, update_pereval_fields)
+            continue
+        query = method()
+        if isinstance(query, str) and query.lstrip().split(None, 1)[0].upper() in _DML:
+            statements[name] = query
+    return statements
+
+
+STATEMENTS = _build_registry()
+
+
+def get_statement(name: str) -> str:
+    try:
+        return STATEMENTS[name]
+    except KeyError:
+        raise KeyError(f"Unknown statement: {name}") from None
+
+
+def prepare_enabled() -> bool:
+    return os.getenv('FSTR_DB_PREPARE', 'true').lower() in ('1', 'true', 'yes')
+
+
+async def execute(cursor, name: str, params=None):
+    """
+    Выполняет запрос name из реестра на курсоре psycopg 3.
+    psycopg готовит выражение на соединении при первом вызове и хранит его
+    в кеше соединения (prepared_max), повторные вызовы идут по имени.
+    """
+    with timed_query(name, cursor):
+        await cursor.execute(get_statement(name), params, prepare=True if prepare_enabled() else None)
+    return cursor
+
+
+async def executemany(cursor, name: str, params_seq, returning=False):
+    """executemany запроса name из реестра (psycopg сам готовит повторяющийся запрос)"""
+    with timed_query(name, cursor):
+        await cursor.executemany(get_statement(name), params_seq, returning=returning)
+    return cursor
+
+
+async def execute_query(cursor, name: str, query: str, params=None):
+    """Замеряемое выполнение запроса, собранного из аргументов (не из реестра)"""
+    with timed_query(name, cursor):
+        await cursor.execute(query, params)
+    return cursor
+
+
+_PLACEHOLDER = re.compile(r'%(s|%)')
+
+
+def to_positional(query: str):
+    """Переводит %s в $1, $2, ... для PREPARE; возвращает (запрос, число параметров)"""
+    count = 0
+
+    def replace(match):
+        nonlocal count
+        if match.group(1) == '%':
+            return '%'
+        count += 1
+        return f"${count}"
+
+    return _PLACEHOLDER.sub(replace, query), count
+
+
+class PreparingConnection(extensions.connection):
+    """Соединение psycopg2, которое помнит подготовленные на нём выражения"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_statements = set()
+
+
+def execute_sync(cursor, name: str, params=()):
+    """
+    Выполняет запрос name из реестра на курсоре psycopg2 через PREPARE/EXECUTE.
+    Подготовленные выражения запоминаются только соединениями PreparingConnection,
+    на остальных запрос выполняется обычным образом.
+    PREPARE не откатывается вместе с транзакцией, поэтому имя запоминается сразу.
+    """
+    prepared = getattr(cursor.connection, 'prepared_statements', None)
+    with timed_query(name, cursor):
+        if prepared is None or not prepare_enabled():
+            cursor.execute(get_statement(name), params)
+            return cursor
+        if name not in prepared:
+            query, _ = to_positional(get_statement(name))
+            cursor.execute(f"PREPARE {name} AS {query}")
+            prepared.add(name)
+        if params:
+            cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+        else:
+            cursor.execute(f"EXECUTE {name}")
+    return cursor
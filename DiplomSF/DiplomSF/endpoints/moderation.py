@@ -0,0 +1,95 @@
+import os
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from typing import List, Optional
+from app.database.async_manager import AsyncDatabaseManager
+from app.database.session import get_db
+from app.schemas.moderation import ClaimRequest, DecisionRequest, DecisionResponse, QueueItem
+from app.utils.pagination import decode_cursor, paginate, NEXT_CURSOR_HEADER
+from app.utils.response_cache import invalidate_pereval, invalidate_tiles
+
+router = APIRouter()
+
+# Через сколько секунд незавершённая заявка модератора снова попадает в очередь
+CLAIM_TTL = float(os.getenv('FSTR_MODERATION_CLAIM_TTL', '1800'))
+
+
+# Очередь модерации
+@router.get("/queue", response_model=List[QueueItem])
+async def get_queue(
+        response: Response,
+        status: str = Query("new", regex="^(new|pending)$"),
+        limit: int = Query(50, gt=0, le=100),
+        cursor: Optional[str] = Query(None, description="Курсор из заголовка X-Next-Cursor предыдущей страницы"),
+        db: AsyncDatabaseManager = Depends(get_db)
+):
+    """
+    Перевалы со статусом new или pending по возрастанию id
+    с пагинацией по курсору.
+    """
+    try:
+        after_id = decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        rows = await db.get_moderation_queue(status, after_id, limit + 1)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    items, next_cursor = paginate(rows, limit)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return items
+
+
+# Взять перевалы в работу
+@router.post("/claim", response_model=List[QueueItem])
+async def claim(request: ClaimRequest, db: AsyncDatabaseManager = Depends(get_db)):
+    """
+    Переводит в pending до limit перевалов из очереди и закрепляет их
+    за модератором. Параллельные запросы получают разные перевалы.
+    """
+    try:
+        items = await db.claim_perevals(request.moderator, request.limit, CLAIM_TTL)
+        await db.commit()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    for item in items:
+        await invalidate_pereval(item["id"])
+    return items
+
+
+# Принять перевалы
+@router.post("/accept", response_model=DecisionResponse)
+async def accept(request: DecisionRequest, db: AsyncDatabaseManager = Depends(get_db)):
+    return await _decide(request, "accepted", db)
+
+
+# Отклонить перевалы
+@router.post("/reject", response_model=DecisionResponse)
+async def reject(request: DecisionRequest, db: AsyncDatabaseManager = Depends(get_db)):
+    return await _decide(request, "rejected", db)
+
+
+async def _decide(request, status, db):
+    """
+    Меняет статус перевалов, взятых в работу модератором, одним UPDATE
+    и сбрасывает кеш карточек и тайлов карты
+    """
+    pereval_ids = request.ids
+    try:
+        rows = await db.set_perevals_status(pereval_ids, status, request.moderator)
+        await db.commit()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    for pereval_id, latitude, longitude in rows:
+        await invalidate_pereval(pereval_id)
+        if status == "accepted":
+            await invalidate_tiles(float(latitude), float(longitude))
+
+    updated = sorted(row[0] for row in rows)
+    return {
+        "status": status,
+        "updated": updated,
+        "skipped": sorted(set(pereval_ids) - set(updated))
+    }
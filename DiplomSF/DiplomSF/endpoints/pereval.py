@@ -1,11 +1,30 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, EmailStr, Field, validator
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Query, Depends, Request, Response, Form, File, UploadFile, Body, Path
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, EmailStr, Field, ValidationError, root_validator, validator
+from typing import List, Optional, Dict, Any
+import asyncio
 import base64
 from datetime import time
-
-app = FastAPI()
-db_manager = DatabaseManager()
+from app.database.async_manager import AsyncDatabaseManager
+from app.database.models import DatabaseQueries
+from app.database.statements import execute
+from app.database.session import get_db
+from app.jobs.queue import enqueue_submission_jobs
+from app.schemas.pereval import PerevalResponse
+from app.storage.blob import get_blob_store, store_image, store_image_stream
+from app.storage.renditions import RENDITIONS, ensure_rendition, renditions_available
+from app.utils.exceptions import InvalidImageReference
+from app.utils.http import parse_range, etag_matches, RangeNotSatisfiable
+from app.utils.pagination import decode_cursor, paginate, NEXT_CURSOR_HEADER
+from app.utils.response_cache import (
+    cached_json_response, get_response_cache, invalidate_pereval, pereval_cache_key
+)
+
+router = APIRouter()
+
+# Limits for POST /submitData/batch: items per request and per transaction
+BATCH_MAX_ITEMS = 200
+BATCH_CHUNK_SIZE = 50
 
 
 class Coords(BaseModel):
@@ -27,7 +46,16 @@ class User(BaseModel):
     otc: Optional[str] = None
 
 
-class PerevalInput(BaseModel):
+def validate_time(v):
+    if v:
+        try:
+            time.fromisoformat(v)
+        except ValueError:
+            raise ValueError('Invalid time format, expected HH:MM:SS')
+    return v
+
+
+class PerevalData(BaseModel):
     beauty_title: Optional[str] = None
     title: str
     other_titles: Optional[str] = None
@@ -35,64 +63,140 @@ class PerevalInput(BaseModel):
     add_time: Optional[str] = None
     coords: Coords
     user: User
+
+    _validate_time = validator('add_time', allow_reuse=True)(validate_time)
+
+
+class PerevalInput(PerevalData):
     images: List[Image]
 
-    @validator('add_time')
-    def validate_time(cls, v):
-        if v:
-            try:
-                time.fromisoformat(v)
-            except ValueError:
-                raise ValueError('Invalid time format, expected HH:MM:SS')
+
+class BatchItem(PerevalInput):
+    # Client-generated key; resending an item with the same key returns the
+    # id of the pereval created the first time instead of creating another one
+    idempotency_key: Optional[str] = Field(None, min_length=1, max_length=255)
+
+
+class ImageUpdate(BaseModel):
+    # Exactly one of: id of an image of this pereval, img_hash of already
+    # uploaded data, or img with new base64 data
+    id: Optional[int] = None
+    img_hash: Optional[str] = Field(None, regex=r'^[0-9a-f]{64}$')
+    img: Optional[str] = None
+    title: Optional[str] = None
+
+    @root_validator(skip_on_failure=True)
+    def check_reference(cls, values):
+        given = [name for name in ('id', 'img_hash', 'img') if values.get(name) is not None]
+        if len(given) != 1:
+            raise ValueError('Exactly one of id, img_hash or img is required')
+        if values.get('img') is not None and values.get('title') is None:
+            raise ValueError('title is required for a new image')
+        return values
+
+
+class PerevalUpdate(BaseModel):
+    # Every field is optional: only the fields present in the body change.
+    # Unknown fields (e.g. user, which can't be changed) are ignored, so a
+    # full PerevalInput body is still accepted.
+    beauty_title: Optional[str] = None
+    title: Optional[str] = None
+    other_titles: Optional[str] = None
+    connect: Optional[str] = None
+    add_time: Optional[str] = None
+    coords: Optional[Coords] = None
+    images: Optional[List[ImageUpdate]] = None
+
+    _validate_time = validator('add_time', allow_reuse=True)(validate_time)
+
+    @validator('title', pre=True)
+    def title_not_null(cls, v):
+        if v is None:
+            raise ValueError('title may not be null')
         return v
 
 
-@app.post('/submitData')
-async def submit_data(pereval: PerevalInput):
+@router.post('/')
+# Without the slash too: GET /submitData/ would otherwise answer 405
+@router.post('', include_in_schema=False)
+async def submit_data(pereval: PerevalInput, db: AsyncDatabaseManager = Depends(get_db)):
     try:
         # Validate input data
         if not pereval.images:
             raise HTTPException(status_code=400, detail="At least one image is required")
 
-        # Add user
-        user_id = db_manager.add_user(
-            email=pereval.user.email,
-            phone=pereval.user.phone,
-            fam=pereval.user.fam,
-            name=pereval.user.name,
-            otc=pereval.user.otc
-        )
-
-        # Add coordinates
-        coord_id = db_manager.add_coords(
-            latitude=pereval.coords.latitude,
-            longitude=pereval.coords.longitude,
-            height=pereval.coords.height
-        )
-
-        # Add pereval
-        pereval_id = db_manager.add_pereval(
-            user_id=user_id,
-            beauty_title=pereval.beauty_title,
-            title=pereval.title,
-            other_titles=pereval.other_titles,
-            connect=pereval.connect,
-            add_time=pereval.add_time,
-            coord_id=coord_id
-        )
-
-        # Add images
+        # Decode images before touching the database
+        images = []
         for image in pereval.images:
             try:
-                img_data = base64.b64decode(image.img)
+                images.append((base64.b64decode(image.img), image.title))
             except:
                 raise HTTPException(status_code=400, detail="Invalid image data (must be base64)")
 
-            db_manager.add_image(
-                pereval_id=pereval_id,
-                img=img_data,
-                title=image.title
+        # Add user, coordinates, pereval and images in a single transaction
+        pereval_id = await db.submit_pereval(
+            user=pereval.user.dict(),
+            coords=pereval.coords.dict(),
+            pereval=pereval.dict(include={'beauty_title', 'title', 'other_titles', 'connect', 'add_time'}),
+            images=images
+        )
+        # Follow-up work (renditions etc.) is picked up by the job worker after commit
+        await enqueue_submission_jobs(db, [pereval_id])
+        await db.commit()
+
+        return {
+            "status": 200,
+            "message": "Отправлено успешно",
+            "id": pereval_id
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        return {
+            "status": 500,
+            "message": f"Ошибка при выполнении операции: {str(e)}",
+            "id": None
+        }
+
+
+@router.post('/multipart')
+async def submit_data_multipart(
+        data: str = Form(..., description="PerevalInput without images, as JSON"),
+        images: List[UploadFile] = File(...),
+        titles: Optional[List[str]] = Form(None),
+        db: AsyncDatabaseManager = Depends(get_db)
+):
+    # Images arrive as multipart parts spooled to disk and are streamed
+    # to the blob store chunk by chunk, so memory use does not grow with uploads
+    try:
+        pereval = PerevalData.parse_raw(data)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors())
+
+    if titles and len(titles) != len(images):
+        raise HTTPException(status_code=400, detail="Number of titles must match number of images")
+
+    try:
+        stored_images = []
+        for i, upload in enumerate(images):
+            img_hash, img_size, mime_type = await asyncio.to_thread(
+                store_image_stream, upload.file, upload.content_type
             )
+            if not img_size:
+                raise HTTPException(status_code=400, detail="Empty image file")
+            title = titles[i] if titles else upload.filename
+            stored_images.append((img_hash, img_size, mime_type, title))
+
+        pereval_id = await db.submit_pereval(
+            user=pereval.user.dict(),
+            coords=pereval.coords.dict(),
+            pereval=pereval.dict(include={'beauty_title', 'title', 'other_titles', 'connect', 'add_time'}),
+            images=[],
+            stored_images=stored_images
+        )
+        await enqueue_submission_jobs(db, [pereval_id])
+        await db.commit()
 
         return {
             "status": 200,
@@ -110,198 +214,328 @@ async def submit_data(pereval: PerevalInput):
         }
 
 
-class PerevalResponse(BaseModel):
+@router.post('/batch')
+async def submit_data_batch(
+        items: List[Dict[str, Any]] = Body(..., description="List of PerevalInput, each with an optional idempotency_key"),
+        db: AsyncDatabaseManager = Depends(get_db)
+):
+    """
+    Add up to BATCH_MAX_ITEMS perevals in one request.
+
+    Durability is per chunk, not per request: items are written in chunks of
+    BATCH_CHUNK_SIZE, each committed on its own connection as soon as it is
+    done, so a failure later in the batch (or a lost response) does not undo
+    chunks that were already committed. Resend the batch with the same
+    idempotency keys to get the ids of the items that were saved.
+    """
+    # Items are validated one by one so that a single bad record is reported
+    # in its own result instead of rejecting the whole batch
+    if len(items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch is limited to {BATCH_MAX_ITEMS} items")
+
+    results = [None] * len(items)
+    parsed = {}
+    for index, raw in enumerate(items):
+        try:
+            item = BatchItem.parse_obj(raw)
+        except ValidationError as e:
+            results[index] = {"status": 400, "message": str(e), "id": None}
+            continue
+        if not item.images:
+            results[index] = {"status": 400, "message": "At least one image is required", "id": None}
+            continue
+        parsed[index] = item
+
+    try:
+        # Already submitted items are answered without storing their images again
+        existing = await db.get_submission_keys(
+            {item.idempotency_key for item in parsed.values() if item.idempotency_key}
+        )
+        submissions = []
+        for index, item in parsed.items():
+            if item.idempotency_key in existing:
+                results[index] = {"status": 200, "message": "Уже отправлено", "id": existing[item.idempotency_key]}
+                continue
+            try:
+                images = [(base64.b64decode(image.img), image.title) for image in item.images]
+            except ValueError:
+                results[index] = {"status": 400, "message": "Invalid image data (must be base64)", "id": None}
+                continue
+            stored_images = []
+            for img, title in images:
+                stored_images.append((*await asyncio.to_thread(store_image, img), title))
+            submissions.append((index, {
+                "user": item.user.dict(),
+                "coords": item.coords.dict(),
+                "pereval": item.dict(include={'beauty_title', 'title', 'other_titles', 'connect', 'add_time'}),
+                "stored_images": stored_images,
+                "idempotency_key": item.idempotency_key
+            }))
+
+        outcomes = await db.submit_batch([submission for _, submission in submissions], BATCH_CHUNK_SIZE)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    # The perevals are already committed chunk by chunk outside the request
+    # session, so a failure here must not hide their ids; renditions are then
+    # still created on first request
+    try:
+        await enqueue_submission_jobs(
+            db, [pereval_id for pereval_id, duplicate, error in outcomes if pereval_id and not duplicate]
+        )
+        await db.commit()
+    except Exception:
+        await db.rollback()
+
+    for (index, _), (pereval_id, duplicate, error) in zip(submissions, outcomes):
+        if error:
+            results[index] = {"status": 500, "message": f"Ошибка при выполнении операции: {error}", "id": None}
+        else:
+            message = "Уже отправлено" if duplicate else "Отправлено успешно"
+            results[index] = {"status": 200, "message": message, "id": pereval_id}
+    return results
+
+
+class PerevalSummary(BaseModel):
     id: int
-    status: str
     beauty_title: Optional[str] = None
     title: str
-    other_titles: Optional[str] = None
-    connect: Optional[str] = None
-    add_time: Optional[str] = None
-    coords: Coords
-    user: User
-    images: List[Image]
+    status: str
+    latitude: float
+    longitude: float
+    height: int
 
 
-@app.get('/submitData/{pereval_id}', response_model=PerevalResponse)
-async def get_pereval(pereval_id: int):
+class NearbyPereval(PerevalSummary):
+    distance_km: float
+
+
+STATUS_PATTERN = "^(new|pending|accepted|rejected)$"
+RENDITION_PATTERN = "^(" + "|".join(RENDITIONS) + ")$"
+
+
+@router.get('/nearby', response_model=List[NearbyPereval])
+async def get_perevals_nearby(
+        lat: float = Query(..., ge=-90, le=90),
+        lon: float = Query(..., ge=-180, le=180),
+        radius_km: float = Query(10, gt=0, le=1000),
+        status: Optional[str] = Query(None, regex=STATUS_PATTERN),
+        limit: int = Query(100, gt=0, le=500),
+        db: AsyncDatabaseManager = Depends(get_db)
+):
+    # Bounding box of the circle goes through the GiST index on coords,
+    # the exact great-circle distance is checked for the rows inside it
     try:
-        db_manager.connect()
-        with db_manager.conn.cursor() as cursor:
-            # Get pereval info
-            cursor.execute("""
-                SELECT p.id, p.beauty_title, p.title, p.other_titles, p.connect, 
-                       p.add_time, p.status, 
-                       c.latitude, c.longitude, c.height,
-                       u.email, u.phone, u.fam, u.name, u.otc
-                FROM pereval_added p
-                JOIN coords c ON p.coord_id = c.id
-                JOIN users u ON p.user_id = u.id
-                WHERE p.id = %s
-            """, (pereval_id,))
-            pereval_data = cursor.fetchone()
-
-            if not pereval_data:
-                raise HTTPException(status_code=404, detail="Pereval not found")
-
-            # Get images
-            cursor.execute("""
-                SELECT img, title FROM images
-                WHERE pereval_id = %s
-            """, (pereval_id,))
-            images_data = cursor.fetchall()
-
-            images = []
-            for img_data in images_data:
-                img_base64 = base64.b64encode(img_data[0]).decode('utf-8')
-                images.append({
-                    "img": img_base64,
-                    "title": img_data[1]
-                })
+        return await db.get_perevals_nearby(lat, lon, radius_km, status, limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-            response = {
-                "id": pereval_data[0],
-                "beauty_title": pereval_data[1],
-                "title": pereval_data[2],
-                "other_titles": pereval_data[3],
-                "connect": pereval_data[4],
-                "add_time": str(pereval_data[5]) if pereval_data[5] else None,
-                "status": pereval_data[6],
-                "coords": {
-                    "latitude": float(pereval_data[7]),
-                    "longitude": float(pereval_data[8]),
-                    "height": pereval_data[9]
-                },
-                "user": {
-                    "email": pereval_data[10],
-                    "phone": pereval_data[11],
-                    "fam": pereval_data[12],
-                    "name": pereval_data[13],
-                    "otc": pereval_data[14]
-                },
-                "images": images
-            }
-
-            return response
 
-    except HTTPException:
-        raise
+@router.get('/bbox', response_model=List[PerevalSummary])
+async def get_perevals_in_bbox(
+        south: float = Query(..., ge=-90, le=90),
+        west: float = Query(..., ge=-180, le=180),
+        north: float = Query(..., ge=-90, le=90),
+        east: float = Query(..., ge=-180, le=180),
+        status: Optional[str] = Query(None, regex=STATUS_PATTERN),
+        limit: int = Query(100, gt=0, le=500),
+        db: AsyncDatabaseManager = Depends(get_db)
+):
+    if south > north:
+        raise HTTPException(status_code=400, detail="south must not be greater than north")
+    if west > east:
+        # Viewports crossing the antimeridian are requested as two boxes
+        raise HTTPException(status_code=400, detail="west must not be greater than east")
+    try:
+        return await db.get_perevals_in_bbox(south, west, north, east, status, limit)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        db_manager.disconnect()
 
 
-@app.patch('/submitData/{pereval_id}')
-async def update_pereval(pereval_id: int, pereval: PerevalInput):
+@router.get('/{pereval_id}', response_model=PerevalResponse)
+async def get_pereval(pereval_id: int, request: Request, db: AsyncDatabaseManager = Depends(get_db)):
+    # Serialized responses are cached with their ETag; on a miss the
+    # pereval is loaded from the database and cached for a status-dependent TTL
+    response_cache = get_response_cache()
+    cache_key = pereval_cache_key(pereval_id)
+    cached = await response_cache.get(cache_key)
+    if cached is None:
+        pereval = await _load_pereval(pereval_id, db)
+        cached = await response_cache.set(
+            cache_key,
+            pereval.json().encode(),
+            response_cache.ttl_for_status(pereval.status)
+        )
+
+    return cached_json_response(cached, request.headers.get("if-none-match"))
+
+
+async def _load_pereval(pereval_id: int, db: AsyncDatabaseManager):
+    # One round trip: coords, user and image metadata come aggregated
+    # as JSON, the binaries are served by get_pereval_image
     try:
-        db_manager.connect()
-        with db_manager.conn.cursor() as cursor:
-            # Check if pereval exists and has status 'new'
-            cursor.execute("""
-                SELECT status, user_id FROM pereval_added
-                WHERE id = %s
-            """, (pereval_id,))
-            pereval_status = cursor.fetchone()
-
-            if not pereval_status:
-                return {"state": 0, "message": "Pereval not found"}
-
-            if pereval_status[0] != 'new':
-                return {"state": 0, "message": "Pereval can't be edited because it's not in 'new' status"}
-
-            # Get user_id from the original pereval
-            user_id = pereval_status[1]
-
-            # Update coordinates
-            cursor.execute("""
-                UPDATE coords
-                SET latitude = %s, longitude = %s, height = %s
-                WHERE id = (
-                    SELECT coord_id FROM pereval_added WHERE id = %s
-                )
-                RETURNING id
-            """, (
-                pereval.coords.latitude,
-                pereval.coords.longitude,
-                pereval.coords.height,
-                pereval_id
-            ))
-            coord_id = cursor.fetchone()[0]
-
-            # Update pereval
-            cursor.execute("""
-                UPDATE pereval_added
-                SET beauty_title = %s, title = %s, other_titles = %s,
-                    connect = %s, add_time = %s, coord_id = %s
-                WHERE id = %s
-            """, (
-                pereval.beauty_title,
-                pereval.title,
-                pereval.other_titles,
-                pereval.connect,
-                pereval.add_time,
-                coord_id,
-                pereval_id
-            ))
-
-            # Delete old images
-            cursor.execute("""
-                DELETE FROM images WHERE pereval_id = %s
-            """, (pereval_id,))
-
-            # Add new images
-            for image in pereval.images:
-                try:
-                    img_data = base64.b64decode(image.img)
-                except:
-                    db_manager.conn.rollback()
-                    return {"state": 0, "message": "Invalid image data (must be base64)"}
-
-                cursor.execute("""
-                    INSERT INTO images (pereval_id, img, title)
-                    VALUES (%s, %s, %s)
-                """, (pereval_id, img_data, image.title))
-
-            db_manager.conn.commit()
-            return {"state": 1, "message": "Pereval updated successfully"}
+        row = await db.get_pereval(pereval_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if not row:
+        raise HTTPException(status_code=404, detail="Pereval not found")
+
+    for image in row["images"]:
+        image["url"] = f"/submitData/{pereval_id}/images/{image['id']}"
+        image["renditions"] = {name: f"{image['url']}/{name}" for name in RENDITIONS}
+    return PerevalResponse.parse_obj(row)
+
+
+@router.get('/{pereval_id}/images/{image_id}')
+async def get_pereval_image(
+        pereval_id: int,
+        image_id: int,
+        request: Request,
+        db: AsyncDatabaseManager = Depends(get_db)
+):
+    image = await db.get_image(pereval_id, image_id)
+    if not image:
+        raise HTTPException(status_code=404, detail="Image not found")
+    # The session would otherwise hold its pool connection until the last
+    # byte reaches the client
+    await db.release()
+    return _blob_response(request, *image)
+
+
+@router.get('/{pereval_id}/images/{image_id}/{rendition}')
+async def get_pereval_image_rendition(
+        pereval_id: int,
+        image_id: int,
+        request: Request,
+        rendition: str = Path(..., regex=RENDITION_PATTERN),
+        db: AsyncDatabaseManager = Depends(get_db)
+):
+    # Renditions are created on first request in the image process pool
+    # and shared by all images with the same content
+    image = await db.get_image_rendition(pereval_id, image_id, rendition)
+    if not image:
+        raise HTTPException(status_code=404, detail="Image not found")
+    img_hash, size, mime_type, rendition_hash, rendition_size, rendition_mime_type = image
+
+    if rendition_hash is None and renditions_available():
+        rendition_hash, rendition_size, rendition_mime_type = await ensure_rendition(
+            db, img_hash, size, mime_type, rendition
+        )
+    # Commit and return the connection to the pool before streaming
+    await db.release()
+
+    if rendition_hash is None:
+        return _blob_response(request, img_hash, size, mime_type)
+    return _blob_response(request, rendition_hash, rendition_size, rendition_mime_type)
 
+
+def _blob_response(request: Request, img_hash: str, size: int, mime_type: str):
+    etag = f'"{img_hash}"'
+    headers = {"ETag": etag, "Accept-Ranges": "bytes"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    try:
+        byte_range = parse_range(request.headers.get("range"), size)
+    except RangeNotSatisfiable:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+    status_code = 200
+    start, end = 0, size - 1
+    if byte_range:
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+
+    return StreamingResponse(
+        get_blob_store().iter_range(img_hash, start, end - start + 1),
+        status_code=status_code,
+        media_type=mime_type,
+        headers=headers
+    )
+
+
+@router.patch('/{pereval_id}')
+async def update_pereval(
+        pereval_id: int,
+        pereval: PerevalUpdate,
+        db: AsyncDatabaseManager = Depends(get_db)
+):
+    # When images are sent they are the complete new set; unchanged images
+    # keep their rows and ids, only added, removed and retitled ones are written
+    images = None
+    if pereval.images is not None:
+        images = []
+        for image in pereval.images:
+            if image.img is None:
+                images.append({"id": image.id, "img_hash": image.img_hash, "title": image.title})
+                continue
+            try:
+                images.append({"data": base64.b64decode(image.img), "title": image.title})
+            except ValueError:
+                return {"state": 0, "message": "Invalid image data (must be base64)"}
+
+    fields = pereval.dict(exclude_unset=True, include=set(DatabaseQueries.PEREVAL_UPDATABLE_FIELDS))
+    coords = pereval.coords.dict() if pereval.coords else None
+    try:
+        status, images_added = await db.update_pereval(pereval_id, fields, coords, images)
+        if status is None:
+            return {"state": 0, "message": "Pereval not found"}
+        if status != 'new':
+            return {"state": 0, "message": "Pereval can't be edited because it's not in 'new' status"}
+        if images_added:
+            await enqueue_submission_jobs(db, [pereval_id])
+        await db.commit()
+    except InvalidImageReference as e:
+        await db.rollback()
+        return {"state": 0, "message": str(e)}
     except Exception as e:
-        db_manager.conn.rollback()
+        await db.rollback()
         return {"state": 0, "message": f"Error updating pereval: {str(e)}"}
-    finally:
-        db_manager.disconnect()
+
+    await invalidate_pereval(pereval_id)
+    return {"state": 1, "message": "Pereval updated successfully"}
 
 
-@app.get('/submitData/', response_model=List[Dict[str, Any]])
-async def get_user_perevals(user_email: str = Query(..., alias="user__email")):
+@router.get('/', response_model=List[Dict[str, Any]])
+async def get_user_perevals(
+        response: Response,
+        user_email: str = Query(..., alias="user__email"),
+        limit: int = Query(50, gt=0, le=100),
+        cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+        db: AsyncDatabaseManager = Depends(get_db)
+):
     try:
-        db_manager.connect()
-        with db_manager.conn.cursor() as cursor:
-            # Get user's perevals
-            cursor.execute("""
-                SELECT p.id, p.beauty_title, p.title, p.status
-                FROM pereval_added p
-                JOIN users u ON p.user_id = u.id
-                WHERE u.email = %s
-            """, (user_email,))
-            perevals = cursor.fetchall()
+        after_id = decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        async with db.connection() as conn, conn.cursor() as db_cursor:
+            # Get a page of user's perevals, keyset-paginated by id
+            await execute(
+                db_cursor, 'get_user_perevals_page',
+                (user_email, after_id, limit + 1)
+            )
+            perevals, next_cursor = paginate(await db_cursor.fetchall(), limit)
+            if next_cursor:
+                response.headers[NEXT_CURSOR_HEADER] = next_cursor
 
             if not perevals:
                 return []
 
-            response = []
+            result = []
             for pereval in perevals:
-                response.append({
+                result.append({
                     "id": pereval[0],
                     "beauty_title": pereval[1],
                     "title": pereval[2],
                     "status": pereval[3]
                 })
 
-            return response
+            return result
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        db_manager.disconnect()
\ No newline at end of file
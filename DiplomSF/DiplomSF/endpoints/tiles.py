@@ -0,0 +1,47 @@
+from fastapi import APIRouter, HTTPException, Depends, Path, Request
+from app.database.async_manager import AsyncDatabaseManager
+from app.database.session import get_db
+from app.schemas.tile import TileResponse
+from app.utils.geo import MAX_TILE_ZOOM, tile_bbox
+from app.utils.response_cache import cached_json_response, get_response_cache, tile_cache_key
+
+router = APIRouter()
+
+# Размер сетки кластеризации: ячеек на сторону тайла (для тайла 256px - ячейки по 32px)
+TILE_GRID = 8
+
+
+# Кластеры принятых перевалов в тайле карты
+@router.get("/{z}/{x}/{y}", response_model=TileResponse)
+async def get_tile(
+        request: Request,
+        z: int = Path(..., ge=0, le=MAX_TILE_ZOOM),
+        x: int = Path(..., ge=0),
+        y: int = Path(..., ge=0),
+        db: AsyncDatabaseManager = Depends(get_db)
+):
+    """
+    Получить тайл z/x/y: принятые перевалы, сгруппированные в кластеры
+    с количеством точек. Тайлы кешируются и сбрасываются при смене
+    статуса перевала внутри них.
+    """
+    if x >= 2 ** z or y >= 2 ** z:
+        raise HTTPException(status_code=404, detail="Tile not found")
+
+    response_cache = get_response_cache()
+    cache_key = tile_cache_key(z, x, y)
+    cached = await response_cache.get(cache_key)
+    if cached is None:
+        south, west, north, east = tile_bbox(z, x, y)
+        try:
+            rows = await db.get_tile_clusters(south, west, north, east, 2 ** z * TILE_GRID)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        clusters = []
+        for row in rows:
+            if row["count"] > 1:
+                row["id"] = row["title"] = None
+            clusters.append(row)
+        tile = TileResponse(z=z, x=x, y=y, clusters=clusters)
+        cached = await response_cache.set(cache_key, tile.json().encode(), response_cache.tile_ttl)
+    return cached_json_response(cached, request.headers.get("if-none-match"))
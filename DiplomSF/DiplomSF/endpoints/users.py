@@ -1,30 +1,60 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
 from typing import List, Optional
-from app.database.manager import DatabaseManager
+from app.database.async_manager import AsyncDatabaseManager, user_id_cache
+from app.database.statements import execute
+from app.database.session import get_db
 from app.schemas.user import UserCreate, UserResponse, UserUpdate
 from app.utils.exceptions import UserNotFound
+from app.utils.pagination import (
+    decode_cursor, decode_rank_cursor, paginate, paginate_ranked, NEXT_CURSOR_HEADER
+)
 
 router = APIRouter(prefix="/users", tags=["users"])
 
+# Заголовок ответов устаревшей пагинации по offset
+DEPRECATION_HEADER = "Deprecation"
+
+
+def _contains_pattern(value: str) -> str:
+    """Шаблон ILIKE для поиска подстроки с экранированием спецсимволов"""
+    escaped = value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"%{escaped}%"
+
 
 # Получение списка всех пользователей
 @router.get("/", response_model=List[UserResponse])
 async def get_users(
+        response: Response,
         limit: int = Query(10, gt=0, le=100),
-        offset: int = Query(0, ge=0),
-        db: DatabaseManager = Depends(DatabaseManager)
+        cursor: Optional[str] = Query(None, description="Курсор из заголовка X-Next-Cursor предыдущей страницы"),
+        offset: Optional[int] = Query(None, ge=0, deprecated=True,
+                                      description="Устарело: используйте cursor"),
+        db: AsyncDatabaseManager = Depends(get_db)
 ):
     """
-    Получить список пользователей с пагинацией.
+    Получить список пользователей с пагинацией по курсору (keyset по id).
+    Курсор следующей страницы возвращается в заголовке X-Next-Cursor.
+    Устаревший offset обслуживается отдельным запросом без курсора и
+    с заголовком Deprecation; вместе с cursor он не принимается.
     """
+    if offset is not None and cursor is not None:
+        raise HTTPException(status_code=400, detail="offset cannot be combined with cursor")
     try:
-        db.connect()
-        with db.conn.cursor() as cursor:
-            cursor.execute(
-                "SELECT id, email, phone, fam, name, otc FROM users LIMIT %s OFFSET %s",
-                (limit, offset)
-            )
-            users = cursor.fetchall()
+        after_id = decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        async with db.connection() as conn, conn.cursor() as db_cursor:
+            if offset is not None:
+                await execute(db_cursor, 'get_users_offset_page', (limit, offset))
+                users = await db_cursor.fetchall()
+                response.headers[DEPRECATION_HEADER] = "true"
+            else:
+                await execute(db_cursor, 'get_users_page', (after_id, limit + 1))
+                users, next_cursor = paginate(await db_cursor.fetchall(), limit)
+                if next_cursor:
+                    response.headers[NEXT_CURSOR_HEADER] = next_cursor
             return [
                 {
                     "id": user[0],
@@ -38,27 +68,21 @@ async def get_users(
             ]
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        db.disconnect()
 
 
 # Получение пользователя по ID
 @router.get("/{user_id}", response_model=UserResponse)
 async def get_user(
         user_id: int,
-        db: DatabaseManager = Depends(DatabaseManager)
+        db: AsyncDatabaseManager = Depends(get_db)
 ):
     """
     Получить пользователя по его ID.
     """
     try:
-        db.connect()
-        with db.conn.cursor() as cursor:
-            cursor.execute(
-                "SELECT id, email, phone, fam, name, otc FROM users WHERE id = %s",
-                (user_id,)
-            )
-            user = cursor.fetchone()
+        async with db.connection() as conn, conn.cursor() as cursor:
+            await execute(cursor, 'get_user_by_id', (user_id,))
+            user = await cursor.fetchone()
             if not user:
                 raise UserNotFound(user_id)
             return {
@@ -73,32 +97,52 @@ async def get_user(
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        db.disconnect()
 
 
-# Поиск пользователей по email
+# Поиск пользователей по email, фамилии и имени
 @router.get("/search/", response_model=List[UserResponse])
 async def search_users(
-        email: Optional[str] = Query(None),
-        db: DatabaseManager = Depends(DatabaseManager)
+        response: Response,
+        q: Optional[str] = Query(None, min_length=3, description="Часть email, фамилии или имени"),
+        email: Optional[str] = Query(None, min_length=3, description="Часть email"),
+        limit: int = Query(20, gt=0, le=100),
+        cursor: Optional[str] = Query(None, description="Курсор из заголовка X-Next-Cursor предыдущей страницы"),
+        db: AsyncDatabaseManager = Depends(get_db)
 ):
     """
-    Поиск пользователей по email (частичное совпадение).
+    Поиск пользователей (частичное совпадение) по триграммному индексу.
+    Результаты упорядочены по схожести (при равной схожести - по id) и
+    отдаются страницами по limit; курсор следующей страницы - в X-Next-Cursor.
+    Без фильтра возвращается постраничный список, как в GET /users/.
     """
+    if q:
+        search = ('search_users', q)
+    elif email:
+        search = ('search_users_by_email', email)
+    else:
+        search = None
     try:
-        db.connect()
-        with db.conn.cursor() as cursor:
-            if email:
-                cursor.execute(
-                    "SELECT id, email, phone, fam, name, otc FROM users WHERE email LIKE %s",
-                    (f"%{email}%",)
+        if search:
+            after_rank, after_id = decode_rank_cursor(cursor)
+        else:
+            after_id = decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        async with db.connection() as conn, conn.cursor() as db_cursor:
+            if search:
+                query_name, value = search
+                await execute(
+                    db_cursor, query_name,
+                    (value, _contains_pattern(value), after_rank, after_rank, after_id, limit + 1)
                 )
+                users, next_cursor = paginate_ranked(await db_cursor.fetchall(), limit)
             else:
-                cursor.execute(
-                    "SELECT id, email, phone, fam, name, otc FROM users"
-                )
-            users = cursor.fetchall()
+                await execute(db_cursor, 'get_users_page', (after_id, limit + 1))
+                users, next_cursor = paginate(await db_cursor.fetchall(), limit)
+            if next_cursor:
+                response.headers[NEXT_CURSOR_HEADER] = next_cursor
             return [
                 {
                     "id": user[0],
@@ -112,8 +156,6 @@ async def search_users(
             ]
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        db.disconnect()
 
 
 # Обновление данных пользователя
@@ -121,43 +163,36 @@ async def search_users(
 async def update_user(
         user_id: int,
         user_data: UserUpdate,
-        db: DatabaseManager = Depends(DatabaseManager)
+        db: AsyncDatabaseManager = Depends(get_db)
 ):
     """
     Обновить данные пользователя (частичное обновление).
     """
     try:
-        db.connect()
-        with db.conn.cursor() as cursor:
-            # Проверяем существование пользователя
-            cursor.execute("SELECT id FROM users WHERE id = %s", (user_id,))
-            if not cursor.fetchone():
+        async with db.connection() as conn, conn.cursor() as cursor:
+            # Блокируем строку пользователя и дополняем переданные поля текущими
+            # значениями, чтобы выполнить подготовленный UPDATE всех колонок
+            await execute(cursor, 'lock_user', (user_id,))
+            existing_user = await cursor.fetchone()
+            if not existing_user:
                 raise UserNotFound(user_id)
 
-            # Формируем запрос для частичного обновления
-            update_fields = []
-            update_values = []
-            for field, value in user_data.dict(exclude_unset=True).items():
-                update_fields.append(f"{field} = %s")
-                update_values.append(value)
-
-            if not update_fields:
+            changes = user_data.dict(exclude_unset=True)
+            if not changes:
                 raise HTTPException(
                     status_code=400,
                     detail="No fields to update"
                 )
 
-            update_query = f"""
-                UPDATE users
-                SET {', '.join(update_fields)}
-                WHERE id = %s
-                RETURNING id, email, phone, fam, name, otc
-            """
-            update_values.append(user_id)
-
-            cursor.execute(update_query, update_values)
-            updated_user = cursor.fetchone()
-            db.conn.commit()
+            user = dict(zip(("id", "email", "phone", "fam", "name", "otc"), existing_user))
+            user.update(changes)
+            await execute(cursor, 'update_user', (
+                user["email"], user["phone"], user["fam"], user["name"], user["otc"], user_id
+            ))
+            updated_user = await cursor.fetchone()
+            await db.commit()
+            # Профиль в кеше email -> id для submitData устарел
+            user_id_cache.pop(existing_user[1])
 
             return {
                 "id": updated_user[0],
@@ -170,7 +205,4 @@ async def update_user(
     except UserNotFound as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
-        db.conn.rollback()
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        db.disconnect()
\ No newline at end of file
@@ -0,0 +1,25 @@
+"""
+Обработчики фоновых задач: kind -> async def handler(db, payload).
+Обработчик должен быть идемпотентным: после сбоя задача выполняется повторно.
+"""
+from app.storage.renditions import RENDITIONS, ensure_rendition, renditions_available
+
+HANDLERS = {}
+
+
+def job_handler(kind: str):
+    """Регистрирует обработчик задач данного вида"""
+    def register(handler):
+        HANDLERS[kind] = handler
+        return handler
+    return register
+
+
+@job_handler('renditions')
+async def create_pereval_renditions(db, payload):
+    """Заранее создаёт уменьшенные копии изображений перевала"""
+    if not renditions_available():
+        return
+    for name in RENDITIONS:
+        for img_hash, img_size, mime_type in await db.get_missing_renditions(payload['pereval_id'], name):
+            await ensure_rendition(db, img_hash, img_size, mime_type, name)
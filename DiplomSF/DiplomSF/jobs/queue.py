@@ -0,0 +1,16 @@
+import os
+
+# Задачи, которые ставятся в очередь для каждого нового перевала
+SUBMISSION_JOBS = ('renditions',)
+
+
+def jobs_enabled() -> bool:
+    return os.getenv('FSTR_JOBS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+
+
+async def enqueue_submission_jobs(db, pereval_ids):
+    """Ставит задачи обработки новых перевалов в текущей транзакции db (AsyncDatabaseManager)"""
+    if not jobs_enabled() or not pereval_ids:
+        return
+    for kind in SUBMISSION_JOBS:
+        await db.enqueue_jobs(kind, [{'pereval_id': pereval_id} for pereval_id in pereval_ids])
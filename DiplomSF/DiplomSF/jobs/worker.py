@@ -0,0 +1,97 @@
+"""
+Воркер фоновых задач из таблицы jobs.
+
+Задачи берутся пачками через SELECT ... FOR UPDATE SKIP LOCKED, поэтому
+воркеров можно запускать сколько угодно. Пока очередь пуста, воркер ждёт
+уведомления NOTIFY jobs (его отправляет постановка задачи при коммите),
+но не дольше FSTR_JOB_POLL_INTERVAL секунд. Упавшая задача повторяется
+с экспоненциальной задержкой, пока не исчерпает max_attempts.
+
+Запуск из командной строки:
+    python -m app.jobs.worker [--concurrency N] [--once]
+"""
+import argparse
+import asyncio
+import logging
+import os
+
+from app.database.async_manager import AsyncDatabaseManager
+from app.database.pool import close_all_async_pools
+from app.jobs.handlers import HANDLERS
+from app.storage.renditions import shutdown_executor
+
+POLL_INTERVAL = float(os.getenv('FSTR_JOB_POLL_INTERVAL', '5'))
+# Задача в running дольше этого времени считается брошенной упавшим воркером
+JOB_TIMEOUT = float(os.getenv('FSTR_JOB_TIMEOUT', '600'))
+MAX_RETRY_DELAY = 3600
+
+logger = logging.getLogger(__name__)
+
+
+def retry_delay(attempts: int) -> float:
+    """Задержка перед повтором после attempts неудачных попыток, секунд"""
+    return min(2 ** attempts, MAX_RETRY_DELAY)
+
+
+async def run_job(db, job):
+    """Выполняет задачу и записывает результат; возвращает True при успехе"""
+    handler = HANDLERS.get(job['kind'])
+    try:
+        if handler is None:
+            raise LookupError(f"Unknown job kind: {job['kind']}")
+        await handler(db, job['payload'])
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        logger.exception("Задача %s (%s) завершилась ошибкой", job['id'], job['kind'])
+        if handler is None or job['attempts'] >= job['max_attempts']:
+            await db.fail_job(job['id'], error)
+        else:
+            await db.retry_job(job['id'], error, retry_delay(job['attempts']))
+        return False
+    await db.complete_job(job['id'])
+    return True
+
+
+async def run_once(db, concurrency: int) -> int:
+    """Берёт до concurrency задач и выполняет их параллельно; возвращает их число"""
+    jobs = await db.claim_jobs(concurrency, JOB_TIMEOUT)
+    await asyncio.gather(*(run_job(db, job) for job in jobs))
+    return len(jobs)
+
+
+async def work(concurrency: int = 4, once: bool = False):
+    db = AsyncDatabaseManager()
+    try:
+        if once:
+            while await run_once(db, concurrency):
+                pass
+            return
+        listener = await db.listen('jobs')
+        try:
+            while True:
+                if await run_once(db, concurrency):
+                    continue
+                # Уведомления, пришедшие во время работы, уже в буфере соединения
+                async for _ in listener.notifies(timeout=POLL_INTERVAL, stop_after=1):
+                    pass
+        finally:
+            await listener.close()
+    finally:
+        await close_all_async_pools()
+        shutdown_executor()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Воркер фоновых задач FSTR")
+    parser.add_argument("--concurrency", type=int, default=4, help="сколько задач выполнять одновременно")
+    parser.add_argument("--once", action="store_true", help="выполнить накопившиеся задачи и выйти")
+    args = parser.parse_args(argv)
+    logging.basicConfig(format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    try:
+        asyncio.run(work(args.concurrency, args.once))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
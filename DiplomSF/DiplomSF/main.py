@@ -1,12 +1,41 @@
-from fastapi import FastAPI
+import asyncio
+import os
+
+from fastapi import FastAPI, Response
 from app.database.manager import DatabaseManager
-from app.endpoints import pereval, users
+from app.database.migrations import run_migrations
+from app.database.pool import close_all_pools, close_all_async_pools
+from app.endpoints import moderation, pereval, tiles, users
+from app.storage.renditions import shutdown_executor
+from app.utils.metrics import CONTENT_TYPE, MetricsMiddleware, render_metrics
 
 app = FastAPI(title="FSTR API", version="1.0.0")
+app.add_middleware(MetricsMiddleware)
 
 # Инициализация менеджера БД
 db_manager = DatabaseManager()
 
 # Подключение роутеров
 app.include_router(pereval.router, prefix="/submitData", tags=["pereval"])
-app.include_router(users.router, prefix="/users", tags=["users"])
\ No newline at end of file
+app.include_router(users.router)
+app.include_router(tiles.router, prefix="/tiles", tags=["tiles"])
+app.include_router(moderation.router, prefix="/moderation", tags=["moderation"])
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Метрики процесса в текстовом формате Prometheus"""
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
+
+
+@app.on_event("startup")
+async def migrate_db():
+    if os.getenv('FSTR_DB_MIGRATE_ON_STARTUP', 'false').lower() in ('1', 'true', 'yes'):
+        await asyncio.to_thread(run_migrations)
+
+
+@app.on_event("shutdown")
+async def close_db_pools():
+    close_all_pools()
+    await close_all_async_pools()
+    shutdown_executor()
@@ -0,0 +1,27 @@
+from datetime import datetime
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+class QueueItem(BaseModel):
+    id: int
+    beauty_title: Optional[str] = None
+    title: str
+    status: str
+    date_added: Optional[datetime] = None
+    claimed_by: Optional[str] = None
+    claimed_at: Optional[datetime] = None
+
+class ClaimRequest(BaseModel):
+    moderator: str = Field(..., min_length=1, max_length=255)
+    limit: int = Field(10, gt=0, le=100)
+
+class DecisionRequest(BaseModel):
+    # Модератор, взявший перевалы в работу через /moderation/claim
+    moderator: str = Field(..., min_length=1, max_length=255)
+    ids: List[int] = Field(..., min_items=1, max_items=500)
+
+class DecisionResponse(BaseModel):
+    status: str
+    updated: List[int]
+    # Не найдены, уже получили решение или взяты в работу другим модератором
+    skipped: List[int]
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, List
+from typing import Dict, Optional, List
 
 class Coords(BaseModel):
     latitude: float = Field(..., gt=-90, lt=90)
@@ -17,7 +17,7 @@ class User(BaseModel):
     name: str
     otc: Optional[str] = None
 
-class PerevalInput(BaseModel):
+class PerevalData(BaseModel):
     beauty_title: Optional[str] = None
     title: str
     other_titles: Optional[str] = None
@@ -25,8 +25,27 @@ class PerevalInput(BaseModel):
     add_time: Optional[str] = None
     coords: Coords
     user: User
+
+class PerevalInput(PerevalData):
     images: List[Image]
 
-class PerevalResponse(PerevalInput):
+class ImageInfo(BaseModel):
+    id: int
+    title: str
+    mime_type: str
+    size: int
+    url: str
+    # Имя копии -> URL уменьшенной копии изображения
+    renditions: Dict[str, str]
+
+class PerevalResponse(BaseModel):
     id: int
-    status: str
\ No newline at end of file
+    status: str
+    beauty_title: Optional[str] = None
+    title: str
+    other_titles: Optional[str] = None
+    connect: Optional[str] = None
+    add_time: Optional[str] = None
+    coords: Coords
+    user: User
+    images: List[ImageInfo]
\ No newline at end of file
@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+class TileCluster(BaseModel):
+    latitude: float
+    longitude: float
+    count: int
+    # Для одиночной точки - сам перевал
+    id: Optional[int] = None
+    title: Optional[str] = None
+
+class TileResponse(BaseModel):
+    z: int
+    x: int
+    y: int
+    clusters: List[TileCluster]
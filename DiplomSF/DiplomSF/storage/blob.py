@@ -0,0 +1,232 @@
+import hashlib
+import os
+import tempfile
+from abc import ABC, abstractmethod
+
+CHUNK_SIZE = 64 * 1024
+
+# Сигнатуры форматов изображений: (смещение, байты, MIME-тип)
+_SIGNATURES = [
+    (0, b'\xff\xd8\xff', 'image/jpeg'),
+    (0, b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (0, b'GIF87a', 'image/gif'),
+    (0, b'GIF89a', 'image/gif'),
+    (8, b'WEBP', 'image/webp'),
+    (4, b'ftypheic', 'image/heic'),
+    (0, b'BM', 'image/bmp'),
+    (0, b'II*\x00', 'image/tiff'),
+    (0, b'MM\x00*', 'image/tiff'),
+]
+
+
+def detect_mime_type(data: bytes) -> str:
+    """Определяет MIME-тип изображения по первым байтам"""
+    for offset, signature, mime_type in _SIGNATURES:
+        if data[offset:offset + len(signature)] == signature:
+            return mime_type
+    return 'application/octet-stream'
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class BlobStore(ABC):
+    """
+    Хранилище бинарных данных с адресацией по содержимому (sha256).
+    Одинаковые данные хранятся один раз.
+    """
+
+    @abstractmethod
+    def put(self, data: bytes) -> str:
+        """Сохраняет данные и возвращает их хеш"""
+
+    @abstractmethod
+    def put_stream(self, stream, chunk_size: int = CHUNK_SIZE):
+        """
+        Сохраняет данные из файлового объекта, читая их кусками по chunk_size.
+        Возвращает (hash, size, head), где head - первый прочитанный кусок.
+        Пустой поток (size = 0) в хранилище не записывается.
+        """
+
+    @abstractmethod
+    def get(self, blob_hash: str) -> bytes:
+        ...
+
+    @abstractmethod
+    def open(self, blob_hash: str):
+        """Файловый объект для потокового чтения"""
+
+    @abstractmethod
+    def exists(self, blob_hash: str) -> bool:
+        ...
+
+    @abstractmethod
+    def delete(self, blob_hash: str):
+        ...
+
+    @abstractmethod
+    def modified_at(self, blob_hash: str) -> float:
+        """
+        Время последней записи blob-а (unix time); повторный put() его обновляет.
+        Для отсутствующего blob-а - FileNotFoundError
+        """
+
+    @abstractmethod
+    def list_blobs(self):
+        """Перебирает сохранённые blob-ы: (hash, время последней записи)"""
+
+    def iter_range(self, blob_hash: str, start: int, length: int, chunk_size: int = CHUNK_SIZE):
+        """Читает length байт начиная со start кусками по chunk_size"""
+        with self.open(blob_hash) as f:
+            f.seek(start)
+            remaining = length
+            while remaining > 0:
+                chunk = f.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+
+class LocalBlobStore(BlobStore):
+    """Хранилище в локальной файловой системе: <root>/ab/cd/abcd..."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, blob_hash: str) -> str:
+        if len(blob_hash) != 64 or not all(c in '0123456789abcdef' for c in blob_hash):
+            raise ValueError(f"Invalid blob hash: {blob_hash}")
+        return os.path.join(self.root, blob_hash[:2], blob_hash[2:4], blob_hash)
+
+    def put(self, data: bytes) -> str:
+        blob_hash = content_hash(data)
+        path = self.path(blob_hash)
+        if self._touch(path):
+            return blob_hash
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Пишем во временный файл и атомарно переименовываем,
+        # чтобы читатели не увидели недописанный blob
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return blob_hash
+
+    def put_stream(self, stream, chunk_size: int = CHUNK_SIZE):
+        os.makedirs(self.root, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        head = b''
+        # Хеш известен только в конце, поэтому пишем во временный файл
+        # в корне хранилища и затем переносим его на место
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                while True:
+                    chunk = stream.read(chunk_size)
+                    if not chunk:
+                        break
+                    if not head:
+                        head = chunk
+                    digest.update(chunk)
+                    size += len(chunk)
+                    f.write(chunk)
+            blob_hash = digest.hexdigest()
+            path = self.path(blob_hash)
+            if not size or self._touch(path):
+                # Пустые данные не сохраняются: изображением они не станут
+                os.remove(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return blob_hash, size, head
+
+    @staticmethod
+    def _touch(path: str) -> bool:
+        """
+        Обновляет время записи существующего файла; False, если файла нет.
+        Так чистка сирот (storage/sweep.py) не удалит старый blob, который
+        загрузили повторно и на который вот-вот сошлётся новая строка в БД
+        """
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def get(self, blob_hash: str) -> bytes:
+        with self.open(blob_hash) as f:
+            return f.read()
+
+    def open(self, blob_hash: str):
+        return open(self.path(blob_hash), 'rb')
+
+    def exists(self, blob_hash: str) -> bool:
+        return os.path.exists(self.path(blob_hash))
+
+    def delete(self, blob_hash: str):
+        try:
+            os.remove(self.path(blob_hash))
+        except FileNotFoundError:
+            pass
+
+    def modified_at(self, blob_hash: str) -> float:
+        return os.stat(self.path(blob_hash)).st_mtime
+
+    def list_blobs(self):
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                # Временные файлы недописанных blob-ов начинаются с '.tmp-'
+                if len(name) == 64 and all(c in '0123456789abcdef' for c in name):
+                    try:
+                        yield name, os.stat(os.path.join(directory, name)).st_mtime
+                    except FileNotFoundError:
+                        continue
+
+
+_blob_store = None
+
+
+def get_blob_store() -> BlobStore:
+    """
+    Хранилище, выбранное через FSTR_BLOB_BACKEND.
+    Сейчас поддерживается только 'local' (каталог FSTR_BLOB_DIR);
+    S3-совместимое хранилище подключается новой реализацией BlobStore.
+    """
+    global _blob_store
+    if _blob_store is None:
+        backend = os.getenv('FSTR_BLOB_BACKEND', 'local')
+        if backend == 'local':
+            _blob_store = LocalBlobStore(os.getenv('FSTR_BLOB_DIR', 'media/blobs'))
+        else:
+            raise ValueError(f"Unknown blob storage backend: {backend}")
+    return _blob_store
+
+
+def store_image(data: bytes):
+    """Сохраняет изображение в хранилище и возвращает (img_hash, img_size, mime_type) для таблицы images"""
+    return get_blob_store().put(data), len(data), detect_mime_type(data)
+
+
+def store_image_stream(stream, declared_type=None):
+    """
+    Потоково сохраняет изображение из файлового объекта.
+    Возвращает (img_hash, img_size, mime_type); если формат не распознан
+    по содержимому, используется заявленный клиентом тип изображения.
+    """
+    blob_hash, size, head = get_blob_store().put_stream(stream)
+    mime_type = detect_mime_type(head)
+    if mime_type == 'application/octet-stream' and declared_type and declared_type.startswith('image/'):
+        mime_type = declared_type
+    return blob_hash, size, mime_type
@@ -0,0 +1,105 @@
+"""
+Уменьшенные копии изображений (превью и средний размер).
+
+Копии создаются лениво при первом запросе в пуле процессов, чтобы
+декодирование и масштабирование не занимали event loop и GIL воркера.
+Готовые копии лежат в том же хранилище blob-ов, что и оригиналы.
+Для обработки нужен пакет Pillow; без него вместо копий отдаются оригиналы.
+"""
+import asyncio
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from app.storage.blob import get_blob_store, detect_mime_type
+
+try:
+    from PIL import Image as PILImage, ImageOps
+except ImportError:
+    PILImage = None
+
+# Название -> максимальная сторона в пикселях
+RENDITIONS = {
+    'thumb': 200,
+    'medium': 800,
+}
+
+JPEG_QUALITY = 85
+
+
+def renditions_available() -> bool:
+    return PILImage is not None
+
+
+def render(data: bytes, max_size: int):
+    """
+    Уменьшает изображение так, чтобы большая сторона не превышала max_size.
+    Возвращает закодированные байты или None, если изображение уже не больше
+    max_size или его не удалось прочитать - тогда используется оригинал.
+    Выполняется в дочернем процессе.
+    """
+    try:
+        with PILImage.open(io.BytesIO(data)) as image:
+            if image.width <= max_size and image.height <= max_size:
+                return None
+            # Для JPEG декодер сразу уменьшает картинку в 2-8 раз
+            image.draft('RGB', (max_size, max_size))
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((max_size, max_size))
+            output = io.BytesIO()
+            if image.mode in ('RGBA', 'LA', 'P'):
+                image.save(output, format='PNG', optimize=True)
+            else:
+                image.convert('RGB').save(output, format='JPEG', quality=JPEG_QUALITY, optimize=True)
+            return output.getvalue()
+    except Exception:
+        return None
+
+
+_executor = None
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """Пул процессов для обработки изображений; размер задаёт FSTR_IMAGE_WORKERS"""
+    global _executor
+    if _executor is None:
+        workers = os.getenv('FSTR_IMAGE_WORKERS')
+        _executor = ProcessPoolExecutor(max_workers=int(workers) if workers else None)
+    return _executor
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def create_rendition(img_hash: str, name: str):
+    """
+    Создаёт копию name для изображения img_hash и сохраняет её в хранилище.
+    Возвращает (rendition_hash, size, mime_type) или None, если копия
+    не нужна (изображение маленькое или не читается) и отдаётся оригинал.
+    """
+    if not renditions_available():
+        return None
+    store = get_blob_store()
+    data = await asyncio.to_thread(store.get, img_hash)
+    loop = asyncio.get_running_loop()
+    rendered = await loop.run_in_executor(get_executor(), render, data, RENDITIONS[name])
+    if rendered is None:
+        return None
+    rendition_hash = await asyncio.to_thread(store.put, rendered)
+    return rendition_hash, len(rendered), detect_mime_type(rendered)
+
+
+async def ensure_rendition(db, img_hash: str, img_size: int, mime_type: str, name: str):
+    """
+    Создаёт копию и записывает её в image_renditions через db (AsyncDatabaseManager).
+    Маленький или нечитаемый оригинал записывается как собственная копия,
+    поэтому вызывать только при renditions_available().
+    Возвращает (rendition_hash, size, mime_type).
+    """
+    rendition = await create_rendition(img_hash, name) or (img_hash, img_size, mime_type)
+    await db.add_image_rendition(img_hash, name, *rendition)
+    return rendition
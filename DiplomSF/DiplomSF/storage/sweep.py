@@ -0,0 +1,93 @@
+"""
+Чистка blob-ов, на которые не ссылается БД.
+
+Изображения записываются в хранилище до коммита транзакции, поэтому
+откаченная отправка, ошибка посреди запроса или изображение, удалённое
+через PATCH, оставляют blob без ссылок. Такой blob удаляется, если на него
+не ссылаются ни images.img_hash, ни image_renditions.rendition_hash и он не
+перезаписывался дольше grace секунд (FSTR_BLOB_SWEEP_GRACE, по умолчанию
+сутки): запрос, который только что сохранил изображение, успеет закоммитить
+ссылку на него. Повторная запись тех же данных обновляет время blob-а.
+
+Запуск по расписанию (например, из cron раз в сутки):
+    python -m app.storage.sweep [--grace SECONDS] [--dry-run]
+"""
+import argparse
+import os
+import time
+
+from app.database.manager import DatabaseManager
+from app.database.statements import execute_sync
+from app.storage.blob import get_blob_store
+
+SWEEP_GRACE = float(os.getenv('FSTR_BLOB_SWEEP_GRACE', '86400'))
+SWEEP_BATCH_SIZE = 1000
+
+
+def sweep_blobs(store, find_unreferenced, older_than: float, dry_run: bool = False,
+                batch_size: int = SWEEP_BATCH_SIZE):
+    """
+    Удаляет из store blob-ы, записанные раньше older_than (unix time), для
+    которых find_unreferenced(список хешей) не нашёл ссылок.
+    Возвращает список удалённых (при dry_run - подлежащих удалению) хешей.
+    """
+    removed = []
+
+    def flush(batch):
+        for blob_hash in find_unreferenced(batch):
+            # Blob могли загрузить заново, пока проверялись ссылки
+            try:
+                if store.modified_at(blob_hash) >= older_than:
+                    continue
+            except FileNotFoundError:
+                continue
+            if not dry_run:
+                store.delete(blob_hash)
+            removed.append(blob_hash)
+
+    batch = []
+    for blob_hash, modified_at in store.list_blobs():
+        if modified_at < older_than:
+            batch.append(blob_hash)
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+    return removed
+
+
+def sweep_orphan_blobs(grace: float = SWEEP_GRACE, dry_run: bool = False):
+    """Удаляет копии без оригиналов и blob-ы без ссылок из БД; возвращает удалённые хеши"""
+    with DatabaseManager().connection() as conn:
+        if not dry_run:
+            with conn.cursor() as cursor:
+                execute_sync(cursor, 'delete_orphan_renditions')
+            conn.commit()
+
+        def find_unreferenced(hashes):
+            with conn.cursor() as cursor:
+                execute_sync(cursor, 'get_unreferenced_blobs', (hashes,))
+                rows = cursor.fetchall()
+            conn.rollback()
+            return [row[0] for row in rows]
+
+        return sweep_blobs(get_blob_store(), find_unreferenced, time.time() - grace, dry_run)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Чистка хранилища изображений FSTR")
+    parser.add_argument("--grace", type=float, default=SWEEP_GRACE,
+                        help="Не трогать blob-ы, записанные менее N секунд назад")
+    parser.add_argument("--dry-run", action="store_true", help="Только показать, что будет удалено")
+    args = parser.parse_args(argv)
+
+    removed = sweep_orphan_blobs(args.grace, args.dry_run)
+    for blob_hash in removed:
+        print(blob_hash)
+    action = "Будет удалено" if args.dry_run else "Удалено"
+    print(f"{action} blob-ов без ссылок: {len(removed)}")
+
+
+if __name__ == "__main__":
+    main()
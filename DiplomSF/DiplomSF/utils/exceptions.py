@@ -1,4 +1,8 @@
 class UserNotFound(Exception):
     def __init__(self, user_id: int):
         self.user_id = user_id
-        super().__init__(f"User with id {user_id} not found")
\ No newline at end of file
+        super().__init__(f"User with id {user_id} not found")
+
+
+class InvalidImageReference(Exception):
+    pass
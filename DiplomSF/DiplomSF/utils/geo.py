@@ -0,0 +1,58 @@
+import math
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def radius_bbox(latitude: float, longitude: float, radius_km: float):
+    """
+    Прямоугольник (south, west, north, east), содержащий круг радиуса
+    radius_km вокруг точки. Используется как индексируемый предфильтр
+    перед точным расчётом расстояния.
+    """
+    lat_delta = radius_km / KM_PER_DEGREE
+    south = max(latitude - lat_delta, -90.0)
+    north = min(latitude + lat_delta, 90.0)
+    # У полюса или при огромном радиусе круг охватывает все долготы
+    max_cos = math.cos(math.radians(max(abs(south), abs(north))))
+    if north >= 90 or south <= -90 or max_cos <= 0:
+        return south, -180.0, north, 180.0
+    lon_delta = lat_delta / max_cos
+    west, east = longitude - lon_delta, longitude + lon_delta
+    # Круг, пересекающий 180-й меридиан, тоже накрывается полной полосой долгот
+    if west < -180 or east > 180:
+        return south, -180.0, north, 180.0
+    return south, west, north, east
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Расстояние по дуге большого круга в километрах"""
+    d_lat = math.radians(lat2 - lat1)
+    d_lon = math.radians(lon2 - lon1)
+    a = (math.sin(d_lat / 2) ** 2
+         + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(d_lon / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+# Тайлы карты в проекции Web Mercator (схема z/x/y, как у OSM)
+MAX_TILE_ZOOM = 18
+MAX_TILE_LATITUDE = 85.0511287798
+
+
+def _tile_latitude(y: float, n: int) -> float:
+    return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+
+
+def tile_bbox(z: int, x: int, y: int):
+    """Границы тайла (south, west, north, east) в градусах"""
+    n = 2 ** z
+    return _tile_latitude(y + 1, n), x / n * 360 - 180, _tile_latitude(y, n), (x + 1) / n * 360 - 180
+
+
+def point_tile(latitude: float, longitude: float, z: int):
+    """Тайл (x, y) масштаба z, в который попадает точка"""
+    n = 2 ** z
+    latitude = max(min(latitude, MAX_TILE_LATITUDE), -MAX_TILE_LATITUDE)
+    x = int((longitude + 180) / 360 * n)
+    y = int((1 - math.asinh(math.tan(math.radians(latitude))) / math.pi) / 2 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
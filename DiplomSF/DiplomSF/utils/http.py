@@ -0,0 +1,44 @@
+import re
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(Exception):
+    def __init__(self, size: int):
+        self.size = size
+        super().__init__(f"Requested range not satisfiable for {size} bytes")
+
+
+def parse_range(header, size: int):
+    """
+    Разбирает заголовок Range с одним диапазоном байт.
+    Возвращает (start, end) включительно или None, если диапазон не задан
+    или не поддерживается (тогда отдаётся весь ресурс).
+    """
+    if not header:
+        return None
+    match = _RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # bytes=-N: последние N байт
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiable(size)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        raise RangeNotSatisfiable(size)
+    return start, min(end, size - 1)
+
+
+def etag_matches(if_none_match, etag: str) -> bool:
+    """Проверяет заголовок If-None-Match на совпадение с ETag"""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in tags or etag in tags or f'W/{etag}' in tags
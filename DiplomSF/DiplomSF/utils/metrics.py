@@ -0,0 +1,225 @@
+"""
+Метрики процесса в текстовом формате Prometheus (GET /metrics).
+
+MetricsMiddleware - чистое ASGI-middleware: на запрос приходится пара вызовов
+perf_counter, подсчёт байт тела и одно обновление гистограмм под блокировкой.
+Маршрут берётся шаблоном (/submitData/{pereval_id}), а не фактическим путём,
+чтобы число рядов не росло с числом перевалов. Остальные метрики (пулы
+соединений, запросы к БД, кеши) собираются в момент запроса /metrics.
+Каждый воркер uvicorn отдаёт свои значения.
+"""
+import bisect
+import threading
+import time
+
+from app.database.async_manager import user_id_cache
+from app.database.instrumentation import DURATION_BUCKETS, query_stats
+from app.database.pool import async_pools_stats, sync_pools_stats
+from app.utils.response_cache import get_response_cache
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Верхние границы корзин размеров тел запроса и ответа, байты
+SIZE_BUCKETS = (100, 1000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+
+UNMATCHED_ROUTE = '<unmatched>'
+
+
+class Histogram:
+    """Гистограмма с метками; значения меток - кортеж в порядке labelnames"""
+
+    def __init__(self, name: str, help_text: str, labelnames, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        # метки -> [счётчики корзин..., +Inf, сумма]
+        self._series = {}
+
+    def observe(self, labels: tuple, value: float):
+        bucket = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            series[bucket] += 1
+            series[-1] += value
+
+    def collect(self):
+        """[(метки, накопленные счётчики корзин с +Inf, сумма)]"""
+        with self._lock:
+            items = [(labels, list(series)) for labels, series in self._series.items()]
+        result = []
+        for labels, series in items:
+            cumulative, running = [], 0
+            for value in series[:-1]:
+                running += value
+                cumulative.append(running)
+            result.append((labels, cumulative, series[-1]))
+        return result
+
+    def render(self, lines: list):
+        render_histogram(lines, self.name, self.help_text, self.labelnames, self.buckets, self.collect())
+
+
+class HttpMetrics:
+    def __init__(self):
+        self.in_flight = 0
+        self.duration = Histogram(
+            'fstr_http_request_duration_seconds', 'HTTP request latency',
+            ('method', 'route', 'status'), DURATION_BUCKETS
+        )
+        self.request_size = Histogram(
+            'fstr_http_request_size_bytes', 'HTTP request body size',
+            ('method', 'route'), SIZE_BUCKETS
+        )
+        self.response_size = Histogram(
+            'fstr_http_response_size_bytes', 'HTTP response body size',
+            ('method', 'route'), SIZE_BUCKETS
+        )
+
+
+http_metrics = HttpMetrics()
+
+
+class MetricsMiddleware:
+    def __init__(self, app, metrics: HttpMetrics = http_metrics):
+        self.app = app
+        self.metrics = metrics
+        self._route_paths = None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        metrics = self.metrics
+        sizes = [0, 0]
+        status = [500]
+
+        async def counting_receive():
+            message = await receive()
+            if message['type'] == 'http.request':
+                sizes[0] += len(message.get('body', b''))
+            return message
+
+        async def counting_send(message):
+            if message['type'] == 'http.response.start':
+                status[0] = message['status']
+            elif message['type'] == 'http.response.body':
+                sizes[1] += len(message.get('body', b''))
+            await send(message)
+
+        metrics.in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            duration = time.perf_counter() - start
+            metrics.in_flight -= 1
+            method = scope['method']
+            route = self._route(scope)
+            metrics.duration.observe((method, route, str(status[0])), duration)
+            metrics.request_size.observe((method, route), sizes[0])
+            metrics.response_size.observe((method, route), sizes[1])
+
+    def _route(self, scope):
+        """Шаблон пути маршрута, обработавшего запрос (роутер записывает endpoint в scope)"""
+        endpoint = scope.get('endpoint')
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+        if self._route_paths is None:
+            self._route_paths = {}
+            for route in getattr(scope.get('app'), 'routes', ()):
+                self._route_paths.setdefault(getattr(route, 'endpoint', None), route.path)
+        return self._route_paths.get(endpoint, UNMATCHED_ROUTE)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labelnames, values, extra=None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_histogram(lines, name, help_text, labelnames, buckets, series):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} histogram')
+    bounds = [_number(bound) for bound in buckets] + ['+Inf']
+    for labels, cumulative, total in series:
+        for bound, count in zip(bounds, cumulative):
+            le = 'le="' + bound + '"'
+            lines.append(f'{name}_bucket{_labels(labelnames, labels, le)} {count}')
+        lines.append(f'{name}_sum{_labels(labelnames, labels)} {_number(total)}')
+        lines.append(f'{name}_count{_labels(labelnames, labels)} {cumulative[-1]}')
+
+
+def render_metric(lines, name, metric_type, help_text, samples):
+    """samples - [(имена меток, значения меток, значение)]"""
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} {metric_type}')
+    for labelnames, labels, value in samples:
+        lines.append(f'{name}{_labels(labelnames, labels)} {_number(value)}')
+
+
+def _pool_samples():
+    samples = {"open": [], "in_use": [], "max": [], "waiting": []}
+    pools = [('sync', db, stats) for db, stats in sync_pools_stats()]
+    pools += [('async', db, stats) for db, stats in async_pools_stats()]
+    for kind, db, stats in pools:
+        for key, values in samples.items():
+            if key in stats:
+                values.append((('pool', 'db'), (kind, db), stats[key]))
+    return samples
+
+
+def _cache_samples():
+    caches = (('response', get_response_cache()), ('user_id', user_id_cache))
+    hits, misses, ratios = [], [], []
+    for name, cache in caches:
+        hits.append((('cache',), (name,), cache.hits))
+        misses.append((('cache',), (name,), cache.misses))
+        lookups = cache.hits + cache.misses
+        ratios.append((('cache',), (name,), cache.hits / lookups if lookups else 0.0))
+    return hits, misses, ratios
+
+
+def render_metrics(metrics: HttpMetrics = http_metrics) -> str:
+    lines = []
+    render_metric(lines, 'fstr_http_requests_in_flight', 'gauge', 'HTTP requests being processed',
+                  [((), (), metrics.in_flight)])
+    metrics.duration.render(lines)
+    metrics.request_size.render(lines)
+    metrics.response_size.render(lines)
+
+    queries = query_stats.snapshot()
+    render_histogram(
+        lines, 'fstr_db_query_duration_seconds', 'Database query latency by DatabaseQueries name',
+        ('query',), DURATION_BUCKETS,
+        [((name,), stat['buckets'], stat['sum']) for name, stat in sorted(queries.items())]
+    )
+    render_metric(lines, 'fstr_db_query_errors_total', 'counter', 'Failed database queries',
+                  [(('query',), (name,), stat['errors']) for name, stat in sorted(queries.items())])
+    render_metric(lines, 'fstr_db_query_rows_total', 'counter', 'Rows returned or changed by database queries',
+                  [(('query',), (name,), stat['rows']) for name, stat in sorted(queries.items())])
+
+    pools = _pool_samples()
+    render_metric(lines, 'fstr_db_pool_connections_open', 'gauge', 'Open pooled connections', pools['open'])
+    render_metric(lines, 'fstr_db_pool_connections_in_use', 'gauge', 'Pooled connections checked out', pools['in_use'])
+    render_metric(lines, 'fstr_db_pool_connections_max', 'gauge', 'Pool size limit', pools['max'])
+    render_metric(lines, 'fstr_db_pool_requests_waiting', 'gauge', 'Requests waiting for a connection', pools['waiting'])
+
+    hits, misses, ratios = _cache_samples()
+    render_metric(lines, 'fstr_cache_hits_total', 'counter', 'Cache hits', hits)
+    render_metric(lines, 'fstr_cache_misses_total', 'counter', 'Cache misses', misses)
+    render_metric(lines, 'fstr_cache_hit_ratio', 'gauge', 'Cache hits / lookups since start', ratios)
+    return '\n'.join(lines) + '\n'
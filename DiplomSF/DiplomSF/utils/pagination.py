@@ -0,0 +1,72 @@
+import base64
+import json
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(last_id: int) -> str:
+    """Непрозрачный курсор следующей страницы по id последней записи"""
+    raw = json.dumps({"id": last_id}, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor) -> int:
+    """Возвращает id, после которого начинается страница (0 - с начала)"""
+    if not cursor:
+        return 0
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        last_id = json.loads(raw)["id"]
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(last_id, int) or last_id < 0:
+        raise ValueError("Invalid cursor")
+    return last_id
+
+
+def paginate(rows, limit: int):
+    """
+    Обрезает выборку из limit + 1 строк до limit и возвращает
+    (rows, next_cursor); next_cursor равен None на последней странице.
+    Первый элемент каждой строки - id (для строк-словарей - поле id).
+    """
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(last["id"] if isinstance(last, dict) else last[0])
+
+
+def encode_rank_cursor(rank: float, last_id: int) -> str:
+    """Курсор выдачи, упорядоченной по (rank DESC, id): ранг и id последней записи"""
+    raw = json.dumps({"rank": rank, "id": last_id}, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_rank_cursor(cursor):
+    """
+    Возвращает (rank, id), после которых начинается страница;
+    без курсора - (inf, 0), что пропускает любую запись
+    """
+    if not cursor:
+        return float('inf'), 0
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        data = json.loads(raw)
+        rank, last_id = data["rank"], data["id"]
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(rank, (int, float)) or not isinstance(last_id, int) or last_id < 0:
+        raise ValueError("Invalid cursor")
+    return float(rank), last_id
+
+
+def paginate_ranked(rows, limit: int):
+    """
+    Как paginate, но для строк (id, ..., rank): курсор следующей страницы
+    содержит ранг и id последней строки
+    """
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_rank_cursor(rows[-1][-1], rows[-1][0])
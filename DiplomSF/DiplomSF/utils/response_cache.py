@@ -0,0 +1,198 @@
+"""
+Кеш готовых ответов API.
+
+В кеше лежат сериализованные тела ответов вместе с их ETag. Бэкенд
+выбирается переменной FSTR_CACHE_BACKEND:
+    memory - LRU в памяти процесса (по умолчанию);
+    redis  - общий для всех воркеров кеш по адресу FSTR_CACHE_URL (нужен пакет redis);
+    none   - кеширование отключено.
+"""
+import hashlib
+import os
+from abc import ABC, abstractmethod
+from typing import NamedTuple, Optional
+
+from fastapi import Response
+
+from app.utils.cache import TTLCache
+from app.utils.geo import MAX_TILE_ZOOM, point_tile
+from app.utils.http import etag_matches
+
+# Перевалы с этими статусами больше не меняются
+IMMUTABLE_STATUSES = ('accepted', 'rejected')
+
+
+class CacheBackend(ABC):
+    """Хранилище байтовых значений с временем жизни"""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float):
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str):
+        ...
+
+
+class NullCacheBackend(CacheBackend):
+    async def get(self, key):
+        return None
+
+    async def set(self, key, value, ttl):
+        pass
+
+    async def delete(self, key):
+        pass
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    LRU-кеш в памяти процесса. Инвалидация видна только этому процессу,
+    в других воркерах запись живёт до истечения ttl.
+    """
+
+    def __init__(self, maxsize: int = 1000):
+        self._cache = TTLCache(maxsize=maxsize)
+
+    async def get(self, key):
+        return self._cache.get(key)
+
+    async def set(self, key, value, ttl):
+        self._cache.set(key, value, ttl=ttl)
+
+    async def delete(self, key):
+        self._cache.pop(key)
+
+
+class RedisCacheBackend(CacheBackend):
+    def __init__(self, url: str, prefix: str = 'fstr:'):
+        try:
+            from redis import asyncio as redis
+        except ImportError:
+            raise RuntimeError("FSTR_CACHE_BACKEND=redis requires the 'redis' package")
+        self.prefix = prefix
+        self._client = redis.from_url(url)
+
+    async def get(self, key):
+        return await self._client.get(self.prefix + key)
+
+    async def set(self, key, value, ttl):
+        await self._client.set(self.prefix + key, value, px=max(1, int(ttl * 1000)))
+
+    async def delete(self, key):
+        await self._client.delete(self.prefix + key)
+
+
+class CachedResponse(NamedTuple):
+    etag: str
+    body: bytes
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+class ResponseCache:
+    """
+    Read-through кеш ответов: значение хранится как "ETag\\nтело",
+    поэтому ETag не пересчитывается при каждом попадании.
+    Ошибки бэкенда не роняют запрос - он просто обслуживается из БД.
+    Записи о перевалах в изменяемых статусах живут коротко (ttl),
+    в accepted/rejected - долго (immutable_ttl), тайлы карты - tile_ttl.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float = 30, immutable_ttl: float = 86400,
+                 tile_ttl: float = 3600):
+        self.backend = backend
+        self.ttl = ttl
+        self.immutable_ttl = immutable_ttl
+        self.tile_ttl = tile_ttl
+        self.hits = 0
+        self.misses = 0
+
+    def ttl_for_status(self, status: str) -> float:
+        return self.immutable_ttl if status in IMMUTABLE_STATUSES else self.ttl
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        try:
+            value = await self.backend.get(key)
+        except Exception:
+            value = None
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        etag, body = value.split(b'\n', 1)
+        return CachedResponse(etag.decode(), body)
+
+    async def set(self, key: str, body: bytes, ttl: float) -> CachedResponse:
+        cached = CachedResponse(make_etag(body), body)
+        try:
+            await self.backend.set(key, cached.etag.encode() + b'\n' + body, ttl)
+        except Exception:
+            pass
+        return cached
+
+    async def invalidate(self, key: str):
+        try:
+            await self.backend.delete(key)
+        except Exception:
+            # Запись всё равно истечёт по ttl
+            pass
+
+
+def cached_json_response(cached: CachedResponse, if_none_match: Optional[str]) -> Response:
+    """Ответ из кеша: 304, если клиент прислал тот же ETag"""
+    headers = {"ETag": cached.etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
+
+def pereval_cache_key(pereval_id: int) -> str:
+    return f"pereval:{pereval_id}"
+
+
+def tile_cache_key(z: int, x: int, y: int) -> str:
+    return f"tile:{z}/{x}/{y}"
+
+
+_response_cache = None
+
+
+def get_response_cache() -> ResponseCache:
+    """Кеш ответов, настроенный переменными FSTR_CACHE_*"""
+    global _response_cache
+    if _response_cache is None:
+        backend_name = os.getenv('FSTR_CACHE_BACKEND', 'memory')
+        if backend_name == 'memory':
+            backend = MemoryCacheBackend(int(os.getenv('FSTR_CACHE_SIZE', '1000')))
+        elif backend_name == 'redis':
+            backend = RedisCacheBackend(os.getenv('FSTR_CACHE_URL', 'redis://localhost:6379/0'))
+        elif backend_name == 'none':
+            backend = NullCacheBackend()
+        else:
+            raise ValueError(f"Unknown cache backend: {backend_name}")
+        _response_cache = ResponseCache(
+            backend,
+            ttl=float(os.getenv('FSTR_CACHE_TTL', '30')),
+            immutable_ttl=float(os.getenv('FSTR_CACHE_TTL_IMMUTABLE', '86400')),
+            tile_ttl=float(os.getenv('FSTR_CACHE_TTL_TILES', '3600'))
+        )
+    return _response_cache
+
+
+async def invalidate_pereval(pereval_id: int):
+    """Сбрасывает закешированную карточку перевала (после правки или смены статуса)"""
+    await get_response_cache().invalidate(pereval_cache_key(pereval_id))
+
+
+async def invalidate_tiles(latitude: float, longitude: float):
+    """Сбрасывает тайлы всех масштабов, содержащие точку (при смене статуса перевала)"""
+    response_cache = get_response_cache()
+    for z in range(MAX_TILE_ZOOM + 1):
+        await response_cache.invalidate(tile_cache_key(z, *point_tile(latitude, longitude, z)))
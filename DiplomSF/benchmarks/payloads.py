@@ -0,0 +1,84 @@
+"""
+Генератор правдоподобных тел запросов для бенчмарка.
+
+Изображения - байты с сигнатурой JPEG и уникальным хвостом, чтобы хранилище
+с адресацией по содержимому не схлопывало их в один blob. Общий буфер
+кодируется в base64 один раз: для длины, кратной 3, base64 префикса - это
+префикс base64 буфера, к нему дописывается base64 уникального хвоста.
+"""
+import base64
+import random
+
+JPEG_HEADER = b'\xff\xd8\xff\xe0\x00\x10JFIF\x00'
+# Длина хвоста кратна 3, поэтому base64 частей можно склеивать
+SUFFIX_SIZE = 15
+MAX_IMAGES = 50
+
+
+class PayloadFactory:
+    def __init__(self, seed: int = 0, min_image_kb: int = 5, max_image_kb: int = 500,
+                 median_image_kb: int = 120, users: int = 100):
+        self.rng = random.Random(seed)
+        self.min_size = min_image_kb * 1024
+        self.max_size = max_image_kb * 1024
+        self.median_size = median_image_kb * 1024
+        self.emails = [f"bench{i}@example.com" for i in range(users)]
+        self._counter = 0
+        # Общая часть изображений максимального размера, длина кратна 3
+        body_size = self.max_size - self.max_size % 3
+        data = JPEG_HEADER + self.rng.randbytes(body_size - len(JPEG_HEADER))
+        self._base_b64 = base64.b64encode(data).decode()
+
+    def image_size(self) -> int:
+        """Размер снимка: логнормальное распределение вокруг медианы"""
+        size = int(self.rng.lognormvariate(0, 0.8) * self.median_size)
+        size = max(self.min_size, min(self.max_size - SUFFIX_SIZE, size))
+        return size - size % 3
+
+    def image_count(self) -> int:
+        """Число снимков в отчёте: чаще 1-5, изредка до 50"""
+        return min(MAX_IMAGES, 1 + int(self.rng.expovariate(1 / 6)))
+
+    def image(self) -> str:
+        """Новое уникальное изображение в base64"""
+        size = self.image_size()
+        prefix = self._base_b64[:size // 3 * 4]
+        self._counter += 1
+        suffix = self._counter.to_bytes(8, 'big') + self.rng.randbytes(SUFFIX_SIZE - 8)
+        return prefix + base64.b64encode(suffix).decode()
+
+    def coords(self):
+        # Кавказ и Алтай, чтобы запросы по карте находили соседей
+        lat, lon = self.rng.choice(((43.3, 42.5), (50.0, 87.0)))
+        return {
+            "latitude": round(lat + self.rng.uniform(-1, 1), 6),
+            "longitude": round(lon + self.rng.uniform(-1, 1), 6),
+            "height": self.rng.randint(1000, 5000),
+        }
+
+    def email(self) -> str:
+        return self.rng.choice(self.emails)
+
+    def pereval(self, images: int = None) -> dict:
+        """Тело POST /submitData"""
+        number = self.rng.randint(1, 10 ** 6)
+        email = self.email()
+        return {
+            "beauty_title": "пер.",
+            "title": f"Перевал {number}",
+            "other_titles": f"Benchmark {number}",
+            "connect": "",
+            "add_time": f"{self.rng.randint(0, 23):02d}:{self.rng.randint(0, 59):02d}:00",
+            "user": {
+                "email": email,
+                "phone": "+7 999 000 00 00",
+                "fam": "Бенчмарков",
+                "name": email.split('@')[0],
+                "otc": None,
+            },
+            "coords": self.coords(),
+            "images": [
+                {"img": self.image(), "title": f"Снимок {i + 1}"}
+                for i in range(self.image_count() if images is None else images)
+            ],
+        }
@@ -0,0 +1,76 @@
+"""Сводка результатов бенчмарка и сравнение с базовым прогоном"""
+import json
+
+# Метрики сводки: (ключ, больше - лучше)
+COMPARED = (('throughput', True), ('p50', False), ('p99', False))
+
+
+def percentile(sorted_values, q: float) -> float:
+    """Перцентиль q (0-100) по методу ближайшего ранга; значения отсортированы"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * q // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def summarize(latencies, errors: int, elapsed: float) -> dict:
+    """latencies - длительности успешных запросов, секунды"""
+    values = sorted(latencies)
+    ms = lambda value: round(value * 1000, 2)
+    return {
+        "count": len(values),
+        "errors": errors,
+        "throughput": round(len(values) / elapsed, 2) if elapsed else 0.0,
+        "mean": ms(sum(values) / len(values)) if values else 0.0,
+        "p50": ms(percentile(values, 50)),
+        "p90": ms(percentile(values, 90)),
+        "p99": ms(percentile(values, 99)),
+        "max": ms(values[-1]) if values else 0.0,
+    }
+
+
+def format_results(results: dict) -> str:
+    lines = [f"{'operation':<14}{'count':>8}{'errors':>8}{'req/s':>10}"
+             f"{'mean ms':>10}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}"]
+    for name, stat in results.items():
+        lines.append(
+            f"{name:<14}{stat['count']:>8}{stat['errors']:>8}{stat['throughput']:>10}"
+            f"{stat['mean']:>10}{stat['p50']:>10}{stat['p90']:>10}{stat['p99']:>10}{stat['max']:>10}"
+        )
+    return '\n'.join(lines)
+
+
+def compare(results: dict, baseline: dict, threshold: float):
+    """
+    Сравнивает результаты с базовыми. Возвращает (строки отчёта, регрессии):
+    регрессия - ухудшение пропускной способности, p50 или p99 больше чем
+    на threshold процентов.
+    """
+    lines = [f"{'operation':<14}{'metric':<12}{'baseline':>10}{'current':>10}{'change':>10}"]
+    regressions = []
+    for name, stat in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for key, higher_is_better in COMPARED:
+            before, after = base[key], stat[key]
+            if not before:
+                continue
+            change = (after - before) / before * 100
+            worse = -change if higher_is_better else change
+            mark = ''
+            if worse > threshold:
+                mark = '  REGRESSION'
+                regressions.append(f"{name} {key}: {before} -> {after} ({change:+.1f}%)")
+            lines.append(f"{name:<14}{key:<12}{before:>10}{after:>10}{change:>+9.1f}%{mark}")
+    return lines, regressions
+
+
+def save(path: str, meta: dict, results: dict):
+    with open(path, 'w') as f:
+        json.dump({"meta": meta, "results": results}, f, ensure_ascii=False, indent=2)
+
+
+def load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)["results"]
@@ -0,0 +1,206 @@
+"""
+Нагрузочный бенчмарк горячих путей API.
+
+Писатели отправляют отчёты POST /submitData с 1-50 снимками разного размера,
+читатели параллельно запрашивают GET /submitData/{id}, список перевалов
+пользователя и перевалы рядом с точкой. По каждой операции выводятся
+пропускная способность и перцентили задержки.
+
+По умолчанию приложение запускается в этом же процессе поверх временной базы
+(см. seed.py); с --url нагрузка идёт на уже запущенный сервер и его базу.
+Результат сохраняется в JSON (--output) и сравнивается с базовым прогоном
+(--baseline): при ухудшении больше --threshold процентов код выхода 1.
+
+Запуск из каталога проекта (переменные FSTR_DB_* - как для приложения):
+    python -m benchmarks.run --writers 4 --readers 16 --duration 30 --output new.json
+    python -m benchmarks.run --baseline old.json
+"""
+import argparse
+import asyncio
+import importlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.payloads import PayloadFactory
+from benchmarks.report import compare, format_results, load, save, summarize
+from benchmarks.seed import create_database, drop_database, seed
+
+# Операции читателей и их доли
+READ_MIX = (('get_pereval', 0.7), ('user_perevals', 0.2), ('nearby', 0.1))
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self.recording = False
+
+    def add(self, operation: str, duration: float, ok: bool):
+        if not self.recording:
+            return
+        if ok:
+            self.latencies.setdefault(operation, []).append(duration)
+        else:
+            self.errors[operation] = self.errors.get(operation, 0) + 1
+
+    def summary(self, elapsed: float) -> dict:
+        operations = sorted(set(self.latencies) | set(self.errors))
+        return {
+            name: summarize(self.latencies.get(name, []), self.errors.get(name, 0), elapsed)
+            for name in operations
+        }
+
+
+async def timed(recorder, operation, request):
+    start = time.perf_counter()
+    try:
+        response = await request
+        ok = response.status_code < 400
+        if ok and operation == 'submit':
+            ok = response.json().get("status") == 200
+    except httpx.HTTPError:
+        response, ok = None, False
+    recorder.add(operation, time.perf_counter() - start, ok)
+    return response
+
+
+async def writer(client, factory, recorder, ids, stop):
+    while not stop.is_set():
+        response = await timed(recorder, 'submit', client.post('/submitData', json=factory.pereval()))
+        if response is not None and response.status_code == 200 and response.json().get("id"):
+            ids.append(response.json()["id"])
+        await asyncio.sleep(0)
+
+
+async def reader(client, factory, recorder, ids, stop):
+    operations = [name for name, _ in READ_MIX]
+    weights = [weight for _, weight in READ_MIX]
+    rng = factory.rng
+    while not stop.is_set():
+        operation = rng.choices(operations, weights)[0]
+        if operation == 'get_pereval':
+            request = client.get(f'/submitData/{rng.choice(ids)}')
+        elif operation == 'user_perevals':
+            request = client.get('/submitData/', params={"user__email": factory.email(), "limit": 50})
+        else:
+            coords = factory.coords()
+            request = client.get('/submitData/nearby', params={
+                "lat": coords["latitude"], "lon": coords["longitude"], "radius_km": 20
+            })
+        await timed(recorder, operation, request)
+        # Ответ из кеша приходит без единого переключения event loop;
+        # без этой точки читатели не отдали бы управление таймеру прогона
+        await asyncio.sleep(0)
+
+
+def load_app(path: str):
+    module_name, _, attr = path.partition(':')
+    return getattr(importlib.import_module(module_name), attr or 'app')
+
+
+async def run(args) -> dict:
+    database = blob_dir = client = None
+    try:
+        if args.url:
+            transport = None
+        else:
+            if 'FSTR_BLOB_DIR' not in os.environ:
+                blob_dir = os.environ['FSTR_BLOB_DIR'] = tempfile.mkdtemp(prefix='fstr-bench-blobs-')
+            if args.no_cache:
+                os.environ['FSTR_CACHE_BACKEND'] = 'none'
+            if args.database:
+                os.environ['FSTR_DB_NAME'] = args.database
+            else:
+                database = f"fstr_bench_{os.getpid()}"
+                create_database(database)
+            transport = httpx.ASGITransport(app=load_app(args.app))
+
+        limits = httpx.Limits(max_connections=args.writers + args.readers + 1)
+        client = httpx.AsyncClient(
+            transport=transport, base_url=args.url or 'http://bench', timeout=args.timeout, limits=limits
+        )
+        seed_factory = PayloadFactory(args.seed, min_image_kb=2, max_image_kb=30, median_image_kb=8)
+        ids = await seed(client, seed_factory, args.seed_perevals)
+        print(f"Seeded {len(ids)} perevals", file=sys.stderr)
+
+        recorder = Recorder()
+        stop = asyncio.Event()
+        workers = [
+            writer(client, PayloadFactory(args.seed + 1 + i, max_image_kb=args.max_image_kb), recorder, ids, stop)
+            for i in range(args.writers)
+        ] + [
+            reader(client, PayloadFactory(args.seed + 1000 + i, max_image_kb=30), recorder, ids, stop)
+            for i in range(args.readers)
+        ]
+        tasks = [asyncio.create_task(worker) for worker in workers]
+
+        await asyncio.sleep(args.warmup)
+        recorder.recording = True
+        start = time.perf_counter()
+        await asyncio.sleep(args.duration)
+        recorder.recording = False
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await asyncio.gather(*tasks)
+        return recorder.summary(elapsed)
+    finally:
+        if client is not None:
+            await client.aclose()
+        if database and not args.keep:
+            await drop_database(database)
+        if blob_dir:
+            shutil.rmtree(blob_dir, ignore_errors=True)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Бенчмарк API FSTR")
+    parser.add_argument("--app", default="app.main:app",
+                        help="ASGI-приложение в процессе, module:attr")
+    parser.add_argument("--url", help="Нагружать запущенный сервер вместо приложения в процессе")
+    parser.add_argument("--database", help="Существующая база вместо временной")
+    parser.add_argument("--keep", action="store_true", help="Не удалять временную базу")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Отключить кеш ответов, чтобы чтения шли в БД")
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30, help="Длительность замера, секунд")
+    parser.add_argument("--warmup", type=float, default=5, help="Прогрев без замера, секунд")
+    parser.add_argument("--seed-perevals", type=int, default=1000, help="Перевалов в начальных данных (не меньше 1)")
+    parser.add_argument("--max-image-kb", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=42, help="Зерно генератора данных")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--output", help="Сохранить результаты в JSON")
+    parser.add_argument("--baseline", help="JSON базового прогона для сравнения")
+    parser.add_argument("--threshold", type=float, default=10,
+                        help="Допустимое ухудшение относительно базового прогона, %%")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.seed_perevals < 1:
+        parser.error("--seed-perevals must be at least 1")
+
+    results = asyncio.run(run(args))
+    print(format_results(results))
+
+    if args.output:
+        save(args.output, vars(args), results)
+
+    if args.baseline:
+        lines, regressions = compare(results, load(args.baseline), args.threshold)
+        print()
+        print('\n'.join(lines))
+        if regressions:
+            print("\nRegressions:\n  " + "\n  ".join(regressions), file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
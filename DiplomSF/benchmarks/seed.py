@@ -0,0 +1,64 @@
+"""
+Временная база данных и начальные данные для бенчмарка.
+
+База fstr_bench_<pid> создаётся на сервере из FSTR_DB_* и удаляется после
+прогона. Данные загружаются через POST /submitData/batch, поэтому сидер
+работает и с приложением в процессе, и с запущенным сервером (--url).
+"""
+import os
+
+import psycopg
+from psycopg import sql
+
+from app.database.pool import close_all_async_pools, close_all_pools
+
+SEED_BATCH_SIZE = 100
+
+
+def _admin_connection():
+    return psycopg.connect(
+        host=os.getenv('FSTR_DB_HOST'),
+        port=os.getenv('FSTR_DB_PORT'),
+        user=os.getenv('FSTR_DB_LOGIN'),
+        password=os.getenv('FSTR_DB_PASS'),
+        dbname=os.getenv('FSTR_DB_ADMIN_NAME', 'postgres'),
+        autocommit=True
+    )
+
+
+def create_database(name: str):
+    """Создаёт пустую базу name и накатывает на неё миграции"""
+    from app.database.migrations import run_migrations
+
+    with _admin_connection() as conn:
+        conn.execute(sql.SQL("CREATE DATABASE {}").format(sql.Identifier(name)))
+    os.environ['FSTR_DB_NAME'] = name
+    run_migrations()
+
+
+async def drop_database(name: str):
+    """Закрывает пулы приложения и удаляет базу name"""
+    await close_all_async_pools()
+    close_all_pools()
+    with _admin_connection() as conn:
+        conn.execute(sql.SQL("DROP DATABASE IF EXISTS {}").format(sql.Identifier(name)))
+
+
+async def seed(client, factory, perevals: int, max_images: int = 3):
+    """
+    Загружает perevals перевалов по 1..max_images небольших снимков.
+    Возвращает id созданных перевалов.
+    """
+    ids = []
+    for start in range(0, perevals, SEED_BATCH_SIZE):
+        items = [
+            factory.pereval(images=factory.rng.randint(1, max_images))
+            for _ in range(min(SEED_BATCH_SIZE, perevals - start))
+        ]
+        response = await client.post('/submitData/batch', json=items)
+        response.raise_for_status()
+        for result in response.json():
+            if result["id"] is None:
+                raise RuntimeError(f"Seeding failed: {result['message']}")
+            ids.append(result["id"])
+    return ids
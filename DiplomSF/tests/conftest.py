@@ -18,6 +18,8 @@ def test_db():
         with db.conn.cursor() as cursor:
             for query in DatabaseQueries.get_all_tables_creation_queries():
                 cursor.execute(query)
+            for query in DatabaseQueries.get_all_indexes_creation_queries():
+                cursor.execute(query)
             db.conn.commit()
     except Exception as e:
         db.conn.rollback()
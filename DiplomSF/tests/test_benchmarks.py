@@ -0,0 +1,58 @@
+import base64
+
+from benchmarks.payloads import MAX_IMAGES, PayloadFactory
+from benchmarks.report import compare, percentile, summarize
+from benchmarks.run import build_parser, load_app
+
+
+class TestReport:
+    def test_percentile(self):
+        values = list(range(1, 101))
+        assert percentile(values, 50) == 50
+        assert percentile(values, 99) == 99
+        assert percentile(values, 100) == 100
+        assert percentile([], 50) == 0.0
+
+    def test_summarize(self):
+        stat = summarize([0.001, 0.002, 0.003, 0.004], errors=1, elapsed=2)
+        assert stat["count"] == 4
+        assert stat["errors"] == 1
+        assert stat["throughput"] == 2.0
+        assert stat["p50"] == 2.0
+        assert stat["max"] == 4.0
+
+    def test_compare_flags_regressions(self):
+        """Падение пропускной способности или рост p99 больше порога - регрессия"""
+        baseline = {"submit": {"throughput": 100, "p50": 10, "p99": 50}}
+        current = {"submit": {"throughput": 95, "p50": 10, "p99": 70}, "nearby": {"throughput": 1, "p50": 1, "p99": 1}}
+        _, regressions = compare(current, baseline, threshold=10)
+        assert len(regressions) == 1
+        assert regressions[0].startswith("submit p99")
+
+
+class TestPayloads:
+    def test_images_are_valid_and_unique(self):
+        """Снимки - корректный base64 с сигнатурой JPEG, без повторов содержимого"""
+        factory = PayloadFactory(seed=1, max_image_kb=50)
+        images = [base64.b64decode(factory.image(), validate=True) for _ in range(20)]
+        assert all(image.startswith(b'\xff\xd8\xff') for image in images)
+        assert len(set(images)) == len(images)
+
+    def test_pereval_shape(self):
+        pereval = PayloadFactory(seed=2, max_image_kb=50).pereval()
+        assert 1 <= len(pereval["images"]) <= MAX_IMAGES
+        assert set(pereval["coords"]) == {"latitude", "longitude", "height"}
+        assert pereval["user"]["email"].endswith("@example.com")
+
+    def test_reproducible(self):
+        first = PayloadFactory(seed=3, max_image_kb=50).pereval()
+        second = PayloadFactory(seed=3, max_image_kb=50).pereval()
+        assert first == second
+
+
+class TestRun:
+    def test_default_app_serves_api(self):
+        """По умолчанию нагружается app.main со всеми роутерами"""
+        app = load_app(build_parser().parse_args([]).app)
+        paths = {route.path for route in app.routes}
+        assert {'/submitData', '/submitData/batch', '/submitData/{pereval_id}', '/submitData/'} <= paths
@@ -0,0 +1,133 @@
+import io
+import os
+import pytest
+from pathlib import Path
+from app.storage.blob import BlobStore, LocalBlobStore, content_hash, detect_mime_type
+from app.storage.sweep import sweep_blobs
+
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'\x00' * 16
+JPEG = b'\xff\xd8\xff\xe0' + b'\x00' * 16
+
+
+class TestLocalBlobStore:
+    @pytest.fixture(autouse=True)
+    def setup(self, tmp_path):
+        self.store = LocalBlobStore(str(tmp_path))
+
+    def test_put_get(self):
+        """Данные сохраняются и читаются по хешу содержимого"""
+        blob_hash = self.store.put(PNG)
+
+        assert blob_hash == content_hash(PNG)
+        assert self.store.exists(blob_hash)
+        assert self.store.get(blob_hash) == PNG
+
+    def test_put_duplicate(self):
+        """Одинаковые данные хранятся один раз"""
+        first = self.store.put(PNG)
+        second = self.store.put(PNG)
+
+        assert first == second
+        files = [path for path in Path(self.store.root).rglob('*') if path.is_file()]
+        assert len(files) == 1
+
+    def test_put_stream(self):
+        """Потоковое сохранение даёт тот же хеш, что и сохранение целиком"""
+        data = PNG * 10000
+        blob_hash, size, head = self.store.put_stream(io.BytesIO(data), chunk_size=1024)
+
+        assert blob_hash == content_hash(data)
+        assert size == len(data)
+        assert head == data[:1024]
+        assert self.store.get(blob_hash) == data
+
+    def test_put_stream_empty(self):
+        """Пустая часть multipart не оставляет файла в хранилище"""
+        blob_hash, size, head = self.store.put_stream(io.BytesIO(b''))
+
+        assert (size, head) == (0, b'')
+        assert not self.store.exists(blob_hash)
+        assert list(self.store.list_blobs()) == []
+
+    def test_put_existing_refreshes_time(self):
+        """Повторная запись тех же данных обновляет время blob-а"""
+        blob_hash = self.store.put(PNG)
+        os.utime(self.store.path(blob_hash), (1000, 1000))
+
+        self.store.put(PNG)
+        assert self.store.modified_at(blob_hash) > 1000
+
+    def test_delete(self):
+        blob_hash = self.store.put(JPEG)
+        self.store.delete(blob_hash)
+
+        assert not self.store.exists(blob_hash)
+
+    def test_backend_must_implement_interface(self):
+        """Хранилище без обязательных методов нельзя создать"""
+        class PartialStore(BlobStore):
+            def put(self, data):
+                return content_hash(data)
+
+        with pytest.raises(TypeError):
+            PartialStore()
+
+    def test_invalid_hash(self):
+        """Хеш не может выводить за пределы каталога хранилища"""
+        with pytest.raises(ValueError):
+            self.store.get("../../etc/passwd")
+
+
+class TestSweepBlobs:
+    @pytest.fixture(autouse=True)
+    def setup(self, tmp_path):
+        self.store = LocalBlobStore(str(tmp_path))
+
+    def put_old(self, data, mtime=1000):
+        blob_hash = self.store.put(data)
+        os.utime(self.store.path(blob_hash), (mtime, mtime))
+        return blob_hash
+
+    def test_removes_only_old_unreferenced(self):
+        referenced = self.put_old(PNG)
+        orphan = self.put_old(JPEG)
+        fresh = self.store.put(b'fresh upload')
+        checked = []
+
+        def find_unreferenced(hashes):
+            checked.extend(hashes)
+            return [h for h in hashes if h != referenced]
+
+        removed = sweep_blobs(self.store, find_unreferenced, older_than=2000, batch_size=1)
+        assert removed == [orphan]
+        assert fresh not in checked
+        assert self.store.exists(referenced) and self.store.exists(fresh)
+        assert not self.store.exists(orphan)
+
+    def test_dry_run(self):
+        orphan = self.put_old(JPEG)
+
+        assert sweep_blobs(self.store, lambda hashes: hashes, older_than=2000, dry_run=True) == [orphan]
+        assert self.store.exists(orphan)
+
+    def test_reuploaded_during_sweep(self):
+        """Blob, загруженный заново после проверки ссылок, не удаляется"""
+        orphan = self.put_old(JPEG)
+
+        def find_unreferenced(hashes):
+            self.store.put(JPEG)
+            return hashes
+
+        assert sweep_blobs(self.store, find_unreferenced, older_than=2000) == []
+        assert self.store.exists(orphan)
+
+
+class TestDetectMimeType:
+    def test_known_formats(self):
+        assert detect_mime_type(PNG) == "image/png"
+        assert detect_mime_type(JPEG) == "image/jpeg"
+        assert detect_mime_type(b'RIFF\x00\x00\x00\x00WEBPVP8 ') == "image/webp"
+
+    def test_unknown_format(self):
+        assert detect_mime_type(b'not an image') == "application/octet-stream"
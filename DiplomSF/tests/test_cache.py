@@ -0,0 +1,58 @@
+from app.utils.cache import TTLCache
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTTLCache:
+    def test_get_set(self):
+        cache = TTLCache()
+        cache.set("a", 1)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("b", 2) == 2
+
+    def test_expiration(self):
+        """Записи исчезают по истечении ttl"""
+        timer = FakeTimer()
+        cache = TTLCache(ttl=10, timer=timer)
+        cache.set("a", 1)
+        cache.set("b", 2, ttl=100)
+
+        timer.now = 11
+        assert cache.get("a") is None
+        assert cache.get("b") == 2
+
+    def test_lru_eviction(self):
+        """При переполнении вытесняется давно не использованная запись"""
+        cache = TTLCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert len(cache) == 2
+
+    def test_pop(self):
+        cache = TTLCache()
+        cache.set("a", 1)
+
+        assert cache.pop("a") == 1
+        assert cache.pop("a") is None
+
+    def test_hit_miss_counters(self):
+        """Счётчики попаданий и промахов для /metrics"""
+        cache = TTLCache()
+        cache.set("a", 1)
+        cache.get("a")
+        cache.get("b")
+
+        assert (cache.hits, cache.misses) == (1, 1)
@@ -118,4 +118,92 @@ class TestDatabaseManager:
 
         with self.db.conn.cursor() as cursor:
             cursor.execute("SELECT title FROM images WHERE id = %s", (image_id,))
-            assert cursor.fetchone()[0] == "Тест"
\ No newline at end of file
+            assert cursor.fetchone()[0] == "Тест"
+
+    def test_add_images(self):
+        """Тестирование пакетного добавления изображений"""
+        user_id = self.db.add_user(email="test@example.com", phone="123", fam="Иванов", name="Иван")
+        coord_id = self.db.add_coords(latitude=45, longitude=90, height=1000)
+        pereval_id = self.db.add_pereval(
+            user_id=user_id,
+            title="Тест",
+            coord_id=coord_id,
+            beauty_title=None,
+            other_titles=None,
+            connect=None,
+            add_time=None
+        )
+
+        image_ids = self.db.add_images(
+            pereval_id=pereval_id,
+            images=[(f'image_{i}'.encode(), f"Фото {i}") for i in range(30)]
+        )
+
+        assert len(image_ids) == 30
+
+        with self.db.conn.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM images WHERE pereval_id = %s", (pereval_id,))
+            assert cursor.fetchone()[0] == 30
+
+    def test_submit_pereval(self):
+        """Тестирование добавления перевала одной транзакцией"""
+        pereval_id = self.db.submit_pereval(
+            user={"email": "test@example.com", "phone": "123", "fam": "Иванов", "name": "Иван"},
+            coords={"latitude": 45.123456, "longitude": 90.123456, "height": 2500},
+            pereval={"title": "Тест", "add_time": "12:34:56"},
+            images=[(b'first', "Первое"), (b'second', "Второе")]
+        )
+
+        assert isinstance(pereval_id, int)
+
+        with self.db.conn.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM images WHERE pereval_id = %s", (pereval_id,))
+            assert cursor.fetchone()[0] == 2
+
+    def test_get_pereval(self):
+        """Перевал читается одним запросом вместе с метаданными изображений"""
+        pereval_id = self.db.submit_pereval(
+            user={"email": "test@example.com", "phone": "123", "fam": "Иванов", "name": "Иван"},
+            coords={"latitude": 45.5, "longitude": 90.5, "height": 2500},
+            pereval={"title": "Тест", "add_time": "12:34:56"},
+            images=[(b'first', "Первое"), (b'second', "Второе")]
+        )
+
+        pereval = self.db.get_pereval(pereval_id)
+
+        assert pereval["title"] == "Тест"
+        assert pereval["add_time"] == "12:34:56"
+        assert pereval["coords"] == {"latitude": 45.5, "longitude": 90.5, "height": 2500}
+        assert pereval["user"]["email"] == "test@example.com"
+        assert [image["title"] for image in pereval["images"]] == ["Первое", "Второе"]
+        assert pereval["images"][0]["size"] == len(b'first')
+        assert self.db.get_pereval(pereval_id + 1000) is None
+
+    def test_submit_pereval_same_email(self):
+        """Повторная отправка с тем же email не создаёт второго пользователя"""
+        user = {"email": "test@example.com", "phone": "123", "fam": "Иванов", "name": "Иван"}
+        coords = {"latitude": 45, "longitude": 90, "height": 1000}
+        first_id = self.db.submit_pereval(user=user, coords=coords, pereval={"title": "Первый"}, images=[])
+        user["phone"] = "456"
+        second_id = self.db.submit_pereval(user=user, coords=coords, pereval={"title": "Второй"}, images=[])
+
+        assert first_id != second_id
+        with self.db.conn.cursor() as cursor:
+            cursor.execute("SELECT count(*), max(phone) FROM users")
+            assert cursor.fetchone() == (1, "456")
+
+    def test_submit_pereval_rollback(self):
+        """При ошибке в изображениях не должно остаться пользователя и координат"""
+        with pytest.raises(Exception):
+            self.db.submit_pereval(
+                user={"email": "test@example.com", "phone": "123", "fam": "Иванов", "name": "Иван"},
+                coords={"latitude": 45, "longitude": 90, "height": 1000},
+                pereval={"title": "Тест"},
+                images=[(b'data', None)]
+            )
+
+        with self.db.conn.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM users")
+            assert cursor.fetchone()[0] == 0
+            cursor.execute("SELECT count(*) FROM coords")
+            assert cursor.fetchone()[0] == 0
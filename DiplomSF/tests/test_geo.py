@@ -0,0 +1,47 @@
+import pytest
+
+from app.utils.geo import MAX_TILE_LATITUDE, MAX_TILE_ZOOM, haversine_km, point_tile, radius_bbox, tile_bbox
+
+
+class TestGeo:
+    def test_haversine(self):
+        # Один градус по меридиану - около 111.2 км
+        assert haversine_km(0, 0, 1, 0) == pytest.approx(111.19, abs=0.01)
+        assert haversine_km(43.35, 42.44, 43.35, 42.44) == 0
+
+    def test_radius_bbox_contains_circle(self):
+        """Точки на границе круга попадают в прямоугольник"""
+        lat, lon, radius = 43.35, 42.44, 25
+        south, west, north, east = radius_bbox(lat, lon, radius)
+
+        assert south < lat < north
+        assert west < lon < east
+        assert haversine_km(lat, lon, north, lon) == pytest.approx(radius, rel=1e-6)
+        assert haversine_km(lat, lon, lat, east) > radius - 0.01
+
+    def test_radius_bbox_near_pole(self):
+        assert radius_bbox(89.9, 10, 50) == (pytest.approx(89.45, abs=0.01), -180.0, 90.0, 180.0)
+
+    def test_radius_bbox_antimeridian(self):
+        """Круг через 180-й меридиан накрывается полной полосой долгот"""
+        south, west, north, east = radius_bbox(60, 179.9, 50)
+        assert (west, east) == (-180.0, 180.0)
+
+    def test_tile_bbox(self):
+        south, west, north, east = tile_bbox(0, 0, 0)
+        assert (west, east) == (-180, 180)
+        assert north == pytest.approx(MAX_TILE_LATITUDE)
+        assert south == pytest.approx(-MAX_TILE_LATITUDE)
+
+    def test_point_tile(self):
+        """Точка попадает в тайл, границы которого её содержат"""
+        lat, lon = 43.35, 42.44
+        for z in (0, 5, 12, MAX_TILE_ZOOM):
+            x, y = point_tile(lat, lon, z)
+            south, west, north, east = tile_bbox(z, x, y)
+            assert south <= lat <= north
+            assert west <= lon <= east
+
+    def test_point_tile_edges(self):
+        assert point_tile(90, 180, 3) == (7, 0)
+        assert point_tile(-90, -180, 3) == (0, 7)
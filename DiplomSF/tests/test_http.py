@@ -0,0 +1,83 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.database.async_manager import AsyncDatabaseManager
+from app.main import app
+from app.storage import blob
+from app.storage.blob import LocalBlobStore
+from app.utils.http import parse_range, etag_matches, RangeNotSatisfiable
+
+
+class TestParseRange:
+    def test_no_header(self):
+        assert parse_range(None, 100) is None
+
+    def test_closed_range(self):
+        assert parse_range("bytes=10-19", 100) == (10, 19)
+
+    def test_open_range(self):
+        assert parse_range("bytes=90-", 100) == (90, 99)
+
+    def test_suffix_range(self):
+        assert parse_range("bytes=-10", 100) == (90, 99)
+
+    def test_end_beyond_size(self):
+        assert parse_range("bytes=50-500", 100) == (50, 99)
+
+    def test_not_satisfiable(self):
+        with pytest.raises(RangeNotSatisfiable):
+            parse_range("bytes=100-", 100)
+
+    def test_multiple_ranges_ignored(self):
+        """Несколько диапазонов не поддерживаются - отдаётся весь ресурс"""
+        assert parse_range("bytes=0-1,5-6", 100) is None
+
+
+class TestEtagMatches:
+    def test_match(self):
+        assert etag_matches('"abc", "def"', '"def"')
+        assert etag_matches('*', '"abc"')
+
+    def test_no_match(self):
+        assert not etag_matches('"abc"', '"def"')
+        assert not etag_matches(None, '"def"')
+
+
+class FakeConnection:
+    async def commit(self):
+        pass
+
+
+class TestImageStreaming:
+    def test_connection_released_before_streaming(self, monkeypatch, tmp_path):
+        """Соединение сессии возвращается в пул до начала отдачи байтов"""
+        events = []
+        store = LocalBlobStore(str(tmp_path))
+        data = b'\x89PNG\r\n\x1a\n' + b'\x00' * 1000
+        img_hash = store.put(data)
+
+        async def acquire(self):
+            events.append('acquire')
+            return FakeConnection()
+
+        async def release(self, conn):
+            events.append('release')
+
+        async def get_image(self, pereval_id, image_id):
+            async with self.connection():
+                return img_hash, len(data), 'image/png'
+
+        def iter_range(blob_hash, start, length):
+            events.append('stream')
+            yield from LocalBlobStore.iter_range(store, blob_hash, start, length)
+
+        monkeypatch.setattr(AsyncDatabaseManager, '_acquire', acquire)
+        monkeypatch.setattr(AsyncDatabaseManager, '_release', release)
+        monkeypatch.setattr(AsyncDatabaseManager, 'get_image', get_image)
+        monkeypatch.setattr(store, 'iter_range', iter_range)
+        monkeypatch.setattr(blob, '_blob_store', store)
+
+        response = TestClient(app).get('/submitData/1/images/1', headers={"Range": "bytes=0-9"})
+        assert response.status_code == 206
+        assert response.content == data[:10]
+        assert events == ['acquire', 'release', 'stream']
@@ -0,0 +1,58 @@
+import logging
+
+import pytest
+
+from app.database.instrumentation import (
+    DURATION_BUCKETS, QueryStats, add_query_listener, query_stats, remove_query_listener, timed_query
+)
+
+
+class FakeCursor:
+    rowcount = 3
+
+
+class TestQueryStats:
+    def test_histogram_buckets(self):
+        """Длительности раскладываются по корзинам, счётчики накопленные"""
+        stats = QueryStats()
+        stats.record('get_image', 0.0005, rows=1)
+        stats.record('get_image', 0.02, rows=1)
+        stats.record('get_image', 60, error=True)
+
+        stat = stats.snapshot()['get_image']
+        assert stat['count'] == 3
+        assert stat['errors'] == 1
+        assert stat['rows'] == 2
+        assert stat['sum'] == pytest.approx(60.0205)
+        assert len(stat['buckets']) == len(DURATION_BUCKETS) + 1
+        assert stat['buckets'][0] == 1
+        assert stat['buckets'][DURATION_BUCKETS.index(0.025)] == 2
+        assert stat['buckets'][-1] == 3
+
+    def test_timed_query(self):
+        """timed_query учитывает строки курсора, ошибки и вызывает обработчики"""
+        calls = []
+        listener = lambda *args: calls.append(args)
+        add_query_listener(listener)
+        try:
+            with timed_query('test_timed_query', FakeCursor()):
+                pass
+            with pytest.raises(RuntimeError):
+                with timed_query('test_timed_query', FakeCursor()):
+                    raise RuntimeError('boom')
+        finally:
+            remove_query_listener(listener)
+
+        assert [(name, rows, error) for name, _, rows, error in calls] == [
+            ('test_timed_query', 3, False), ('test_timed_query', 0, True)
+        ]
+        stat = query_stats.snapshot()['test_timed_query']
+        assert stat['count'] == 2 and stat['errors'] == 1 and stat['rows'] == 3
+
+    def test_slow_query_log(self, monkeypatch, caplog):
+        """Запросы дольше порога пишутся в лог"""
+        monkeypatch.setattr('app.database.instrumentation._slow_threshold', 0.000001)
+        with caplog.at_level(logging.WARNING, logger='app.database.slow_queries'):
+            with timed_query('test_slow_query'):
+                sum(range(10000))
+        assert 'slow query test_slow_query' in caplog.text
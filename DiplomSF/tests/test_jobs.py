@@ -0,0 +1,74 @@
+import asyncio
+
+from app.jobs.handlers import HANDLERS, job_handler
+from app.jobs.worker import MAX_RETRY_DELAY, retry_delay, run_job
+
+
+class RecordingJobsDB:
+    """Записывает, чем завершилась задача"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def complete_job(self, job_id):
+        self.calls.append(("complete", job_id))
+
+    async def retry_job(self, job_id, error, delay):
+        self.calls.append(("retry", job_id, delay))
+
+    async def fail_job(self, job_id, error):
+        self.calls.append(("fail", job_id))
+
+
+@job_handler("test_flaky")
+async def flaky_handler(db, payload):
+    if payload.get("fail"):
+        raise RuntimeError("boom")
+
+
+def make_job(kind="test_flaky", attempts=1, max_attempts=3, **payload):
+    return {"id": 1, "kind": kind, "payload": payload, "attempts": attempts, "max_attempts": max_attempts}
+
+
+class TestWorker:
+    def test_handlers_registered(self):
+        assert "renditions" in HANDLERS
+
+    def test_retry_delay(self):
+        assert retry_delay(1) == 2
+        assert retry_delay(3) == 8
+        assert retry_delay(50) == MAX_RETRY_DELAY
+
+    def test_run_job(self):
+        db = RecordingJobsDB()
+
+        assert asyncio.run(run_job(db, make_job()))
+        assert not asyncio.run(run_job(db, make_job(fail=True, attempts=2)))
+        assert not asyncio.run(run_job(db, make_job(fail=True, attempts=3)))
+        assert not asyncio.run(run_job(db, make_job(kind="unknown")))
+
+        assert db.calls == [("complete", 1), ("retry", 1, 4), ("fail", 1), ("fail", 1)]
+
+    def test_run_job_logs_error(self, caplog):
+        """Ошибка задачи пишется в лог вместе с трассировкой"""
+        asyncio.run(run_job(RecordingJobsDB(), make_job(fail=True)))
+
+        [record] = [r for r in caplog.records if r.name == "app.jobs.worker"]
+        assert record.levelname == "ERROR"
+        assert "test_flaky" in record.getMessage()
+        assert record.exc_info[0] is RuntimeError
+
+
+class TestJobQueue:
+    def test_submit_enqueues_jobs(self, client, test_pereval_data, test_db):
+        """Отправка перевала ставит задачу обработки в той же транзакции"""
+        pereval_id = client.post("/submitData/", json=test_pereval_data).json()["id"]
+
+        test_db.connect()
+        with test_db.conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT kind, status FROM jobs WHERE payload->>'pereval_id' = %s",
+                (str(pereval_id),)
+            )
+            assert cursor.fetchall() == [("renditions", "queued")]
+        test_db.disconnect()
@@ -0,0 +1,86 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.main import app as main_app
+from app.utils.metrics import Histogram, HttpMetrics, MetricsMiddleware, render_metrics
+
+
+def make_client(metrics):
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware, metrics=metrics)
+
+    @app.get('/items/{item_id}')
+    def get_item(item_id: int):
+        return {"id": item_id}
+
+    @app.post('/items')
+    def create_item(item: dict):
+        return item
+
+    return TestClient(app)
+
+
+class TestHistogram:
+    def test_cumulative_buckets(self):
+        histogram = Histogram('test_seconds', 'Test', ('route',), (0.1, 1.0))
+        histogram.observe(('/a',), 0.05)
+        histogram.observe(('/a',), 0.5)
+        histogram.observe(('/a',), 5)
+
+        [(labels, buckets, total)] = histogram.collect()
+        assert labels == ('/a',)
+        assert buckets == [1, 2, 3]
+        assert total == 5.55
+
+    def test_render(self):
+        histogram = Histogram('test_seconds', 'Test', ('route',), (0.1,))
+        histogram.observe(('/a"b',), 0.05)
+        lines = []
+        histogram.render(lines)
+        assert '# TYPE test_seconds histogram' in lines
+        assert 'test_seconds_bucket{route="/a\\"b",le="0.1"} 1' in lines
+        assert 'test_seconds_bucket{route="/a\\"b",le="+Inf"} 1' in lines
+        assert 'test_seconds_count{route="/a\\"b"} 1' in lines
+
+
+class TestMetricsMiddleware:
+    def test_route_template_and_sizes(self):
+        """Запросы учитываются по шаблону маршрута, с размерами тел"""
+        metrics = HttpMetrics()
+        client = make_client(metrics)
+        client.get('/items/1')
+        client.get('/items/2')
+        client.post('/items', json={"name": "x"})
+        client.get('/missing')
+
+        durations = {labels: buckets[-1] for labels, buckets, _ in metrics.duration.collect()}
+        assert durations[('GET', '/items/{item_id}', '200')] == 2
+        assert durations[('POST', '/items', '200')] == 1
+        assert durations[('GET', '<unmatched>', '404')] == 1
+
+        request_sizes = {labels: total for labels, _, total in metrics.request_size.collect()}
+        assert request_sizes[('POST', '/items')] == len(b'{"name": "x"}')
+        response_sizes = {labels: total for labels, _, total in metrics.response_size.collect()}
+        assert response_sizes[('GET', '/items/{item_id}')] == 2 * len(b'{"id":1}')
+        assert metrics.in_flight == 0
+
+    def test_render_metrics(self):
+        metrics = HttpMetrics()
+        make_client(metrics).get('/items/1')
+        text = render_metrics(metrics)
+        assert 'fstr_http_requests_in_flight 0' in text
+        assert 'fstr_http_request_duration_seconds_count{method="GET",route="/items/{item_id}",status="200"} 1' in text
+        assert 'fstr_cache_hit_ratio{cache="response"}' in text
+        assert '# TYPE fstr_db_pool_connections_in_use gauge' in text
+
+
+class TestMetricsEndpoint:
+    def test_metrics_through_main_app(self):
+        """GET /metrics отдаётся приложением app.main и видит его маршруты"""
+        client = TestClient(main_app)
+        assert client.get('/metrics').status_code == 200
+
+        response = client.get('/metrics')
+        assert response.status_code == 200
+        assert response.headers['content-type'].startswith('text/plain; version=0.0.4')
+        assert 'fstr_http_request_duration_seconds_count{method="GET",route="/metrics",status="200"}' in response.text
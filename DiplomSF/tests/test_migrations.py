@@ -0,0 +1,50 @@
+import re
+
+from app.database.migrations import MIGRATIONS
+from app.database.models import DatabaseQueries
+
+
+def schema(queries):
+    """Таблицы с колонками и имена индексов после выполнения queries по порядку"""
+    tables, indexes = {}, set()
+    for query in queries:
+        created = re.search(r"CREATE TABLE IF NOT EXISTS (\w+) \((.*)\)", query, re.S)
+        if created:
+            columns = re.findall(r"^\s*(\w+) [A-Z]", created.group(2), re.M)
+            tables[created.group(1)] = {c for c in columns if c not in ('PRIMARY', 'CHECK')}
+        altered = re.search(r"ALTER TABLE (\w+)", query)
+        if altered:
+            tables[altered.group(1)] |= set(re.findall(r"ADD COLUMN IF NOT EXISTS (\w+)", query))
+        indexes |= set(re.findall(r"CREATE INDEX IF NOT EXISTS (\w+)", query))
+        indexes -= set(re.findall(r"DROP INDEX IF EXISTS (\w+)", query))
+    return tables, indexes
+
+
+class TestMigrations:
+    def test_versions_ordered_and_unique(self):
+        """Версии миграций уникальны и идут по возрастанию"""
+        versions = [migration.version for migration in MIGRATIONS]
+        assert versions == sorted(set(versions))
+        assert versions[0] == 1
+
+    def test_migrations_build_current_schema(self):
+        """Зафиксированные миграции дают те же таблицы, колонки и индексы, что и модели"""
+        migrated = schema([step for m in MIGRATIONS for step in m.steps if isinstance(step, str)])
+        current = schema(DatabaseQueries.get_all_tables_creation_queries()
+                         + DatabaseQueries.get_all_indexes_creation_queries())
+        assert migrated == current
+
+    def test_first_migration_is_frozen(self):
+        """Первая миграция не подхватывает изменения моделей из более поздних версий"""
+        assert len(MIGRATIONS[0].steps) == 4
+        assert all('claimed_by' not in step for step in MIGRATIONS[0].steps)
+
+    def test_index_queries(self):
+        """Индексы для горячих выборок идемпотентны и покрывают нужные колонки"""
+        queries = DatabaseQueries.get_all_indexes_creation_queries()
+        assert all("IF NOT EXISTS" in q for q in queries)
+        assert any("images (pereval_id)" in q for q in queries)
+        assert any("pereval_added (user_id, id)" in q for q in queries)
+        assert any("pereval_added (status, id) WHERE status IN ('new', 'pending')" in q for q in queries)
+        assert any("pereval_added (coord_id)" in q for q in queries)
+        assert any("users USING gin" in q and "gin_trgm_ops" in q for q in queries)
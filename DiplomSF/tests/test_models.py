@@ -47,16 +47,20 @@ class TestModels:
         image = Image(
             id=1,
             pereval_id=1,
-            img=b'test_image_data',
+            img_hash="a" * 64,
+            img_size=15,
+            mime_type="image/png",
             title="Тестовое изображение"
         )
 
         assert image.id == 1
         assert image.pereval_id == 1
-        assert image.img == b'test_image_data'
+        assert image.img_hash == "a" * 64
+        assert image.mime_type == "image/png"
         assert image.title == "Тестовое изображение"
 
         assert "CREATE TABLE IF NOT EXISTS images" in Image.create_table_query()
+        assert "BYTEA" not in Image.create_table_query()
 
     def test_pereval_model(self):
         """Тестирование модели перевала"""
@@ -99,17 +103,19 @@ class TestDatabaseQueries:
         query = DatabaseQueries.get_pereval_by_id()
         assert "JOIN coords c ON p.coord_id = c.id" in query
         assert "JOIN users u ON p.user_id = u.id" in query
+        assert "json_agg" in query
 
-    def test_update_pereval_query(self):
-        """Тестирование запроса обновления перевала"""
-        query = DatabaseQueries.update_pereval()
-        assert "UPDATE pereval_added" in query
-        assert "WHERE id = %s AND status = 'new'" in query
+    def test_update_pereval_fields_query(self):
+        """Тестирование запроса частичного обновления перевала"""
+        query = DatabaseQueries.update_pereval_fields(["title", "connect"])
+        assert query == "UPDATE pereval_added SET title = %s, connect = %s WHERE id = %s"
+        with pytest.raises(ValueError):
+            DatabaseQueries.update_pereval_fields(["status"])
 
     def test_get_all_tables_creation_queries(self):
         """Тестирование получения всех запросов создания таблиц"""
         queries = DatabaseQueries.get_all_tables_creation_queries()
-        assert len(queries) == 4
+        assert len(queries) == 7
         assert all(isinstance(q, str) for q in queries)
         assert "CREATE TABLE IF NOT EXISTS users" in queries[0]
         assert "CREATE TABLE IF NOT EXISTS coords" in queries[1]
\ No newline at end of file
@@ -0,0 +1,75 @@
+from fastapi import status
+
+
+def claim_ids(client, moderator, ids):
+    """Берёт перевалы в работу, пока в заявку не попадут все ids (очередь общая для тестов)"""
+    claimed = set()
+    while not set(ids) <= claimed:
+        items = client.post("/moderation/claim", json={"moderator": moderator, "limit": 100}).json()
+        assert items, "перевалы не попали в заявку"
+        claimed |= {item["id"] for item in items}
+
+
+class TestModerationEndpoints:
+    def test_queue_and_claim(self, client, test_pereval_data):
+        ids = [client.post("/submitData/", json=test_pereval_data).json()["id"] for _ in range(3)]
+
+        queue = client.get("/moderation/queue", params={"status": "new", "limit": 100})
+        assert queue.status_code == status.HTTP_200_OK
+        assert set(ids) <= {item["id"] for item in queue.json()}
+
+        # Два модератора получают непересекающиеся перевалы
+        first = client.post("/moderation/claim", json={"moderator": "first", "limit": 2}).json()
+        second = client.post("/moderation/claim", json={"moderator": "second", "limit": 2}).json()
+        first_ids = {item["id"] for item in first}
+        second_ids = {item["id"] for item in second}
+        assert first_ids and not first_ids & second_ids
+        assert all(item["status"] == "pending" and item["claimed_by"] == "first" for item in first)
+
+        pending = client.get("/moderation/queue", params={"status": "pending", "limit": 100}).json()
+        assert first_ids | second_ids <= {item["id"] for item in pending}
+
+    def test_queue_pagination(self, client, test_pereval_data):
+        for _ in range(3):
+            client.post("/submitData/", json=test_pereval_data)
+
+        page = client.get("/moderation/queue", params={"limit": 2})
+        assert len(page.json()) == 2
+        cursor = page.headers["X-Next-Cursor"]
+        next_page = client.get("/moderation/queue", params={"limit": 2, "cursor": cursor}).json()
+        assert next_page[0]["id"] > page.json()[-1]["id"]
+
+    def test_accept_and_reject(self, client, test_pereval_data):
+        accepted_id = client.post("/submitData/", json=test_pereval_data).json()["id"]
+        rejected_id = client.post("/submitData/", json=test_pereval_data).json()["id"]
+        claim_ids(client, "decider", [accepted_id, rejected_id])
+        # Карточка в кеше должна обновиться после решения
+        client.get(f"/submitData/{accepted_id}")
+
+        response = client.post("/moderation/accept", json={"moderator": "decider", "ids": [accepted_id, 999999]})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {"status": "accepted", "updated": [accepted_id], "skipped": [999999]}
+        assert client.get(f"/submitData/{accepted_id}").json()["status"] == "accepted"
+
+        # Перевал с решением повторно не меняется
+        response = client.post("/moderation/reject", json={"moderator": "decider", "ids": [accepted_id, rejected_id]})
+        assert response.json()["updated"] == [rejected_id]
+        assert response.json()["skipped"] == [accepted_id]
+        assert client.get(f"/submitData/{rejected_id}").json()["status"] == "rejected"
+
+    def test_decision_by_other_moderator(self, client, test_pereval_data):
+        pereval_id = client.post("/submitData/", json=test_pereval_data).json()["id"]
+        claim_ids(client, "moderator-a", [pereval_id])
+
+        # Модератор B не может решить перевал, взятый в работу модератором A
+        response = client.post("/moderation/accept", json={"moderator": "moderator-b", "ids": [pereval_id]})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {"status": "accepted", "updated": [], "skipped": [pereval_id]}
+        assert client.get(f"/submitData/{pereval_id}").json()["status"] == "pending"
+
+        response = client.post("/moderation/reject", json={"moderator": "moderator-a", "ids": [pereval_id]})
+        assert response.json()["updated"] == [pereval_id]
+
+    def test_decision_without_moderator(self, client):
+        response = client.post("/moderation/accept", json={"ids": [1]})
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
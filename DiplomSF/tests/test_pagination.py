@@ -0,0 +1,59 @@
+import pytest
+from app.utils.pagination import (
+    encode_cursor, decode_cursor, paginate, encode_rank_cursor, decode_rank_cursor, paginate_ranked
+)
+
+
+class TestCursor:
+    def test_roundtrip(self):
+        assert decode_cursor(encode_cursor(12345)) == 12345
+
+    def test_empty_cursor(self):
+        """Без курсора страница начинается с начала"""
+        assert decode_cursor(None) == 0
+        assert decode_cursor("") == 0
+
+    def test_invalid_cursor(self):
+        with pytest.raises(ValueError):
+            decode_cursor("not-a-cursor")
+
+    def test_negative_id(self):
+        with pytest.raises(ValueError):
+            decode_cursor(encode_cursor(-1))
+
+
+class TestPaginate:
+    def test_last_page(self):
+        rows = [(1,), (2,)]
+        assert paginate(rows, 2) == (rows, None)
+
+    def test_has_next_page(self):
+        """Лишняя строка означает, что есть следующая страница"""
+        rows, next_cursor = paginate([(1,), (2,), (3,)], 2)
+        assert rows == [(1,), (2,)]
+        assert decode_cursor(next_cursor) == 2
+
+    def test_dict_rows(self):
+        rows, next_cursor = paginate([{"id": 5}, {"id": 7}, {"id": 9}], 2)
+        assert rows == [{"id": 5}, {"id": 7}]
+        assert decode_cursor(next_cursor) == 7
+
+
+class TestRankCursor:
+    def test_roundtrip(self):
+        assert decode_rank_cursor(encode_rank_cursor(0.4166667, 12)) == (0.4166667, 12)
+
+    def test_empty_cursor(self):
+        """Без курсора подходит запись с любым рангом"""
+        assert decode_rank_cursor(None) == (float('inf'), 0)
+
+    def test_id_cursor_rejected(self):
+        with pytest.raises(ValueError):
+            decode_rank_cursor(encode_cursor(5))
+
+    def test_paginate_ranked(self):
+        rows = [(3, 'a', 0.9), (1, 'b', 0.5), (2, 'c', 0.5)]
+        page, next_cursor = paginate_ranked(rows, 2)
+        assert page == rows[:2]
+        assert decode_rank_cursor(next_cursor) == (0.5, 1)
+        assert paginate_ranked(rows, 3) == (rows, None)
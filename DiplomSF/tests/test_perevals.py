@@ -1,5 +1,9 @@
+import base64
+import hashlib
+
 import pytest
 from fastapi import status
+from app.database.async_manager import user_id_cache
 from app.schemas.pereval import PerevalResponse
 
 
@@ -20,6 +24,40 @@ class TestPerevalEndpoints:
         response = client.post("/submitData/", json=invalid_data)
         assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
 
+    def test_submit_data_batch(self, client, test_pereval_data):
+        # Пачка с ключами идемпотентности и одной некорректной записью
+        first = {**test_pereval_data, "idempotency_key": "device-1:1"}
+        second = {**test_pereval_data, "title": "Второй", "idempotency_key": "device-1:2"}
+        invalid = {**test_pereval_data, "coords": {"latitude": 100, "longitude": 0, "height": 0}}
+
+        response = client.post("/submitData/batch", json=[first, invalid, second])
+        assert response.status_code == status.HTTP_200_OK
+        results = response.json()
+        assert [r["status"] for r in results] == [200, 400, 200]
+        assert results[1]["id"] is None
+        assert results[0]["id"] != results[2]["id"]
+
+        # Повторная отправка не создаёт новых перевалов
+        retry = client.post("/submitData/batch", json=[first, second]).json()
+        assert [r["id"] for r in retry] == [results[0]["id"], results[2]["id"]]
+        assert all(r["message"] == "Уже отправлено" for r in retry)
+
+    def test_submit_data_stale_user_cache(self, client, test_pereval_data):
+        # Кеш email -> id в другом процессе не знает, что email сменили
+        user = {**test_pereval_data["user"], "email": "stale-cache@example.com"}
+        first_id = client.post("/submitData/", json={**test_pereval_data, "user": user}).json()["id"]
+        cached = user_id_cache.get(user["email"])
+        response = client.patch(f"/users/{cached[0]}", json={"email": "renamed-cache@example.com"})
+        assert response.status_code == status.HTTP_200_OK
+        user_id_cache.set(user["email"], cached)
+
+        # Новый перевал достаётся новому пользователю со старым email
+        second_id = client.post("/submitData/", json={**test_pereval_data, "user": user}).json()["id"]
+        by_email = client.get("/submitData/", params={"user__email": user["email"]}).json()
+        assert [item["id"] for item in by_email] == [second_id]
+        renamed = client.get("/submitData/", params={"user__email": "renamed-cache@example.com"}).json()
+        assert [item["id"] for item in renamed] == [first_id]
+
     def test_get_pereval_success(self, client, test_pereval_data):
         # Сначала создаем перевал
         create_response = client.post("/submitData/", json=test_pereval_data)
@@ -34,6 +72,63 @@ class TestPerevalEndpoints:
         assert data["title"] == test_pereval_data["title"]
         assert len(data["images"]) == 1
 
+    def test_get_pereval_image(self, client, test_pereval_data):
+        # Изображения отдаются отдельным запросом, в перевале только метаданные
+        create_response = client.post("/submitData/", json=test_pereval_data)
+        pereval_id = create_response.json()["id"]
+
+        image = client.get(f"/submitData/{pereval_id}").json()["images"][0]
+        assert "img" not in image
+        assert image["mime_type"] == "image/png"
+
+        response = client.get(image["url"])
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"] == "image/png"
+        assert len(response.content) == image["size"]
+
+        partial = client.get(image["url"], headers={"Range": "bytes=0-7"})
+        assert partial.status_code == status.HTTP_206_PARTIAL_CONTENT
+        assert partial.content == response.content[:8]
+
+        cached = client.get(image["url"], headers={"If-None-Match": response.headers["etag"]})
+        assert cached.status_code == status.HTTP_304_NOT_MODIFIED
+
+        # Изображение 1x1 меньше превью, поэтому копией служит оригинал
+        assert image["renditions"]["thumb"] == image["url"] + "/thumb"
+        thumb = client.get(image["renditions"]["thumb"])
+        assert thumb.status_code == status.HTTP_200_OK
+        assert thumb.content == response.content
+
+    def test_get_pereval_etag(self, client, test_pereval_data):
+        create_response = client.post("/submitData/", json=test_pereval_data)
+        pereval_id = create_response.json()["id"]
+
+        response = client.get(f"/submitData/{pereval_id}")
+        etag = response.headers["etag"]
+
+        cached = client.get(f"/submitData/{pereval_id}", headers={"If-None-Match": etag})
+        assert cached.status_code == status.HTTP_304_NOT_MODIFIED
+        assert cached.headers["etag"] == etag
+
+    def test_get_perevals_nearby_and_bbox(self, client, test_pereval_data):
+        # Перевал в 45.123456, 90.123456 и ещё один примерно в 110 км севернее
+        near_id = client.post("/submitData/", json=test_pereval_data).json()["id"]
+        far_data = {**test_pereval_data, "coords": {"latitude": 46.12, "longitude": 90.12, "height": 1000}}
+        far_id = client.post("/submitData/", json=far_data).json()["id"]
+
+        response = client.get("/submitData/nearby", params={"lat": 45.12, "lon": 90.12, "radius_km": 5})
+        assert response.status_code == status.HTTP_200_OK
+        ids = [p["id"] for p in response.json()]
+        assert near_id in ids and far_id not in ids
+        assert response.json()[0]["distance_km"] < 5
+
+        response = client.get("/submitData/bbox", params={"south": 45, "west": 90, "north": 47, "east": 91})
+        ids = [p["id"] for p in response.json()]
+        assert near_id in ids and far_id in ids
+
+        response = client.get("/submitData/bbox", params={"south": 45, "west": 91, "north": 47, "east": 90})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
     def test_get_pereval_not_found(self, client):
         # Тест запроса несуществующего перевала
         response = client.get("/submitData/9999")
@@ -43,6 +138,8 @@ class TestPerevalEndpoints:
         # Создаем перевал
         create_response = client.post("/submitData/", json=test_pereval_data)
         pereval_id = create_response.json()["id"]
+        # Карточка попадает в кеш ответов и должна сброситься при обновлении
+        client.get(f"/submitData/{pereval_id}")
 
         # Обновляем данные
         updated_data = test_pereval_data.copy()
@@ -57,6 +154,38 @@ class TestPerevalEndpoints:
         get_response = client.get(f"/submitData/{pereval_id}")
         assert get_response.json()["title"] == "Обновленный тест"
 
+    def test_update_pereval_partial_images(self, client, test_pereval_data):
+        """PATCH меняет только переданные поля и записывает только разницу изображений"""
+        create_response = client.post("/submitData/", json=test_pereval_data)
+        pereval_id = create_response.json()["id"]
+        images = client.get(f"/submitData/{pereval_id}").json()["images"]
+
+        # Только заголовок: изображения остаются теми же строками
+        response = client.patch(f"/submitData/{pereval_id}", json={"title": "Только заголовок"})
+        assert response.json()["state"] == 1
+        data = client.get(f"/submitData/{pereval_id}").json()
+        assert data["title"] == "Только заголовок"
+        assert data["beauty_title"] == test_pereval_data["beauty_title"]
+        assert [img["id"] for img in data["images"]] == [img["id"] for img in images]
+
+        # Существующее изображение по хешу с новым названием плюс одно новое
+        kept = images[0]
+        kept_hash = hashlib.sha256(base64.b64decode(test_pereval_data["images"][0]["img"])).hexdigest()
+        new_image = {"img": base64.b64encode(b"new image data").decode(), "title": "Новое"}
+        response = client.patch(f"/submitData/{pereval_id}", json={"images": [
+            {"img_hash": kept_hash, "title": "Переименовано"}, new_image
+        ]})
+        assert response.json()["state"] == 1
+        data = client.get(f"/submitData/{pereval_id}").json()
+        assert len(data["images"]) == 2
+        assert data["images"][0]["id"] == kept["id"]
+        assert data["images"][0]["title"] == "Переименовано"
+
+        # Чужой id изображения отклоняется без изменений
+        response = client.patch(f"/submitData/{pereval_id}", json={"images": [{"id": 999999}]})
+        assert response.json()["state"] == 0
+        assert len(client.get(f"/submitData/{pereval_id}").json()["images"]) == 2
+
     def test_update_pereval_wrong_status(self, client, test_pereval_data, test_db):
         # Создаем перевал
         create_response = client.post("/submitData/", json=test_pereval_data)
@@ -82,16 +211,16 @@ class TestPerevalEndpoints:
         assert "not in 'new' status" in response.json()["message"]
 
     def test_get_user_perevals_success(self, client, test_pereval_data):
-        # Создаем несколько перевалов
-        client.post("/submitData/", json=test_pereval_data)
+        # Свой email: перевалы других тестов с test@example.com остаются в БД до конца сессии
+        email = "user-perevals@example.com"
+        first_data = {**test_pereval_data, "user": {**test_pereval_data["user"], "email": email}}
+        client.post("/submitData/", json=first_data)
 
         # Второй перевал с тем же email
-        second_data = test_pereval_data.copy()
-        second_data["title"] = "Второй перевал"
+        second_data = {**first_data, "title": "Второй перевал"}
         client.post("/submitData/", json=second_data)
 
         # Тест получения перевалов пользователя
-        email = test_pereval_data["user"]["email"]
         response = client.get(f"/submitData/?user__email={email}")
         assert response.status_code == status.HTTP_200_OK
         data = response.json()
@@ -0,0 +1,47 @@
+import asyncio
+
+from psycopg_pool import AsyncConnectionPool
+
+from app.database import pool
+from app.database.pool import AsyncIdleCheck
+
+
+class FakeConnection:
+    pass
+
+
+class TestAsyncIdleCheck:
+    def test_pings_only_idle_connections(self, monkeypatch):
+        """SELECT 1 выполняется только для соединений, простоявших check_idle секунд"""
+        pinged = []
+
+        async def check_connection(conn):
+            pinged.append(conn)
+
+        now = [100.0]
+        monkeypatch.setattr(AsyncConnectionPool, 'check_connection', staticmethod(check_connection))
+        monkeypatch.setattr(pool.time, 'monotonic', lambda: now[0])
+        idle_check = AsyncIdleCheck(check_idle=30)
+        conn = FakeConnection()
+
+        # Новое соединение и соединение, вернувшееся недавно, не проверяются
+        asyncio.run(idle_check.check(conn))
+        asyncio.run(idle_check.reset(conn))
+        now[0] += 10
+        asyncio.run(idle_check.check(conn))
+        assert pinged == []
+
+        asyncio.run(idle_check.reset(conn))
+        now[0] += 30
+        asyncio.run(idle_check.check(conn))
+        assert pinged == [conn]
+
+    def test_disabled_check(self, monkeypatch):
+        async def check_connection(conn):
+            raise AssertionError("проверка отключена")
+
+        monkeypatch.setattr(AsyncConnectionPool, 'check_connection', staticmethod(check_connection))
+        idle_check = AsyncIdleCheck(check_idle=None)
+        conn = FakeConnection()
+        asyncio.run(idle_check.reset(conn))
+        asyncio.run(idle_check.check(conn))
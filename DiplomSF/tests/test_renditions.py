@@ -0,0 +1,38 @@
+import io
+
+import pytest
+
+from app.storage.renditions import RENDITIONS, render, renditions_available
+
+PIL = pytest.importorskip("PIL.Image")
+
+
+def make_image(width, height, mode="RGB", fmt="JPEG"):
+    output = io.BytesIO()
+    PIL.new(mode, (width, height), "red").save(output, format=fmt)
+    return output.getvalue()
+
+
+class TestRenditions:
+    def test_available(self):
+        assert renditions_available()
+
+    def test_render_downscales(self):
+        """Большая сторона уменьшается до размера копии, пропорции сохраняются"""
+        data = render(make_image(1600, 800), RENDITIONS['thumb'])
+
+        with PIL.open(io.BytesIO(data)) as image:
+            assert image.format == "JPEG"
+            assert image.size == (200, 100)
+
+    def test_render_keeps_transparency(self):
+        data = render(make_image(1000, 1000, mode="RGBA", fmt="PNG"), RENDITIONS['medium'])
+
+        with PIL.open(io.BytesIO(data)) as image:
+            assert image.format == "PNG"
+            assert image.size == (800, 800)
+
+    def test_render_small_or_broken(self):
+        """Маленькое или нечитаемое изображение отдаётся как есть"""
+        assert render(make_image(100, 50), RENDITIONS['thumb']) is None
+        assert render(b'not an image', RENDITIONS['thumb']) is None
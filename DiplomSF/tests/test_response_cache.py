@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.database.async_manager import AsyncDatabaseManager
+from app.main import app
+from app.utils import response_cache
+from app.utils.response_cache import (
+    CacheBackend, MemoryCacheBackend, ResponseCache, pereval_cache_key, tile_cache_key
+)
+
+
+class FailingBackend(CacheBackend):
+    async def get(self, key):
+        raise ConnectionError("cache is down")
+
+    async def set(self, key, value, ttl):
+        raise ConnectionError("cache is down")
+
+    async def delete(self, key):
+        raise ConnectionError("cache is down")
+
+
+class TestResponseCache:
+    def test_set_get(self):
+        cache = ResponseCache(MemoryCacheBackend())
+        key = pereval_cache_key(1)
+
+        assert asyncio.run(cache.get(key)) is None
+        stored = asyncio.run(cache.set(key, b'{"id": 1}', 30))
+        cached = asyncio.run(cache.get(key))
+
+        assert cached == stored
+        assert cached.body == b'{"id": 1}'
+        assert cached.etag.startswith('"') and cached.etag.endswith('"')
+
+    def test_etag_depends_on_body(self):
+        cache = ResponseCache(MemoryCacheBackend())
+
+        first = asyncio.run(cache.set("a", b"1", 30))
+        same = asyncio.run(cache.set("b", b"1", 30))
+        other = asyncio.run(cache.set("c", b"2", 30))
+
+        assert first.etag == same.etag
+        assert first.etag != other.etag
+
+    def test_invalidate(self):
+        cache = ResponseCache(MemoryCacheBackend())
+        asyncio.run(cache.set("a", b"1", 30))
+        asyncio.run(cache.invalidate("a"))
+
+        assert asyncio.run(cache.get("a")) is None
+
+    def test_ttl_for_status(self):
+        """Принятые и отклонённые перевалы кешируются надолго"""
+        cache = ResponseCache(MemoryCacheBackend(), ttl=30, immutable_ttl=86400)
+
+        assert cache.ttl_for_status("new") == 30
+        assert cache.ttl_for_status("pending") == 30
+        assert cache.ttl_for_status("accepted") == 86400
+        assert cache.ttl_for_status("rejected") == 86400
+
+    def test_backend_errors_are_ignored(self):
+        """Недоступный бэкенд не ломает запрос"""
+        cache = ResponseCache(FailingBackend())
+
+        assert asyncio.run(cache.get("a")) is None
+        assert asyncio.run(cache.set("a", b"1", 30)).body == b"1"
+        asyncio.run(cache.invalidate("a"))
+
+    def test_backend_must_implement_interface(self):
+        """Бэкенд без delete нельзя создать"""
+        class PartialBackend(CacheBackend):
+            async def get(self, key):
+                return None
+
+            async def set(self, key, value, ttl):
+                pass
+
+        with pytest.raises(TypeError):
+            PartialBackend()
+
+
+class TestCachedEndpoints:
+    def test_hits_do_not_take_connection(self, monkeypatch):
+        """Ответ из кеша отдаётся без соединения с БД"""
+        async def no_connection(self):
+            raise AssertionError("cache hit took a database connection")
+
+        monkeypatch.setattr(AsyncDatabaseManager, '_acquire', no_connection)
+        cache = ResponseCache(MemoryCacheBackend())
+        monkeypatch.setattr(response_cache, '_response_cache', cache)
+        pereval = asyncio.run(cache.set(pereval_cache_key(7), b'{"id": 7}', 30))
+        asyncio.run(cache.set(tile_cache_key(1, 0, 0), b'{"z": 1}', 30))
+
+        client = TestClient(app)
+        assert client.get('/submitData/7').json() == {"id": 7}
+        assert client.get('/submitData/7', headers={"If-None-Match": pereval.etag}).status_code == 304
+        assert client.get('/tiles/1/0/0').json() == {"z": 1}
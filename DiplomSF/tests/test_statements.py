@@ -0,0 +1,52 @@
+import os
+
+import pytest
+
+from app.database.manager import DatabaseManager
+from app.database.models import DatabaseQueries
+from app.database.statements import STATEMENTS, execute_sync, get_statement, to_positional
+
+
+class TestStatementRegistry:
+    def test_registry_built_from_queries(self):
+        """В реестр попадают запросы DatabaseQueries без параметров построения"""
+        assert get_statement('get_pereval_by_id') == DatabaseQueries.get_pereval_by_id()
+        assert 'create_submission' in STATEMENTS
+        assert 'update_pereval_fields' not in STATEMENTS
+        assert 'get_all_tables_creation_queries' not in STATEMENTS
+
+    def test_unknown_statement(self):
+        with pytest.raises(KeyError):
+            get_statement('drop_everything')
+
+    def test_to_positional(self):
+        """%s заменяются на $n, %% - на %"""
+        query, count = to_positional("SELECT * FROM users WHERE email LIKE '%%a' AND id = %s OR id = %s")
+        assert query == "SELECT * FROM users WHERE email LIKE '%a' AND id = $1 OR id = $2"
+        assert count == 2
+
+
+class TestPreparedExecution:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        os.environ['FSTR_DB_NAME'] = 'fstr_test'
+        self.db = DatabaseManager()
+        self.db.connect()
+        with self.db.conn.cursor() as cursor:
+            for query in DatabaseQueries.get_all_tables_creation_queries():
+                cursor.execute(query)
+            self.db.conn.commit()
+        yield
+        self.db.disconnect()
+
+    def test_prepared_once_per_connection(self):
+        """Повторное выполнение идёт по имени без новой подготовки"""
+        with self.db.conn.cursor() as cursor:
+            execute_sync(cursor, 'get_user_by_id', (1,))
+            execute_sync(cursor, 'get_user_by_id', (2,))
+            cursor.execute(
+                "SELECT count(*) FROM pg_prepared_statements WHERE name = 'get_user_by_id'"
+            )
+            assert cursor.fetchone()[0] == 1
+        self.db.conn.rollback()
+        assert 'get_user_by_id' in self.db.conn.prepared_statements
@@ -0,0 +1,38 @@
+import asyncio
+
+from fastapi import status
+from app.utils.geo import point_tile
+from app.utils.response_cache import invalidate_tiles
+
+
+class TestTileEndpoints:
+    def test_get_tile_clusters(self, client, test_pereval_data, test_db):
+        # Два принятых перевала рядом и один новый. Координаты свои: перевалы,
+        # принятые в других тестах (модерация), не должны попасть в плитку
+        data = {**test_pereval_data, "coords": {"latitude": 61.5, "longitude": 100.5, "height": 1500}}
+        ids = [client.post("/submitData/", json=data).json()["id"] for _ in range(3)]
+        test_db.connect()
+        with test_db.conn.cursor() as cursor:
+            cursor.execute(
+                "UPDATE pereval_added SET status = 'accepted' WHERE id = ANY(%s)",
+                (ids[:2],)
+            )
+            test_db.conn.commit()
+        test_db.disconnect()
+
+        coords = data["coords"]
+        asyncio.run(invalidate_tiles(coords["latitude"], coords["longitude"]))
+        x, y = point_tile(coords["latitude"], coords["longitude"], 10)
+
+        response = client.get(f"/tiles/10/{x}/{y}")
+        assert response.status_code == status.HTTP_200_OK
+        clusters = response.json()["clusters"]
+        assert sum(cluster["count"] for cluster in clusters) == 2
+        assert all(cluster["id"] is None for cluster in clusters if cluster["count"] > 1)
+
+        cached = client.get(f"/tiles/10/{x}/{y}", headers={"If-None-Match": response.headers["etag"]})
+        assert cached.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_get_tile_out_of_range(self, client):
+        assert client.get("/tiles/2/4/0").status_code == status.HTTP_404_NOT_FOUND
+        assert client.get("/tiles/30/0/0").status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
@@ -0,0 +1,49 @@
+from fastapi import status
+from app.utils.pagination import encode_cursor
+
+
+class TestUserEndpoints:
+    def test_get_users_cursor_pages(self, client, test_pereval_data):
+        for i in range(3):
+            user = {**test_pereval_data["user"], "email": f"page{i}@example.com"}
+            client.post("/submitData/", json={**test_pereval_data, "user": user})
+
+        page = client.get("/users/", params={"limit": 2})
+        assert page.status_code == status.HTTP_200_OK
+        assert "Deprecation" not in page.headers
+        next_page = client.get("/users/", params={"limit": 2, "cursor": page.headers["X-Next-Cursor"]})
+        assert next_page.json()[0]["id"] > page.json()[-1]["id"]
+
+    def test_get_users_legacy_offset(self, client, test_pereval_data):
+        client.post("/submitData/", json=test_pereval_data)
+        first = client.get("/users/", params={"limit": 1}).json()
+
+        # Устаревший offset работает отдельно от курсора и помечается заголовком
+        response = client.get("/users/", params={"limit": 1, "offset": 0})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == first
+        assert response.headers["Deprecation"] == "true"
+        assert "X-Next-Cursor" not in response.headers
+
+    def test_get_users_offset_with_cursor(self, client):
+        response = client.get("/users/", params={"offset": 10, "cursor": encode_cursor(1)})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_search_users_pages(self, client, test_pereval_data):
+        for i in range(3):
+            user = {**test_pereval_data["user"], "email": f"searchpage{i}@example.com"}
+            client.post("/submitData/", json={**test_pereval_data, "user": user})
+
+        page = client.get("/users/search/", params={"email": "searchpage", "limit": 2})
+        assert page.status_code == status.HTTP_200_OK
+        assert len(page.json()) == 2
+        rest = client.get("/users/search/", params={
+            "email": "searchpage", "limit": 2, "cursor": page.headers["X-Next-Cursor"]
+        })
+        emails = [user["email"] for user in page.json() + rest.json()]
+        assert sorted(emails) == [f"searchpage{i}@example.com" for i in range(3)]
+        assert "X-Next-Cursor" not in rest.headers
+
+    def test_search_users_short_query(self, client):
+        assert client.get("/users/search/", params={"email": "ab"}).status_code == \
+            status.HTTP_422_UNPROCESSABLE_ENTITY